@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.price_history import TimeLike, to_epoch
+
+
+class CorporateActions:
+    """Split and dividend adjustment factors for one stock, applied on read.
+
+    Each action has an effective time and a price factor; a price recorded
+    before that time is multiplied by the factor to be comparable with
+    prices after it (a 2-for-1 split has factor 0.5, a dividend
+    ``1 - amount / close_before``). Stored history is never rewritten:
+    factors() turns a timestamp column into per-point multipliers with one
+    bisection over the action dates and a cumulative product.
+    """
+
+    def __init__(self):
+        self.actions: List[Dict] = []
+        self._table: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _add(self, action: Dict) -> Dict:
+        self.actions.append(action)
+        self._table = None
+        return action
+
+    def add_split(self, ratio: float, effective: Optional[TimeLike] = None) -> Dict:
+        if ratio <= 0:
+            raise ValueError("Split ratio must be positive")
+        return self._add({
+            'type': 'split',
+            'effective': to_epoch(effective) if effective is not None else datetime.now().timestamp(),
+            'ratio': ratio,
+            'factor': 1 / ratio
+        })
+
+    def add_dividend(self, amount: float, close_before: float, effective: Optional[TimeLike] = None) -> Dict:
+        if not 0 < amount < close_before:
+            raise ValueError("Dividend must be positive and below the previous close")
+        return self._add({
+            'type': 'dividend',
+            'effective': to_epoch(effective) if effective is not None else datetime.now().timestamp(),
+            'amount': amount,
+            'factor': 1 - amount / close_before
+        })
+
+    def undo(self) -> Optional[Dict]:
+        """Remove and return the most recently recorded action."""
+        if not self.actions:
+            return None
+        self._table = None
+        return self.actions.pop()
+
+    def _lookup_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._table is None:
+            ordered = sorted(self.actions, key=lambda action: action['effective'])
+            dates = np.array([action['effective'] for action in ordered])
+            # suffix[i] is the combined factor of every action from i on.
+            suffix = np.ones(len(ordered) + 1)
+            suffix[:-1] = np.cumprod([action['factor'] for action in ordered][::-1])[::-1] if ordered else []
+            self._table = (dates, suffix)
+        return self._table
+
+    def factors(self, timestamps: np.ndarray) -> np.ndarray:
+        """Multiplier for each timestamp: the product of factors of actions after it."""
+        dates, suffix = self._lookup_table()
+        return suffix[np.searchsorted(dates, timestamps, side='right')]
+
+    def factor_at(self, timestamp: float) -> float:
+        dates, suffix = self._lookup_table()
+        return float(suffix[int(np.searchsorted(dates, timestamp, side='right'))])
+
+    def affects(self, since: float) -> bool:
+        """Whether any action takes effect after ``since``."""
+        return any(action['effective'] > since for action in self.actions)
+
+    def to_list(self) -> List[Dict]:
+        return [dict(action, effective=datetime.fromtimestamp(action['effective']).isoformat())
+                for action in self.actions]
+
+    @classmethod
+    def from_list(cls, actions: List[Dict]) -> 'CorporateActions':
+        corporate_actions = cls()
+        for action in actions:
+            corporate_actions._add(dict(action, effective=datetime.fromisoformat(action['effective']).timestamp()))
+        return corporate_actions
+
+    def __len__(self):
+        return len(self.actions)
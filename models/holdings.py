@@ -0,0 +1,264 @@
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class HoldingsTable:
+    """Struct-of-arrays storage for the numeric state of a set of holdings.
+
+    Every column is a contiguous float64 array with room to grow; only the
+    first ``size`` rows are in use. Portfolio aggregates run as vectorized
+    passes over ``view(column)``, while Stock objects read and write their
+    own row through properties.
+
+    remove() only tombstones a row: its numbers are zeroed so sums stay
+    right and ``alive`` masks it out of everything else. compact() squeezes
+    the tombstones out later, keeping the order of the surviving rows.
+
+    With ``track_aggregates`` the table also keeps running totals (market
+    value, cost basis, change) adjusted by deltas on every set(), and two
+    heaps over change_percent for best/worst performer. Heap entries carry
+    a per-row version and stale ones are skipped lazily, so one price tick
+    costs O(log n). Writes must then go through set(); ``check`` re-verifies
+    the running state against a full recompute after every write.
+
+    Rows written since the last take_dirty() are remembered in ``dirty`` so
+    storage can save just those; touch() marks a row whose state outside the
+    table changed.
+    """
+    COLUMNS = ('quantity', 'initial_price', 'purchase_price', 'current_price', 'change', 'change_percent')
+
+    def __init__(self, capacity: int = 16, track_aggregates: bool = False, check: bool = False):
+        capacity = max(1, capacity)
+        self.size = 0
+        self.dead = 0
+        self.symbols = np.empty(capacity, dtype=object)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(capacity) for name in self.COLUMNS}
+
+        self.track_aggregates = track_aggregates
+        self.check = check
+        self.total_value = 0.0
+        self.total_cost = 0.0
+        self.total_change = 0.0
+        self._versions: List[int] = []
+        self.dirty: Set[int] = set()
+        self._best_heap: List[Tuple[float, int, int]] = []
+        self._worst_heap: List[Tuple[float, int, int]] = []
+
+    @property
+    def capacity(self) -> int:
+        return len(self.symbols)
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, min_capacity: int):
+        capacity = max(min_capacity, self.capacity * 2)
+        symbols = np.empty(capacity, dtype=object)
+        symbols[:self.size] = self.symbols[:self.size]
+        self.symbols = symbols
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        self.alive = alive
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def append(self, symbol: str, **values) -> int:
+        """Add a row and return its index; columns not given start at zero."""
+        if self.size == self.capacity:
+            self._grow(self.size + 1)
+        row = self.size
+        self.symbols[row] = symbol
+        self.alive[row] = True
+        for name in self.COLUMNS:
+            self.columns[name][row] = values.get(name, 0.0)
+        self.size += 1
+        self._versions.append(0)
+        self.dirty.add(row)
+        if self.track_aggregates:
+            self._add_contribution(row, 1.0)
+            self._push_performance(row)
+            self._verify()
+        return row
+
+    def extend(self, symbols: np.ndarray, **values: np.ndarray) -> np.ndarray:
+        """Append many rows at once from column arrays; returns their indices."""
+        count = len(symbols)
+        if self.size + count > self.capacity:
+            self._grow(self.size + count)
+        rows = np.arange(self.size, self.size + count)
+        self.symbols[rows] = symbols
+        self.alive[rows] = True
+        for name in self.COLUMNS:
+            self.columns[name][rows] = values.get(name, 0.0)
+        self.size += count
+        self._versions.extend([0] * count)
+        self.dirty.update(rows.tolist())
+        if self.track_aggregates and count:
+            quantity = self.columns['quantity'][rows]
+            self.total_value += float(quantity @ self.columns['current_price'][rows])
+            self.total_cost += float(quantity @ self.columns['purchase_price'][rows])
+            self.total_change += float(quantity @ self.columns['change'][rows])
+            self._rebuild_heaps()
+            self._verify()
+        return rows
+
+    def remove(self, row: int):
+        """Tombstone a row in O(1)."""
+        if self.track_aggregates:
+            self._add_contribution(row, -1.0)
+        self.symbols[row] = None
+        self.alive[row] = False
+        for column in self.columns.values():
+            column[row] = 0.0
+        self.dead += 1
+        self._versions[row] += 1
+        self.dirty.discard(row)
+        self._verify()
+
+    def set(self, name: str, row: int, value: float):
+        """Write one cell, keeping the running aggregates in step."""
+        column = self.columns[name]
+        self.dirty.add(row)
+        if not self.track_aggregates:
+            column[row] = value
+            return
+
+        delta = value - column[row]
+        column[row] = value
+        quantity = self.columns['quantity'][row]
+        if name == 'quantity':
+            self.total_value += delta * self.columns['current_price'][row]
+            self.total_cost += delta * self.columns['purchase_price'][row]
+            self.total_change += delta * self.columns['change'][row]
+        elif name == 'current_price':
+            self.total_value += delta * quantity
+        elif name == 'purchase_price':
+            self.total_cost += delta * quantity
+        elif name == 'change':
+            self.total_change += delta * quantity
+        elif name == 'change_percent' and delta:
+            self._versions[row] += 1
+            self._push_performance(row)
+        self._verify()
+
+    def touch(self, row: int):
+        self.dirty.add(row)
+
+    def take_dirty(self) -> List[int]:
+        """Rows changed since the last call, in row order; clears the set."""
+        rows, self.dirty = sorted(self.dirty), set()
+        return rows
+
+    def _add_contribution(self, row: int, sign: float):
+        quantity = self.columns['quantity'][row]
+        self.total_value += sign * quantity * self.columns['current_price'][row]
+        self.total_cost += sign * quantity * self.columns['purchase_price'][row]
+        self.total_change += sign * quantity * self.columns['change'][row]
+
+    def _push_performance(self, row: int):
+        change_percent = float(self.columns['change_percent'][row])
+        version = self._versions[row]
+        heapq.heappush(self._best_heap, (-change_percent, row, version))
+        heapq.heappush(self._worst_heap, (change_percent, row, version))
+        if len(self._best_heap) > 2 * self.live_count + 64:
+            self._rebuild_heaps()
+
+    def _rebuild_heaps(self):
+        rows = np.flatnonzero(self.alive[:self.size])
+        change_percents = self.columns['change_percent'][rows]
+        versions = [self._versions[row] for row in rows.tolist()]
+        self._best_heap = list(zip((-change_percents).tolist(), rows.tolist(), versions))
+        self._worst_heap = list(zip(change_percents.tolist(), rows.tolist(), versions))
+        heapq.heapify(self._best_heap)
+        heapq.heapify(self._worst_heap)
+
+    def _top(self, heap: List[Tuple[float, int, int]]) -> Optional[int]:
+        while heap:
+            _, row, version = heap[0]
+            if row < self.size and self.alive[row] and self._versions[row] == version:
+                return row
+            heapq.heappop(heap)
+        return None
+
+    def best_row(self) -> Optional[int]:
+        """Row with the highest change_percent (requires ``track_aggregates``)."""
+        return self._top(self._best_heap)
+
+    def worst_row(self) -> Optional[int]:
+        return self._top(self._worst_heap)
+
+    def recompute(self) -> Dict[str, float]:
+        """The running totals computed from scratch over the columns."""
+        quantity = self.view('quantity')
+        return {
+            'total_value': float((quantity * self.view('current_price')).sum()),
+            'total_cost': float((quantity * self.view('purchase_price')).sum()),
+            'total_change': float((quantity * self.view('change')).sum())
+        }
+
+    def resync(self):
+        """Reset the running totals from a full recompute, dropping accumulated rounding."""
+        for name, value in self.recompute().items():
+            setattr(self, name, value)
+
+    def _verify(self):
+        if not (self.check and self.track_aggregates):
+            return
+        for name, expected in self.recompute().items():
+            actual = getattr(self, name)
+            if not np.isclose(actual, expected, rtol=1e-9, atol=1e-6):
+                raise AssertionError(f"{name} drifted: running {actual!r}, recomputed {expected!r}")
+        if self.live_count:
+            change_percents = np.where(self.alive_view(), self.view('change_percent'), np.nan)
+            if change_percents[self.best_row()] != np.nanmax(change_percents):
+                raise AssertionError("best performer heap out of date")
+            if change_percents[self.worst_row()] != np.nanmin(change_percents):
+                raise AssertionError("worst performer heap out of date")
+
+    def compact(self) -> Optional[np.ndarray]:
+        """Drop tombstoned rows; returns the old indices of the kept rows, or None if nothing moved."""
+        if not self.dead:
+            return None
+        kept = np.flatnonzero(self.alive[:self.size])
+        count = len(kept)
+        self.symbols[:count] = self.symbols[kept]
+        self.symbols[count:self.size] = None
+        self.alive[:count] = True
+        self.alive[count:self.size] = False
+        for column in self.columns.values():
+            column[:count] = column[kept]
+            column[count:self.size] = 0.0
+        self.size = count
+        self.dead = 0
+        self._versions = [0] * count
+        if self.dirty:
+            self.dirty = set(np.searchsorted(kept, sorted(self.dirty)).tolist())
+        if self.track_aggregates:
+            self._rebuild_heaps()
+            self.resync()
+        return kept
+
+    @property
+    def live_count(self) -> int:
+        return self.size - self.dead
+
+    def row(self, row: int) -> Dict[str, float]:
+        return {name: float(column[row]) for name, column in self.columns.items()}
+
+    def alive_view(self) -> np.ndarray:
+        return self.alive[:self.size]
+
+    def view(self, name: str) -> np.ndarray:
+        """Rows in use of a column, tombstones included, as a view.
+
+        Writing through the view bypasses the running aggregates; use set().
+        """
+        return self.columns[name][:self.size]
+
+    def symbol_view(self) -> np.ndarray:
+        return self.symbols[:self.size]
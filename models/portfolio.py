@@ -1,11 +1,56 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from models.holdings import HoldingsTable
 from models.stock import Stock
 
 class Portfolio:
-    def __init__(self):
-        self.stocks: List[Stock] = []
-    
-    def add_stock(self, symbol: str, quantity: int, price: float):
+    """Holdings kept column-wise in a HoldingsTable.
+
+    ``stocks`` lists the Stock views in insertion order; treat it as
+    read-only and go through add_stock/add_holding/remove_stock to change
+    membership. A symbol -> row index makes lookups and removals O(1):
+    removing only tombstones the row, and the table is compacted lazily
+    the next time something needs positions.
+
+    Headline totals and best/worst performer are running aggregates of the
+    table, adjusted by deltas as holdings change, so reading them is O(1)
+    and a price tick costs O(log n). Per-holding arrays (market values,
+    weights) are vectorized passes. ``check_consistency`` makes every write
+    verify the running state against a full recompute, for tests.
+
+    take_changes() hands storage the holdings written and the symbols
+    removed since it was last called, so saves can be incremental.
+    """
+
+    def __init__(self, check_consistency: bool = False):
+        self.holdings = HoldingsTable(track_aggregates=True, check=check_consistency)
+        self._rows: List[Optional[Stock]] = []
+        self._index: Dict[str, int] = {}
+        self._stocks: Optional[List[Stock]] = []
+        self._removed: Set[str] = set()
+
+    def _compact(self):
+        kept = self.holdings.compact()
+        if kept is None:
+            return
+        self._rows = [self._rows[old_row] for old_row in kept]
+        self._index = {}
+        for row, stock in enumerate(self._rows):
+            stock._row = row
+            self._index[stock.symbol] = row
+        self._stocks = None
+
+    @property
+    def stocks(self) -> List[Stock]:
+        self._compact()
+        if self._stocks is None:
+            self._stocks = list(self._rows)
+        return self._stocks
+
+    def add_stock(self, symbol: str, quantity: int, price: float, when: Optional[datetime] = None):
 
         existing_stock = self.get_stock(symbol)
         if existing_stock:
@@ -13,26 +58,144 @@ class Portfolio:
             existing_stock.quantity += quantity
         else:
 
-            stock = Stock(symbol, quantity, price)
-            self.stocks.append(stock)
-    
+            stock = Stock(symbol, quantity, price, when=when)
+            self.add_holding(stock)
+
+    def add_holding(self, stock: Stock):
+        """Take ownership of an already built Stock (e.g. one loaded from disk).
+
+        A symbol that is already held is merged into the existing holding at
+        the incoming purchase price.
+        """
+        existing_stock = self.get_stock(stock.symbol)
+        if existing_stock:
+            existing_stock.add_quantity(stock.quantity, stock.purchase_price)
+            return
+
+        row = stock._move_to(self.holdings)
+        self._rows.append(stock)
+        self._index[stock.symbol] = row
+        if self._stocks is not None:
+            self._stocks.append(stock)
+
+    def extend(self, symbols: np.ndarray, last_updated: List[datetime], purchase_dates: List[datetime],
+               **columns: np.ndarray) -> List[Stock]:
+        """Add many holdings from column arrays (see HoldingsTable.COLUMNS) in one pass.
+
+        Symbols that are already held or repeat within ``symbols`` are merged
+        one by one through add_holding, as if added in order.
+        """
+        symbols = np.asarray(symbols, dtype=object)
+        _, first = np.unique(symbols, return_index=True)
+        fresh = np.zeros(len(symbols), dtype=bool)
+        fresh[first] = True
+        if self._index:
+            fresh &= np.array([symbol not in self._index for symbol in symbols], dtype=bool)
+
+        positions = np.flatnonzero(fresh)
+        rows = self.holdings.extend(symbols[positions], **{name: column[positions] for name, column in columns.items()})
+        rows = rows.tolist()
+        added = [Stock._bound(self.holdings, row, last_updated[position], purchase_dates[position])
+                 for row, position in zip(rows, positions.tolist())]
+        self._rows.extend(added)
+        self._index.update(zip(symbols[positions].tolist(), rows))
+        self._stocks = None
+
+        for position in np.flatnonzero(~fresh):
+            stock = Stock(symbols[position], 0, columns['initial_price'][position])
+            for name, column in columns.items():
+                setattr(stock, name, float(column[position]))
+            stock.last_updated = last_updated[position]
+            stock.purchase_date = purchase_dates[position]
+            self.add_holding(stock)
+        return added
+
     def remove_stock(self, symbol: str):
-        self.stocks = [stock for stock in self.stocks if stock.symbol != symbol.upper()]
-    
+        row = self._index.pop(symbol.upper(), None)
+        if row is None:
+            return
+
+        stock = self._rows[row]
+        self._removed.add(stock.symbol)
+        stock._detach()
+        self.holdings.remove(row)
+        self._rows[row] = None
+        self._stocks = None
+        if self.holdings.dead > len(self._index):
+            self._compact()
+
+    def take_changes(self) -> Tuple[List[Stock], List[str]]:
+        """(holdings changed, symbols removed) since the last call.
+
+        A symbol removed and added again shows up in both; apply removals first.
+        """
+        self._compact()
+        changed = [self._rows[row] for row in self.holdings.take_dirty()]
+        removed, self._removed = sorted(self._removed), set()
+        return changed, removed
+
+    def requeue_removed(self, symbols: List[str]):
+        """Hand removals back to the next take_changes() (after a failed save)."""
+        self._removed.update(symbols)
+
     def get_stock(self, symbol: str) -> Optional[Stock]:
-        for stock in self.stocks:
-            if stock.symbol == symbol.upper():
-                return stock
-        return None
-    
+        row = self._index.get(symbol.upper())
+        return self._rows[row] if row is not None else None
+
+    def index_of(self, symbol: str) -> Optional[int]:
+        """Position of a holding in ``stocks`` (and the portfolio table)."""
+        self._compact()
+        return self._index.get(symbol.upper())
+
+    def get_market_values(self) -> np.ndarray:
+        """Value per holding, in ``stocks`` order."""
+        self._compact()
+        return self.holdings.view('quantity') * self.holdings.view('current_price')
+
     def get_total_value(self) -> float:
-        return sum(stock.get_current_value() for stock in self.stocks)
-    
+        return float(self.holdings.total_value)
+
     def get_total_gain_loss(self) -> float:
-        return sum(stock.get_total_gain_loss() for stock in self.stocks)
-    
+        return float(self.holdings.total_value - self.holdings.total_cost)
+
+    def get_total_change(self) -> float:
+        return float(self.holdings.total_change)
+
+    def get_weights(self) -> np.ndarray:
+        """Share of total value per holding in percent, in ``stocks`` order."""
+        values = self.get_market_values()
+        total = values.sum()
+        if total <= 0:
+            return np.zeros_like(values)
+        return values / total * 100
+
+    def get_best_performer(self) -> Optional[Stock]:
+        row = self.holdings.best_row()
+        return self._rows[row] if row is not None else None
+
+    def get_worst_performer(self) -> Optional[Stock]:
+        row = self.holdings.worst_row()
+        return self._rows[row] if row is not None else None
+
+    def summary(self) -> Dict:
+        """Headline metrics for the dashboard, read from the running aggregates."""
+        total_value = self.get_total_value()
+        total_change = self.get_total_change()
+        base_value = total_value - total_change
+        return {
+            'total_value': total_value,
+            'total_change': total_change,
+            'total_change_percent': total_change / base_value * 100 if base_value > 0 else 0,
+            'count': len(self._index),
+            'best_performer': self.get_best_performer(),
+            'worst_performer': self.get_worst_performer()
+        }
+
     def is_empty(self) -> bool:
-        return len(self.stocks) == 0
-    
+        return len(self._index) == 0
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._index
+
     def __len__(self):
-        return len(self.stocks)
\ No newline at end of file
+        return len(self._index)
@@ -0,0 +1,466 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+TimeLike = Union[datetime, float]
+
+
+def to_epoch(when: TimeLike) -> float:
+    return when.timestamp() if isinstance(when, datetime) else float(when)
+
+
+class PriceWindow:
+    """A time range of a PriceHistory; the columns are views, not copies."""
+    __slots__ = ('timestamps', 'prices', 'changes', 'change_percents')
+
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray, changes: np.ndarray,
+                 change_percents: np.ndarray):
+        self.timestamps = timestamps
+        self.prices = prices
+        self.changes = changes
+        self.change_percents = change_percents
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def datetimes(self) -> List[datetime]:
+        return [datetime.fromtimestamp(timestamp) for timestamp in self.timestamps]
+
+    def entries(self) -> List[Dict]:
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(timestamp),
+                'price': float(price),
+                'change': float(change),
+                'change_percent': float(change_percent)
+            } for timestamp, price, change, change_percent
+            in zip(self.timestamps, self.prices, self.changes, self.change_percents)
+        ]
+
+
+class RingColumns:
+    """Column-wise ring buffer of float64 points, oldest first.
+
+    Each point is written twice, at its slot and at slot + size, so the
+    live points are always one contiguous slice of the backing array:
+    column accessors return views and appends are O(1) without allocating.
+    Storage starts small and doubles up to ``capacity``, after which the
+    oldest point is overwritten; ``capacity=None`` grows without bound.
+    Points are expected in timestamp order (field 0), so range lookups
+    bisect the timestamp column.
+    """
+    FIELDS: Tuple[str, ...] = ('timestamp',)
+    INITIAL_SIZE = 64
+
+    def __init__(self, capacity: Optional[int] = 100):
+        self.capacity = None if capacity is None else max(1, capacity)
+        self._size = self.INITIAL_SIZE if capacity is None else min(self.capacity, self.INITIAL_SIZE)
+        self._data = np.zeros((len(self.FIELDS), 2 * self._size))
+        self._start = 0
+        self._count = 0
+
+    def _grow(self):
+        size = self._size * 2 if self.capacity is None else min(self.capacity, self._size * 2)
+        live = self._data[:, self._start:self._start + self._count]
+        data = np.zeros((len(self.FIELDS), 2 * size))
+        data[:, :self._count] = live
+        data[:, size:size + self._count] = live
+        self._data = data
+        self._size = size
+        self._start = 0
+
+    def _append(self, point: Sequence[float]):
+        if self._count == self._size and (self.capacity is None or self._size < self.capacity):
+            self._grow()
+        if self._count < self._size:
+            slot = (self._start + self._count) % self._size
+            self._count += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self._size
+        self._data[:, slot] = point
+        self._data[:, slot + self._size] = point
+
+    def _set_last(self, field: int, value: float):
+        slot = (self._start + self._count - 1) % self._size
+        self._data[field, slot] = value
+        self._data[field, slot + self._size] = value
+
+    def _last(self, field: int) -> float:
+        return self._data[field, self._start + self._count - 1]
+
+    def _column(self, field: int) -> np.ndarray:
+        return self._data[field, self._start:self._start + self._count]
+
+    def _range(self, start: Optional[TimeLike], end: Optional[TimeLike]) -> Tuple[int, int]:
+        timestamps = self._column(0)
+        first = 0 if start is None else int(np.searchsorted(timestamps, to_epoch(start), side='left'))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, to_epoch(end), side='right'))
+        return first, max(first, last)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._column(0)
+
+    def drop_before(self, timestamp: float):
+        """Forget every point older than ``timestamp``."""
+        dropped = int(np.searchsorted(self._column(0), timestamp, side='left'))
+        if dropped:
+            self._start = (self._start + dropped) % self._size
+            self._count -= dropped
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+
+    def points(self) -> np.ndarray:
+        """A copy of the live points, one row per field, oldest first."""
+        return self._data[:, self._start:self._start + self._count].copy()
+
+    def load(self, points: np.ndarray):
+        """Replace the contents with ``points`` (one row per field), keeping the newest that fit."""
+        count = points.shape[1]
+        if self.capacity is not None and count > self.capacity:
+            points = points[:, count - self.capacity:]
+            count = self.capacity
+        size = self.INITIAL_SIZE
+        while size < count:
+            size *= 2
+        if self.capacity is not None:
+            size = min(size, self.capacity)
+        self._data = np.zeros((len(self.FIELDS), 2 * size))
+        self._data[:, :count] = points
+        self._data[:, size:size + count] = points
+        self._size = size
+        self._start = 0
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+
+class PriceHistory(RingColumns):
+    """Ring buffer of price ticks.
+
+    Indexing and iteration still yield the old entry dicts
+    (``{'timestamp': datetime, 'price', 'change', 'change_percent'}``) for
+    code that wants them; the time-range queries (between, since,
+    last_days, as_of) bisect the timestamp column and return views.
+    """
+    FIELDS = ('timestamp', 'price', 'change', 'change_percent')
+
+    def append(self, timestamp: float, price: float, change: float = 0.0, change_percent: float = 0.0):
+        self._append((timestamp, price, change, change_percent))
+
+    def append_entry(self, entry: Dict):
+        self.append(to_epoch(entry['timestamp']), entry['price'],
+                    entry.get('change', 0.0), entry.get('change_percent', 0.0))
+
+    def extend(self, entries: Iterable[Dict]):
+        for entry in entries:
+            self.append_entry(entry)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict], capacity: Optional[int] = 100) -> 'PriceHistory':
+        history = cls(capacity)
+        history.extend(entries)
+        return history
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self._column(1)
+
+    @property
+    def changes(self) -> np.ndarray:
+        return self._column(2)
+
+    @property
+    def change_percents(self) -> np.ndarray:
+        return self._column(3)
+
+    def between(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> PriceWindow:
+        """Points with start <= timestamp <= end; either bound may be left open."""
+        first, last = self._range(start, end)
+        offset = self._start
+        return PriceWindow(*(self._data[field, offset + first:offset + last] for field in range(len(self.FIELDS))))
+
+    def since(self, start: TimeLike) -> PriceWindow:
+        return self.between(start, None)
+
+    def last_days(self, days: float, now: Optional[datetime] = None) -> PriceWindow:
+        return self.since((now or datetime.now()) - timedelta(days=days))
+
+    def as_of(self, when: TimeLike) -> Optional[Dict]:
+        """The latest point at or before ``when``, or None if history starts later."""
+        position = int(np.searchsorted(self.timestamps, to_epoch(when), side='right')) - 1
+        if position < 0:
+            return None
+        return self._entry(self._start + position)
+
+    def _entry(self, position: int) -> Dict:
+        timestamp, price, change, change_percent = self._data[:, position]
+        return {
+            'timestamp': datetime.fromtimestamp(timestamp),
+            'price': float(price),
+            'change': float(change),
+            'change_percent': float(change_percent)
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(self._start + i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("price history index out of range")
+        return self._entry(self._start + index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._count):
+            yield self._entry(self._start + i)
+
+    def to_list(self) -> List[Dict]:
+        return list(self)
+
+
+def next_midnight(timestamp: float) -> float:
+    """Start of the local day after the one ``timestamp`` falls in (where a daily bar ends)."""
+    midnight = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight + timedelta(days=1)).timestamp()
+
+
+class BarSeries(RingColumns):
+    """OHLC bars keyed by bucket start time, built up one tick at a time."""
+    FIELDS = ('timestamp', 'open', 'high', 'low', 'close')
+
+    def add(self, bucket: float, price: float):
+        """Fold a tick into the bar for ``bucket``, opening a new bar when the bucket moves on."""
+        if self._count and self._last(0) == bucket:
+            if price > self._last(2):
+                self._set_last(2, price)
+            if price < self._last(3):
+                self._set_last(3, price)
+            self._set_last(4, price)
+        elif not self._count or bucket > self._last(0):
+            self._append((bucket, price, price, price, price))
+
+    def append_bar(self, entry: Dict):
+        self._append((to_epoch(entry['timestamp']), entry['open'], entry['high'], entry['low'], entry['close']))
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        return float(self._data[0, self._start]) if self._count else None
+
+    @property
+    def closes(self) -> np.ndarray:
+        return self._column(4)
+
+    def closes_between(self, start: Optional[TimeLike], end: Optional[TimeLike]) -> Tuple[np.ndarray, np.ndarray]:
+        first, last = self._range(start, end)
+        offset = self._start
+        return self._data[0, offset + first:offset + last], self._data[4, offset + first:offset + last]
+
+    def price_as_of(self, when: float, bar_end: Callable[[float], float]) -> Optional[Tuple[float, float]]:
+        """(bar start, price) of the last price known at ``when``.
+
+        A bar still open at ``when`` (``bar_end(start) > when``) closes on
+        later ticks, so then this is the close of the bar before it, or the
+        open of the first bar.
+        """
+        position = int(np.searchsorted(self.timestamps, when, side='right')) - 1
+        if position < 0:
+            return None
+        start = float(self._data[0, self._start + position])
+        if bar_end(start) <= when:
+            return start, float(self._data[4, self._start + position])
+        if position == 0:
+            return float(self._data[0, self._start]), float(self._data[1, self._start])
+        return float(self._data[0, self._start + position - 1]), float(self._data[4, self._start + position - 1])
+
+    def to_list(self) -> List[Dict]:
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(timestamp),
+                'open': float(open_), 'high': float(high), 'low': float(low), 'close': float(close)
+            } for timestamp, open_, high, low, close in self._data[:, self._start:self._start + self._count].T
+        ]
+
+
+class TieredPriceHistory:
+    """Price history with tiered retention, downsampled as ticks arrive.
+
+    * ``raw``: every tick of the current day (session), up to ``raw_capacity``
+    * ``minutes``: 1-minute OHLC bars for the last ``minute_days`` days
+    * ``days``: daily OHLC bars, kept indefinitely
+
+    Each tick updates all three tiers in O(1), so memory per stock stays
+    bounded while long-range queries still have data. The list-like
+    interface (len, indexing, iteration, ``prices``) is the raw tier, as
+    before; between/last_days/as_of read the finest tier available for
+    each part of the range.
+    """
+    MINUTE = 60.0
+
+    def __init__(self, raw_capacity: int = 20000, minute_days: int = 30):
+        self.raw = PriceHistory(raw_capacity)
+        self.minutes = BarSeries(minute_days * 24 * 60)
+        self.days = BarSeries(None)
+        self.minute_retention = minute_days * 86400.0
+        self._day_start: Optional[float] = None
+        self._day_end: Optional[float] = None
+
+    def _enter_day(self, timestamp: float):
+        midnight = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+        self._day_start = midnight.timestamp()
+        self._day_end = next_midnight(timestamp)
+        # A new session: earlier ticks survive only as minute and daily bars.
+        self.raw.drop_before(self._day_start)
+
+    def append(self, timestamp: float, price: float, change: float = 0.0, change_percent: float = 0.0):
+        if self._day_start is None or not self._day_start <= timestamp < self._day_end:
+            self._enter_day(timestamp)
+        self.raw.append(timestamp, price, change, change_percent)
+        self.minutes.add(timestamp - timestamp % self.MINUTE, price)
+        self.days.add(self._day_start, price)
+
+        cutoff = timestamp - self.minute_retention
+        if self.minutes.first_timestamp < cutoff:
+            self.minutes.drop_before(cutoff)
+
+    def append_entry(self, entry: Dict):
+        self.append(to_epoch(entry['timestamp']), entry['price'],
+                    entry.get('change', 0.0), entry.get('change_percent', 0.0))
+
+    def extend(self, entries: Iterable[Dict]):
+        for entry in entries:
+            self.append_entry(entry)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict]) -> 'TieredPriceHistory':
+        """Rebuild from raw ticks only (older saves), downsampling them on the way in."""
+        history = cls()
+        history.extend(entries)
+        return history
+
+    @classmethod
+    def restore(cls, entries: Iterable[Dict], minute_bars: Iterable[Dict],
+                daily_bars: Iterable[Dict]) -> 'TieredPriceHistory':
+        """Rebuild from saved tiers; the raw ticks are already part of the bars."""
+        history = cls()
+        for bar in minute_bars:
+            history.minutes.append_bar(bar)
+        for bar in daily_bars:
+            history.days.append_bar(bar)
+        history.raw.extend(entries)
+        if len(history.raw):
+            history._enter_day(float(history.raw.timestamps[-1]))
+        return history
+
+    def packed(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(raw, minute, daily) point arrays, one row per field, for binary snapshots."""
+        return self.raw.points(), self.minutes.points(), self.days.points()
+
+    @classmethod
+    def unpack(cls, raw: np.ndarray, minute_bars: np.ndarray, daily_bars: np.ndarray) -> 'TieredPriceHistory':
+        history = cls()
+        history.raw.load(raw)
+        history.minutes.load(minute_bars)
+        history.days.load(daily_bars)
+        if len(history.raw):
+            history._enter_day(float(history.raw.timestamps[-1]))
+        return history
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.raw.timestamps
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self.raw.prices
+
+    @property
+    def changes(self) -> np.ndarray:
+        return self.raw.changes
+
+    @property
+    def change_percents(self) -> np.ndarray:
+        return self.raw.change_percents
+
+    def between(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> PriceWindow:
+        """Prices in [start, end] from the finest tier covering each part of the range.
+
+        A range inside the current session is answered with views of the
+        raw ticks; longer ranges stitch daily and minute closes in front of
+        them (a copy), with changes recomputed point to point.
+        """
+        low = -np.inf if start is None else to_epoch(start)
+        high = np.inf if end is None else to_epoch(end)
+        raw_from = float(self.raw.timestamps[0]) if len(self.raw) else np.inf
+        if low >= raw_from:
+            return self.raw.between(start, end)
+
+        minute_from = self.minutes.first_timestamp
+        minute_from = raw_from if minute_from is None else min(minute_from, raw_from)
+        raw_bucket = raw_from - raw_from % self.MINUTE if len(self.raw) else np.inf
+
+        pieces = [
+            self.days.closes_between(low, min(high, minute_from - 86400)),
+            self.minutes.closes_between(max(low, minute_from), min(high, raw_bucket - 1e-6)),
+        ]
+        raw_window = self.raw.between(max(low, raw_from), high) if len(self.raw) else None
+        if raw_window is not None:
+            pieces.append((raw_window.timestamps, raw_window.prices))
+
+        timestamps = np.concatenate([piece[0] for piece in pieces])
+        prices = np.concatenate([piece[1] for piece in pieces])
+        changes = np.diff(prices, prepend=prices[:1]) if len(prices) else prices.copy()
+        previous = prices - changes
+        change_percents = np.divide(changes * 100, previous, out=np.zeros_like(changes), where=previous > 0)
+        return PriceWindow(timestamps, prices, changes, change_percents)
+
+    def since(self, start: TimeLike) -> PriceWindow:
+        return self.between(start, None)
+
+    def last_days(self, days: float, now: Optional[datetime] = None) -> PriceWindow:
+        return self.since((now or datetime.now()) - timedelta(days=days))
+
+    def as_of(self, when: TimeLike) -> Optional[Dict]:
+        when = to_epoch(when)
+        if len(self.raw) and when >= self.raw.timestamps[0]:
+            return self.raw.as_of(when)
+        for bars, bar_end in ((self.minutes, lambda start: start + self.MINUTE), (self.days, next_midnight)):
+            first = bars.first_timestamp
+            if first is not None and when >= first:
+                timestamp, price = bars.price_as_of(when, bar_end)
+                return {'timestamp': datetime.fromtimestamp(timestamp), 'price': price,
+                        'change': 0.0, 'change_percent': 0.0}
+        return None
+
+    def previous_point(self) -> Optional[Tuple[float, float]]:
+        """(timestamp, price) of the price before the newest tick, or None if there is none.
+
+        The first tick of a session has no raw predecessor, so the last
+        minute bar (or else daily bar) close before the session stands in.
+        """
+        if len(self.raw) >= 2:
+            return float(self.raw.timestamps[-2]), float(self.raw.prices[-2])
+        if not len(self.raw):
+            return None
+        for bars in (self.minutes, self.days):
+            timestamps, closes = bars.closes_between(None, self._day_start - 1e-6)
+            if len(closes):
+                return float(timestamps[-1]), float(closes[-1])
+        return None
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        return self.raw[index]
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.raw)
+
+    def to_list(self) -> List[Dict]:
+        return self.raw.to_list()
@@ -1,17 +1,52 @@
 from datetime import datetime, timedelta
 import json
 
+from models.holdings import HoldingsTable
+from models.corporate_actions import CorporateActions
+from models.price_history import PriceWindow, TieredPriceHistory
+
+
+def _column(name):
+    def getter(self):
+        return float(self._table.columns[name][self._row])
+
+    def setter(self, value):
+        self._table.set(name, self._row, value)
+
+    return property(getter, setter)
+
+
 class Stock:
-    def __init__(self, symbol, quantity, initial_price, purchase_price=None):
+    """One holding. Its numeric fields live in a row of a HoldingsTable.
+
+    A standalone Stock owns a private one-row table; Portfolio.add_holding
+    moves the row into the portfolio's table so aggregates can be computed
+    column-wise, and removing the holding gives the Stock its own row back.
+    """
+    __slots__ = (
+        'symbol', '_table', '_row', 'last_updated', 'purchase_date',
+        'daily_high', 'daily_low', 'volume', 'market_cap', 'pe_ratio', 'dividend_yield',
+        '_price_history', '_corporate_actions', 'alerts', 'notes'
+    )
+
+    initial_price = _column('initial_price')
+    purchase_price = _column('purchase_price')
+    current_price = _column('current_price')
+    change = _column('change')
+    change_percent = _column('change_percent')
+
+    def __init__(self, symbol, quantity, initial_price, purchase_price=None, when=None):
         self.symbol = symbol.upper()
-        self.quantity = quantity
-        self.initial_price = initial_price
-        self.purchase_price = purchase_price if purchase_price is not None else initial_price
-        self.current_price = initial_price
-        self.change = 0
-        self.change_percent = 0
-        self.last_updated = datetime.now()
-        self.purchase_date = datetime.now()
+        self._table = HoldingsTable(capacity=1)
+        self._row = self._table.append(
+            self.symbol,
+            quantity=quantity,
+            initial_price=initial_price,
+            purchase_price=purchase_price if purchase_price is not None else initial_price,
+            current_price=initial_price
+        )
+        self.last_updated = when or datetime.now()
+        self.purchase_date = self.last_updated
         
       
         self.daily_high = initial_price
@@ -21,18 +56,81 @@ class Stock:
         self.pe_ratio = 0
         self.dividend_yield = 0
         
-        self.price_history = []
+        self.price_history = TieredPriceHistory()
+        self.corporate_actions = CorporateActions()
         self.alerts = []
         self.notes = ""
       
-        self.price_history.append({
-            'timestamp': datetime.now(),
-            'price': initial_price,
-            'change': 0,
-            'change_percent': 0
-        })
+        self.price_history.append(self.last_updated.timestamp(), initial_price)
     
-    def update_price(self, new_price, volume=None, daily_high=None, daily_low=None):
+    @classmethod
+    def _bound(cls, table: HoldingsTable, row: int, last_updated: datetime, purchase_date: datetime) -> 'Stock':
+        """A Stock over a row already filled in ``table``, for bulk loading.
+
+        Skips the per-stock table and history setup of __init__; the price
+        history and corporate actions are created empty on first use.
+        """
+        stock = cls.__new__(cls)
+        stock.symbol = table.symbols[row]
+        stock._table = table
+        stock._row = row
+        stock.last_updated = last_updated
+        stock.purchase_date = purchase_date
+        stock.daily_high = stock.daily_low = float(table.columns['current_price'][row])
+        stock.volume = 0
+        stock.market_cap = 0
+        stock.pe_ratio = 0
+        stock.dividend_yield = 0
+        stock._price_history = None
+        stock._corporate_actions = None
+        stock.alerts = []
+        stock.notes = ""
+        return stock
+
+    @property
+    def price_history(self) -> TieredPriceHistory:
+        if self._price_history is None:
+            self._price_history = TieredPriceHistory()
+        return self._price_history
+
+    @price_history.setter
+    def price_history(self, history: TieredPriceHistory):
+        self._price_history = history
+
+    @property
+    def corporate_actions(self) -> CorporateActions:
+        if self._corporate_actions is None:
+            self._corporate_actions = CorporateActions()
+        return self._corporate_actions
+
+    @corporate_actions.setter
+    def corporate_actions(self, actions: CorporateActions):
+        self._corporate_actions = actions
+
+    @property
+    def quantity(self):
+        quantity = float(self._table.columns['quantity'][self._row])
+        return int(quantity) if quantity.is_integer() else quantity
+
+    @quantity.setter
+    def quantity(self, value):
+        self._table.set('quantity', self._row, value)
+
+    def _move_to(self, table: HoldingsTable) -> int:
+        """Append this stock's numeric fields to ``table`` and read them from there."""
+        row = table.append(self.symbol, **self._table.row(self._row))
+        self._table = table
+        self._row = row
+        return row
+
+    def _detach(self):
+        """Copy the row out of a shared table before it is removed there."""
+        table = HoldingsTable(capacity=1)
+        row = table.append(self.symbol, **self._table.row(self._row))
+        self._table = table
+        self._row = row
+
+    def update_price(self, new_price, volume=None, daily_high=None, daily_low=None, when=None):
         old_price = self.current_price
         self.current_price = new_price
         
@@ -55,21 +153,22 @@ class Stock:
         if volume is not None:
             self.volume = volume
             
-        self.last_updated = datetime.now()
-        
+        self.last_updated = when or datetime.now()
         
-        self.price_history.append({
-            'timestamp': datetime.now(),
-            'price': new_price,
-            'change': new_price - old_price,
-            'change_percent': ((new_price - old_price) / old_price * 100) if old_price > 0 else 0
-        })
         
-        
-        if len(self.price_history) > 100:
-            self.price_history = self.price_history[-100:]
+        self.price_history.append(
+            self.last_updated.timestamp(),
+            new_price,
+            new_price - old_price,
+            ((new_price - old_price) / old_price * 100) if old_price > 0 else 0
+        )
     
+    def touch(self):
+        """Flag this holding as changed for storage after editing alerts, notes or similar."""
+        self._table.touch(self._row)
+
     def update_fundamentals(self, market_cap=None, pe_ratio=None, dividend_yield=None):
+        self.touch()
         if market_cap is not None:
             self.market_cap = market_cap
         if pe_ratio is not None:
@@ -94,17 +193,24 @@ class Stock:
             return ((self.current_price - self.purchase_price) / self.purchase_price) * 100
         return 0
     
+    def _previous_price(self):
+        # Split-adjusted, so a split between the last two ticks is not a loss.
+        previous = self.price_history.previous_point()
+        if previous is None:
+            return None
+        timestamp, price = previous
+        return price * self.corporate_actions.factor_at(timestamp)
+
     def get_day_gain_loss(self):
-        if len(self.price_history) >= 2:
-            today_start = self.price_history[-2]['price'] 
+        today_start = self._previous_price()
+        if today_start is not None:
             return (self.current_price - today_start) * self.quantity
         return 0
     
     def get_day_gain_loss_percent(self):
-        if len(self.price_history) >= 2:
-            today_start = self.price_history[-2]['price']
-            if today_start > 0:
-                return ((self.current_price - today_start) / today_start) * 100
+        today_start = self._previous_price()
+        if today_start is not None and today_start > 0:
+            return ((self.current_price - today_start) / today_start) * 100
         return 0
     
     def get_price_range(self):
@@ -141,6 +247,8 @@ class Stock:
             'triggered': False
         }
         self.alerts.append(alert)
+        self.touch()
+        return alert
     
     def check_alerts(self):
         triggered_alerts = []
@@ -165,18 +273,29 @@ class Stock:
         
         return triggered_alerts
     
-    def get_recent_price_history(self, days=7):
-        if not self.price_history:
-            return []
-        
- 
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_history = [
-            entry for entry in self.price_history 
-            if entry['timestamp'] >= cutoff_date
-        ]
-        
-        return recent_history
+    def get_recent_price_history(self, days=7, adjusted=True):
+        return self.get_price_window(datetime.now() - timedelta(days=days), adjusted=adjusted).entries()
+
+    def get_price_window(self, start=None, end=None, adjusted=True):
+        """Price history between two datetimes (or epoch seconds) as array views.
+
+        With ``adjusted`` prices before a split or dividend are scaled by its
+        factor; that costs a copy only when an action falls inside the window.
+        """
+        window = self.price_history.between(start, end)
+        if adjusted and len(window) and self.corporate_actions.affects(window.timestamps[0]):
+            factors = self.corporate_actions.factors(window.timestamps)
+            window = PriceWindow(window.timestamps, window.prices * factors,
+                                 window.changes * factors, window.change_percents)
+        return window
+
+    def get_price_as_of(self, when, adjusted=True):
+        entry = self.price_history.as_of(when)
+        if not entry:
+            return None
+        if adjusted:
+            return entry['price'] * self.corporate_actions.factor_at(entry['timestamp'].timestamp())
+        return entry['price']
     
     def reset_daily_metrics(self):
         self.daily_high = self.current_price
@@ -203,15 +322,49 @@ class Stock:
         else:
             self.quantity -= quantity
     
-    def split_stock(self, ratio):
+    SPLIT_FIELDS = ('quantity', 'purchase_price', 'current_price', 'initial_price', 'daily_high', 'daily_low')
+
+    def _apply_split(self, ratio):
         self.quantity *= ratio
         self.purchase_price /= ratio
         self.current_price /= ratio
         self.initial_price /= ratio
-        
-  
-        for entry in self.price_history:
-            entry['price'] /= ratio
+        self.daily_high /= ratio
+        self.daily_low /= ratio
+
+    def split_stock(self, ratio, effective=None):
+        """Record a split; price history is adjusted when read, not rewritten."""
+        action = self.corporate_actions.add_split(ratio, effective)
+        before = [getattr(self, field) for field in self.SPLIT_FIELDS]
+        self._apply_split(ratio)
+        # Kept so undo can restore the exact values instead of accumulating float error.
+        action['holding'] = {field: [old, getattr(self, field)] for field, old in zip(self.SPLIT_FIELDS, before)}
+        return action
+
+    def record_dividend(self, amount, ex_date=None):
+        """Record a cash dividend so earlier prices read back dividend-adjusted."""
+        before = self.price_history.as_of(ex_date - timedelta(microseconds=1)) if ex_date else None
+        close_before = before['price'] if before else self.current_price
+        action = self.corporate_actions.add_dividend(amount, close_before, ex_date)
+        self.touch()
+        return action
+
+    def undo_corporate_action(self):
+        """Take back the last split or dividend; returns it, or None if there was none."""
+        action = self.corporate_actions.undo()
+        if action and action['type'] == 'split':
+            ratio = action['ratio']
+            recorded = action.get('holding', {})
+            for field in self.SPLIT_FIELDS:
+                value = getattr(self, field)
+                if field in recorded and value == recorded[field][1]:
+                    value = recorded[field][0]
+                else:
+                    # Changed since the split (a new tick or purchase), or recorded before values were kept.
+                    value = value / ratio if field == 'quantity' else value * ratio
+                setattr(self, field, value)
+        self.touch()
+        return action
     
     def to_dict(self):
         return {
@@ -238,10 +391,21 @@ class Stock:
                     'change_percent': entry['change_percent']
                 } for entry in self.price_history
             ],
+            'minute_bars': self._bars_to_dicts(self.price_history.minutes),
+            'daily_bars': self._bars_to_dicts(self.price_history.days),
+            'corporate_actions': self.corporate_actions.to_list(),
             'alerts': self.alerts,
             'notes': self.notes
         }
     
+    @staticmethod
+    def _bars_to_dicts(bars):
+        return [dict(bar, timestamp=bar['timestamp'].isoformat()) for bar in bars.to_list()]
+
+    @staticmethod
+    def _bars_from_dicts(bars):
+        return [dict(bar, timestamp=datetime.fromisoformat(bar['timestamp'])) for bar in bars]
+
     @classmethod
     def from_dict(cls, data):
         """Create stock from dictionary"""
@@ -268,7 +432,7 @@ class Stock:
         stock.notes = data.get('notes', "")
 
         if 'price_history' in data:
-            stock.price_history = [
+            entries = [
                 {
                     'timestamp': datetime.fromisoformat(entry['timestamp']),
                     'price': entry['price'],
@@ -276,7 +440,17 @@ class Stock:
                     'change_percent': entry['change_percent']
                 } for entry in data['price_history']
             ]
+            if 'minute_bars' in data or 'daily_bars' in data:
+                stock.price_history = TieredPriceHistory.restore(
+                    entries,
+                    cls._bars_from_dicts(data.get('minute_bars', [])),
+                    cls._bars_from_dicts(data.get('daily_bars', []))
+                )
+            else:
+                stock.price_history = TieredPriceHistory.from_entries(entries)
         
+        if 'corporate_actions' in data:
+            stock.corporate_actions = CorporateActions.from_list(data['corporate_actions'])
    
         if 'alerts' in data:
             stock.alerts = data['alerts']
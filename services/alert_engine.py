@@ -0,0 +1,134 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+ALERT_TYPES = ('above', 'below', 'change_percent')
+
+
+class _ThresholdList:
+    """Pending alerts of one type for one symbol, sorted by threshold."""
+
+    def __init__(self):
+        self.thresholds: List[float] = []
+        self.alerts: List[Dict] = []
+
+    def add(self, alert: Dict):
+        position = bisect_right(self.thresholds, alert['threshold'])
+        self.thresholds.insert(position, alert['threshold'])
+        self.alerts.insert(position, alert)
+
+    def remove(self, alert: Dict) -> bool:
+        position = bisect_left(self.thresholds, alert['threshold'])
+        while position < len(self.alerts) and self.thresholds[position] == alert['threshold']:
+            if self.alerts[position] is alert:
+                del self.thresholds[position]
+                del self.alerts[position]
+                return True
+            position += 1
+        return False
+
+    def pop_up_to(self, value: float) -> List[Dict]:
+        """Remove and return the alerts with threshold <= value."""
+        position = bisect_right(self.thresholds, value)
+        fired = self.alerts[:position]
+        del self.thresholds[:position]
+        del self.alerts[:position]
+        return fired
+
+    def pop_from(self, value: float) -> List[Dict]:
+        """Remove and return the alerts with threshold >= value."""
+        position = bisect_left(self.thresholds, value)
+        fired = self.alerts[position:]
+        del self.thresholds[position:]
+        del self.alerts[position:]
+        return fired
+
+    def __len__(self):
+        return len(self.alerts)
+
+
+class AlertEngine:
+    """Indexes pending price alerts so a tick only touches the ones it crosses.
+
+    Alerts stay the dicts stored in ``Stock.alerts``; the engine keeps, per
+    symbol, the untriggered ones in three threshold-sorted lists. A price
+    fires the prefix of ``above`` alerts at or below it and the suffix of
+    ``below`` alerts at or above it, and an absolute change percent fires
+    the prefix of ``change_percent`` alerts, each found by bisection. Fired
+    alerts are marked triggered, dropped from the index and collected until
+    drain() so the UI can notify about them in one batch.
+    """
+
+    def __init__(self):
+        self._books: Dict[str, Dict[str, _ThresholdList]] = {}
+        self._fired: List[Tuple[str, Dict]] = []
+
+    def _book(self, symbol: str) -> Dict[str, _ThresholdList]:
+        book = self._books.get(symbol)
+        if book is None:
+            book = {alert_type: _ThresholdList() for alert_type in ALERT_TYPES}
+            self._books[symbol] = book
+        return book
+
+    def track(self, symbol: str, alert: Dict):
+        """Index an existing alert dict; triggered or unknown-type alerts are ignored."""
+        if alert.get('triggered') or alert.get('type') not in ALERT_TYPES:
+            return
+        self._book(symbol.upper())[alert['type']].add(alert)
+
+    def add_alert(self, stock, alert_type: str, threshold: float, message: str = "") -> Dict:
+        if alert_type not in ALERT_TYPES:
+            raise ValueError(f"Unknown alert type: {alert_type}")
+        alert = stock.add_alert(alert_type, float(threshold), message)
+        self.track(stock.symbol, alert)
+        return alert
+
+    def remove_alert(self, stock, alert: Dict):
+        # By identity: two alerts with the same settings compare equal, and the journal records positions.
+        for index, candidate in enumerate(stock.alerts):
+            if candidate is alert:
+                del stock.alerts[index]
+                stock.touch()
+                break
+        book = self._books.get(stock.symbol)
+        if book is not None and alert.get('type') in book:
+            book[alert['type']].remove(alert)
+
+    def forget(self, symbol: str):
+        self._books.pop(symbol.upper(), None)
+
+    def rebuild(self, stocks):
+        """Re-index every pending alert of ``stocks`` (after loading a portfolio)."""
+        self._books = {}
+        for stock in stocks:
+            for alert in stock.alerts:
+                self.track(stock.symbol, alert)
+
+    def evaluate(self, symbol: str, price: float, change_percent: float = 0.0) -> List[Dict]:
+        """Fire the alerts crossed by this price; they are also queued for drain()."""
+        book = self._books.get(symbol.upper())
+        if book is None:
+            return []
+
+        fired = (book['above'].pop_up_to(price)
+                 + book['below'].pop_from(price)
+                 + book['change_percent'].pop_up_to(abs(change_percent)))
+        if fired:
+            now = datetime.now()
+            for alert in fired:
+                alert['triggered'] = True
+                alert['triggered_at'] = now
+                self._fired.append((symbol.upper(), alert))
+        return fired
+
+    def evaluate_stock(self, stock) -> List[Dict]:
+        return self.evaluate(stock.symbol, stock.current_price, stock.change_percent)
+
+    def drain(self) -> List[Tuple[str, Dict]]:
+        """(symbol, alert) pairs fired since the last drain, oldest first."""
+        fired, self._fired = self._fired, []
+        return fired
+
+    def pending_count(self, symbol: str = None) -> int:
+        books = [self._books.get(symbol.upper(), {})] if symbol else self._books.values()
+        return sum(len(thresholds) for book in books for thresholds in book.values())
@@ -0,0 +1,329 @@
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+
+def forward_fill(prices: np.ndarray) -> np.ndarray:
+    """Fill each column's NaN gaps with its last value; leading gaps stay NaN."""
+    # Index of the last valid row at or before each row.
+    valid = ~np.isnan(prices)
+    last_valid = np.where(valid, np.arange(len(prices))[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    filled = prices[last_valid, np.arange(prices.shape[1])]
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+def align_closes(series: List[Series]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Put (day, close) series on one day axis; gaps are forward-filled, leading gaps stay NaN.
+
+    Returns (days, prices, present), where ``present`` marks the cells a
+    series had its own close for.
+    """
+    days = np.unique(np.concatenate([series_days for series_days, _ in series])) if series else np.array([])
+    prices = np.full((len(days), len(series)), np.nan)
+    present = np.zeros(prices.shape, dtype=bool)
+    for column, (series_days, closes) in enumerate(series):
+        rows = np.searchsorted(days, series_days)
+        prices[rows, column] = closes
+        present[rows, column] = True
+    return days, forward_fill(prices), present
+
+
+def period_returns(prices: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return prices[1:] / prices[:-1] - 1
+
+
+def return_metrics(returns: np.ndarray, periods_per_year: int = 252, risk_free_rate: float = 0.0) -> Dict[str, np.ndarray]:
+    """Column-wise return, volatility, Sharpe, Sortino and max drawdown of a returns matrix (NaN = no data)."""
+    valid = ~np.isnan(returns)
+    observations = valid.sum(axis=0)
+    clean = np.where(valid, returns, 0.0)
+    excess = np.where(valid, returns - risk_free_rate / periods_per_year, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_excess = excess.sum(axis=0) / observations
+        mean = clean.sum(axis=0) / observations
+        variance = np.where(valid, (returns - mean) ** 2, 0.0).sum(axis=0) / (observations - 1)
+        volatility = np.where(observations > 1, np.sqrt(np.abs(variance)), np.nan)
+        downside = np.sqrt((np.minimum(excess, 0.0) ** 2).sum(axis=0) / observations)
+
+        equity = np.cumprod(1 + clean, axis=0)
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+        annualizer = np.sqrt(periods_per_year)
+        return {
+            'total_return': equity[-1] - 1 if len(equity) else np.zeros(returns.shape[1]),
+            'volatility': volatility * annualizer,
+            'sharpe': np.where(volatility > 0, mean_excess / volatility * annualizer, np.nan),
+            'sortino': np.where(downside > 0, mean_excess / downside * annualizer, np.nan),
+            'max_drawdown': drawdown.min(axis=0) if len(drawdown) else np.zeros(returns.shape[1]),
+            'observations': observations
+        }
+
+
+def betas(returns: np.ndarray, benchmark: np.ndarray) -> np.ndarray:
+    """Beta of each column against ``benchmark`` over the periods where both have data."""
+    bench = np.broadcast_to(benchmark[:, None], returns.shape)
+    valid = ~np.isnan(returns) & ~np.isnan(bench)
+    count = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / count
+        bench_mean = np.where(valid, bench, 0.0).sum(axis=0) / count
+        covariance = np.where(valid, (returns - mean) * (bench - bench_mean), 0.0).sum(axis=0)
+        bench_variance = np.where(valid, (bench - bench_mean) ** 2, 0.0).sum(axis=0)
+        return np.where((count > 1) & (bench_variance > 0), covariance / bench_variance, np.nan)
+
+
+def correlation_columns(returns: np.ndarray, columns: Optional[np.ndarray] = None) -> np.ndarray:
+    """Pairwise-complete Pearson correlation of every column with ``columns`` (default: all), via matrix products.
+
+    The result has one row per column of ``returns`` and one column per
+    entry of ``columns``, so updating a few columns of a full matrix costs
+    O(rows * n) per column instead of O(rows * n^2).
+    """
+    valid = (~np.isnan(returns)).astype(float)
+    values = np.where(valid > 0, returns, 0.0)
+    if columns is None:
+        columns = np.arange(returns.shape[1])
+        count = valid.T @ valid
+        sum_x = values.T @ valid
+        sum_xx = (values ** 2).T @ valid
+        sum_xy = values.T @ values
+        sum_y, sum_yy = sum_x.T, sum_xx.T
+    else:
+        valid_y, values_y = valid[:, columns], values[:, columns]
+        count = valid.T @ valid_y
+        sum_x = values.T @ valid_y
+        sum_y = valid.T @ values_y
+        sum_xx = (values ** 2).T @ valid_y
+        sum_yy = valid.T @ values_y ** 2
+        sum_xy = values.T @ values_y
+    with np.errstate(invalid='ignore', divide='ignore'):
+        numerator = count * sum_xy - sum_x * sum_y
+        denominator = np.sqrt((count * sum_xx - sum_x ** 2) * (count * sum_yy - sum_y ** 2))
+        correlation = np.where((count > 1) & (denominator > 0), numerator / denominator, np.nan)
+    positions = np.arange(len(columns))
+    correlation[columns, positions] = np.where(count[columns, positions] > 1, 1.0, np.nan)
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def correlation_matrix(returns: np.ndarray) -> np.ndarray:
+    return correlation_columns(returns)
+
+
+class PerformanceAnalytics:
+    """Risk and return metrics for a portfolio's holdings, computed column-wise.
+
+    Daily closes come from each stock's daily price bars (split/dividend
+    adjusted), extended backwards with the local HistoryStore when one is
+    given. The store is only read here, never fetched from; whoever fills
+    it (the window's HistoryBackfill) calls invalidate(symbol) once new
+    bars are on disk, since stored bars are cached per symbol until then.
+
+    The aligned closes, returns, per-holding metrics and correlations are
+    kept between calls as columns keyed by each stock's data version, so a
+    tick on one holding recomputes only that column (plus the portfolio
+    column and the betas against a moved benchmark). Anything that changes
+    the set of holdings or the day axis rebuilds everything; an unchanged
+    portfolio returns the previous result as is.
+    """
+
+    def __init__(self, history_store=None, periods_per_year: int = 252, risk_free_rate: float = 0.0,
+                 lookback_days: int = 5 * 365):
+        self.history_store = history_store
+        self.periods_per_year = periods_per_year
+        self.risk_free_rate = risk_free_rate
+        self.lookback_days = lookback_days
+        self._stored: Dict[str, Series] = {}
+        self._series: Dict[str, Tuple[Tuple, Series]] = {}
+        self._columns: Optional[Dict] = None
+        self._result_key = None
+        self._result: Optional[Dict] = None
+
+    def invalidate(self, symbol: Optional[str] = None):
+        if symbol is None:
+            self._stored.clear()
+            self._series.clear()
+            self._columns = None
+        else:
+            symbol = symbol.upper()
+            self._stored.pop(symbol, None)
+            self._series.pop(symbol, None)
+            if self._columns is not None and symbol in self._columns['symbols']:
+                self._columns['versions'][self._columns['symbols'].index(symbol)] = None
+        self._result_key = None
+
+    def _stored_closes(self, symbol: str) -> Series:
+        cached = self._stored.get(symbol)
+        if cached is None:
+            cached = (np.array([], dtype=np.int64), np.array([]))
+            if self.history_store is not None:
+                end = date.today()
+                start = date.fromordinal(end.toordinal() - self.lookback_days)
+                bars = self.history_store.read(symbol, start, end)
+                if len(bars):
+                    days = bars.index.to_numpy().astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+                    cached = (days, bars['Close'].to_numpy(dtype=float))
+            self._stored[symbol] = cached
+        return cached
+
+    def daily_closes(self, stock) -> Series:
+        """(day ordinal, close) for one stock, oldest first; cached until its data version changes."""
+        version = self._data_version(stock)
+        cached = self._series.get(stock.symbol)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        series = self._build_daily_closes(stock)
+        self._series[stock.symbol] = (version, series)
+        return series
+
+    def _build_daily_closes(self, stock) -> Series:
+        bars = stock.price_history.days
+        timestamps = bars.timestamps
+        closes = bars.closes * stock.corporate_actions.factors(timestamps) if len(stock.corporate_actions) else bars.closes
+        # Daily bars start at local midnight; shifting by one UTC offset and
+        # rounding absorbs DST changes without a per-bar datetime conversion.
+        offset = time.localtime(float(timestamps[0])).tm_gmtoff if len(timestamps) else 0
+        days = np.rint((timestamps + offset) / 86400).astype(np.int64) + EPOCH_ORDINAL
+
+        stored_days, stored_closes = self._stored_closes(stock.symbol)
+        if len(stored_days):
+            older = stored_days < days[0] if len(days) else np.ones(len(stored_days), dtype=bool)
+            days = np.concatenate([stored_days[older], days])
+            closes = np.concatenate([stored_closes[older], closes])
+        return days, closes
+
+    @staticmethod
+    def _data_version(stock) -> Tuple:
+        bars = stock.price_history.days
+        last = (float(bars.timestamps[-1]), float(bars.closes[-1])) if len(bars) else None
+        return stock.symbol, len(bars), last, len(stock.corporate_actions)
+
+    def _rebuild_columns(self, stocks, versions: List[Tuple]) -> Dict:
+        days, prices, present = align_closes([self.daily_closes(stock) for stock in stocks])
+        returns = period_returns(prices)
+        self._columns = {
+            'symbols': [stock.symbol for stock in stocks],
+            'versions': list(versions),
+            'days': days,
+            'present': present,
+            'day_counts': present.sum(axis=1),
+            'prices': prices,
+            'returns': returns,
+            'metrics': return_metrics(returns, self.periods_per_year, self.risk_free_rate),
+            'correlation': correlation_matrix(returns)
+        }
+        return self._columns
+
+    def _update_columns(self, stocks, versions: List[Tuple]) -> Optional[np.ndarray]:
+        """Bring the cached columns up to date; returns the changed columns, or None after a full rebuild."""
+        state = self._columns
+        symbols = [stock.symbol for stock in stocks]
+        if state is None or state['symbols'] != symbols:
+            self._rebuild_columns(stocks, versions)
+            return None
+
+        changed = [column for column, (version, cached) in enumerate(zip(versions, state['versions']))
+                   if version != cached]
+        if not changed:
+            return np.array([], dtype=int)
+
+        days = state['days']
+        day_counts = state['day_counts'].copy()
+        updates = []
+        for column in changed:
+            series_days, closes = self.daily_closes(stocks[column])
+            rows = np.searchsorted(days, series_days)
+            if len(rows) and (rows[-1] >= len(days) or not np.array_equal(days[rows], series_days)):
+                self._rebuild_columns(stocks, versions)  # a new day: the axis grows
+                return None
+            present = np.zeros(len(days), dtype=bool)
+            present[rows] = True
+            day_counts += present.astype(int) - state['present'][:, column]
+            updates.append((column, rows, closes, present))
+        if len(day_counts) and not day_counts.all():
+            self._rebuild_columns(stocks, versions)  # a day no series has any more: the axis shrinks
+            return None
+
+        changed = np.array(changed)
+        for column, rows, closes, present in updates:
+            prices = np.full((len(days), 1), np.nan)
+            prices[rows, 0] = closes
+            state['prices'][:, column] = forward_fill(prices)[:, 0]
+            state['present'][:, column] = present
+            state['versions'][column] = versions[column]
+        state['day_counts'] = day_counts
+        state['returns'][:, changed] = period_returns(state['prices'][:, changed])
+
+        returns = state['returns']
+        for name, values in return_metrics(returns[:, changed], self.periods_per_year, self.risk_free_rate).items():
+            state['metrics'][name][changed] = values
+        correlation = correlation_columns(returns, changed)
+        state['correlation'][:, changed] = correlation
+        state['correlation'][changed, :] = correlation.T
+        return changed
+
+    def analyze(self, stocks, benchmark: Optional[str] = None) -> Dict:
+        """Metrics per holding and for the value-weighted portfolio.
+
+        ``benchmark`` is a held symbol to compute betas against; by default
+        betas are relative to the portfolio itself.
+        """
+        stocks = list(stocks)
+        versions = [self._data_version(stock) for stock in stocks]
+        quantities = np.array([stock.quantity for stock in stocks], dtype=float)
+        key = (tuple(versions), tuple(quantities.tolist()), benchmark)
+        if key == self._result_key:
+            return self._result
+
+        previous = self._result
+        changed = self._update_columns(stocks, versions)
+        state = self._columns
+        symbols = state['symbols']
+        days, prices, returns = state['days'], state['prices'], state['returns']
+
+        values = np.where(np.isnan(prices), 0.0, prices) * quantities
+        weights = values[:-1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight_totals = np.where(np.isnan(returns), 0.0, weights).sum(axis=1)
+            portfolio_returns = np.where(np.isnan(returns), 0.0, returns * weights).sum(axis=1) / weight_totals
+        portfolio_returns[weight_totals <= 0] = np.nan
+
+        if benchmark in symbols:
+            benchmark_returns = returns[:, symbols.index(benchmark)]
+        else:
+            benchmark, benchmark_returns = None, portfolio_returns
+
+        portfolio = return_metrics(portfolio_returns[:, None], self.periods_per_year, self.risk_free_rate)
+        portfolio['beta'] = betas(portfolio_returns[:, None], benchmark_returns)
+        # Betas against a benchmark that did not move only change for the columns that did.
+        benchmark_moved = (changed is None or benchmark is None or previous is None
+                           or previous['benchmark'] != benchmark or symbols.index(benchmark) in changed)
+        if benchmark_moved:
+            state['metrics']['beta'] = betas(returns, benchmark_returns)
+        elif len(changed):
+            state['metrics']['beta'][changed] = betas(returns[:, changed], benchmark_returns)
+        metrics = state['metrics']
+
+        def row(column: int) -> Dict[str, float]:
+            return {name: float(values[column]) for name, values in metrics.items()}
+
+        self._result = {
+            'symbols': list(symbols),
+            'metrics': {symbol: row(column) for column, symbol in enumerate(symbols)},
+            'portfolio': {name: float(values[0]) for name, values in portfolio.items()},
+            'correlation': state['correlation'].copy(),
+            'benchmark': benchmark,
+            'start': date.fromordinal(int(days[0])) if len(days) else None,
+            'end': date.fromordinal(int(days[-1])) if len(days) else None
+        }
+        self._result_key = key
+        return self._result
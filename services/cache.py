@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class QuoteCache:
+    """Size-bounded LRU cache with a TTL per data class.
+
+    Entries are keyed by (kind, key) so quotes, fundamentals and other data
+    classes share one capacity but expire on their own schedule. Hit, miss,
+    eviction and expiration counters are kept per kind and can be read with
+    ``stats()`` while the cache is in use. All methods are thread-safe.
+
+    An optional ``backing`` tier (see DiskCache) receives every write and is
+    consulted on a memory miss, so entries survive restarts.
+
+    ``stale_grace`` keeps entries of a kind for that many seconds past their
+    TTL. get() treats them as misses, but get_entry() still returns them
+    flagged as stale so callers can serve them while revalidating.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 60, backing=None, stale_grace: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.backing = backing
+        self.stale_grace = dict(stale_grace or {})
+
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def ttl_for(self, kind: str) -> float:
+        return self.ttls.get(kind, self.default_ttl)
+
+    def _is_dead(self, kind: str, age: float) -> bool:
+        return age >= self.ttl_for(kind) + self.stale_grace.get(kind, 0)
+
+    def _count(self, kind: str, counter: str):
+        counters = self._counters.get(kind)
+        if counters is None:
+            counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'disk_hits': 0,
+                        'stale_hits': 0}
+            self._counters[kind] = counters
+        counters[counter] += 1
+
+    def get(self, key: str, kind: str = 'quote') -> Optional[Any]:
+        entry = self._lookup(key, kind, allow_stale=False)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str, kind: str = 'quote') -> Optional[tuple]:
+        """Return (value, timestamp, stale) for a fresh or within-grace entry, else None."""
+        return self._lookup(key, kind, allow_stale=True)
+
+    def _lookup(self, key: str, kind: str, allow_stale: bool) -> Optional[tuple]:
+        entry_key = (kind, key)
+        now = time.time()
+        ttl = self.ttl_for(kind)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                value, timestamp = entry
+                age = now - timestamp
+                if age < ttl:
+                    self._entries.move_to_end(entry_key)
+                    self._count(kind, 'hits')
+                    return value, timestamp, False
+
+                if self._is_dead(kind, age):
+                    del self._entries[entry_key]
+                    self._count(kind, 'expirations')
+                    entry = None
+                elif allow_stale:
+                    self._entries.move_to_end(entry_key)
+                    self._count(kind, 'stale_hits')
+                    return value, timestamp, True
+
+        if entry is None and self.backing is not None:
+            stored = self.backing.get(key, kind)
+            if stored is not None:
+                value, timestamp = stored
+                age = now - timestamp
+                if age < ttl or (allow_stale and not self._is_dead(kind, age)):
+                    self._store(entry_key, value, timestamp)
+                    stale = age >= ttl
+                    with self._lock:
+                        self._count(kind, 'stale_hits' if stale else 'hits')
+                        self._count(kind, 'disk_hits')
+                    return value, timestamp, stale
+
+        with self._lock:
+            self._count(kind, 'misses')
+        return None
+
+    def peek(self, key: str, kind: str = 'quote') -> Optional[Any]:
+        """Return the stored value even if expired, without touching stats or LRU order."""
+        entry = self.get_stale(key, kind)
+        return entry[0] if entry else None
+
+    def get_stale(self, key: str, kind: str = 'quote') -> Optional[tuple]:
+        """Return (value, timestamp) from memory or the backing tier regardless of age."""
+        with self._lock:
+            entry = self._entries.get((kind, key))
+        if entry is None and self.backing is not None:
+            entry = self.backing.get(key, kind)
+        return entry
+
+    def set(self, key: str, value: Any, kind: str = 'quote', timestamp: Optional[float] = None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        self._store((kind, key), value, timestamp)
+        if self.backing is not None:
+            self.backing.set(key, value, kind, timestamp)
+
+    def _store(self, entry_key: tuple, value: Any, timestamp: float):
+        with self._lock:
+            self._entries[entry_key] = (value, timestamp)
+            self._entries.move_to_end(entry_key)
+
+            while len(self._entries) > self.max_entries:
+                (evicted_kind, _), _ = self._entries.popitem(last=False)
+                self._count(evicted_kind, 'evictions')
+
+    def invalidate(self, key: str, kind: str = 'quote'):
+        with self._lock:
+            self._entries.pop((kind, key), None)
+        if self.backing is not None:
+            self.backing.delete(key, kind)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [
+                entry_key for entry_key, (_, timestamp) in self._entries.items()
+                if self._is_dead(entry_key[0], now - timestamp)
+            ]
+            for entry_key in expired:
+                del self._entries[entry_key]
+                self._count(entry_key[0], 'expirations')
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            by_kind = {kind: dict(counters) for kind, counters in self._counters.items()}
+            totals = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'disk_hits': 0,
+                      'stale_hits': 0}
+            for counters in by_kind.values():
+                for name, count in counters.items():
+                    totals[name] += count
+            lookups = totals['hits'] + totals['misses']
+            totals['hit_rate'] = totals['hits'] / lookups if lookups else 0
+            totals['size'] = len(self._entries)
+            totals['max_entries'] = self.max_entries
+            totals['disk_size'] = len(self.backing) if self.backing is not None else 0
+            totals['by_kind'] = by_kind
+            return totals
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return ('quote', key) in self._entries
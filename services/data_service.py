@@ -1,66 +1,252 @@
 import pandas as pd
+import numpy as np
 import csv
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from models.portfolio import Portfolio
-from models.stock import Stock
+from services.journal import PortfolioJournal
+from services.portfolio_store import PortfolioStore
+from services.snapshot import read_snapshot, write_snapshot
+from utils.helpers import atomic_write
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class CsvLoadReport:
+    """What happened while loading a portfolio CSV.
+
+    ``errors`` has one entry per problem: the file line it is on (header is
+    line 1), the symbol if known, the column and a message. Rows with any
+    error are skipped; everything else is loaded.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.rows_read = 0
+        self.loaded = 0
+        self.errors: List[Dict] = []
+
+    def add_error(self, line: Optional[int], symbol: str, column: str, message: str, value=None):
+        self.errors.append({'line': line, 'symbol': symbol, 'column': column, 'message': message, 'value': value})
+
+    @property
+    def skipped(self) -> int:
+        return len({error['line'] for error in self.errors if error['line'] is not None})
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        text = f"Loaded {self.loaded} of {self.rows_read} rows from {self.filename}"
+        if self.skipped:
+            text += f", skipped {self.skipped} malformed"
+        return text
+
+    def __str__(self):
+        lines = [self.summary()]
+        for error in self.errors:
+            where = f"line {error['line']}" if error['line'] is not None else "file"
+            symbol = f" {error['symbol']}" if error['symbol'] else ""
+            lines.append(f"  {where}{symbol} [{error['column']}]: {error['message']}")
+        return "\n".join(lines)
+
 
 class DataService:
+    REQUIRED_COLUMNS = ('Symbol', 'Quantity', 'Initial Price')
+
+    def __init__(self, store_path: Optional[str] = None, journal_path: Optional[str] = None):
+        self.last_load_report: Optional[CsvLoadReport] = None
+        self.store = PortfolioStore(store_path) if store_path else None
+        self.journal = PortfolioJournal(journal_path) if journal_path else None
+        self.last_replayed = 0
+
+    def _require_store(self) -> PortfolioStore:
+        if self.store is None:
+            raise RuntimeError("No portfolio store configured; create the DataService with store_path")
+        return self.store
+
+    def save_portfolio(self, portfolio: Portfolio) -> int:
+        """Write the holdings changed or removed since the last save to the store; returns how many."""
+        return self._require_store().save(portfolio)
+
+    def load_portfolio(self, revision: Optional[int] = None) -> Optional[Portfolio]:
+        """The stored portfolio (or a snapshot revision of it), or None if there is nothing stored.
+
+        The latest state also gets the journal records written after the
+        last save replayed on top (their count is in ``last_replayed``).
+        Without a store only the journal is replayed.
+        """
+        self.last_replayed = 0
+        try:
+            portfolio = None if self.store is None or self.store.is_empty() else self.store.load(revision)
+            if revision is None and self.journal is not None:
+                recovered = portfolio or Portfolio()
+                saved_seq = self.store.journal_seq if self.store is not None else 0
+                self.last_replayed = self.journal.replay(recovered, after=saved_seq)
+                if self.last_replayed:
+                    portfolio = recovered
+            return portfolio
+        except Exception as e:
+            print(f"Error loading portfolio: {e}")
+            return None
+
+    def legacy_import_pending(self) -> bool:
+        """True until the old portfolio_*.npz/csv saves have been imported into the store once."""
+        return self.store is not None and not self.store.legacy_imported
+
+    def mark_legacy_imported(self):
+        self._require_store().mark_legacy_imported()
+
+    def create_snapshot(self, label: str = "", keep: int = 10) -> int:
+        store = self._require_store()
+        revision = store.create_snapshot(label)
+        store.prune_snapshots(keep)
+        return revision
+
+    def save_snapshot(self, portfolio: Portfolio, filename: str):
+        """Save the full portfolio state (history, alerts, notes...) as a binary snapshot."""
+        with atomic_write(filename) as file:
+            write_snapshot(portfolio, file)
+
+    def load_snapshot(self, filename: str) -> Optional[Portfolio]:
+        try:
+            return read_snapshot(filename)
+        except Exception as e:
+            print(f"Error loading snapshot: {e}")
+            return None
+
     def save_portfolio_to_csv(self, portfolio: Portfolio, filename: str):
-        data = []
-        total_value = 0
-        
-        for stock in portfolio.stocks:
-            value = stock.quantity * stock.current_price
-            total_value += value
-            
-            data.append({
-                'Symbol': stock.symbol,
-                'Quantity': stock.quantity,
-                'Initial Price': stock.initial_price,
-                'Current Price': stock.current_price,
-                'Value': value,
-                'Change': stock.change,
-                'Change %': stock.change_percent,
-                'Last Updated': stock.last_updated.strftime('%Y-%m-%d %H:%M:%S')
-            })
-    
-        data.append({
-            'Symbol': 'TOTAL',
-            'Quantity': '',
-            'Initial Price': '',
-            'Current Price': '',
-            'Value': total_value,
-            'Change': '',
-            'Change %': '',
-            'Last Updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        """Export holdings as CSV; only the numbers and dates shown in the table survive."""
+        stocks = portfolio.stocks
+        holdings = portfolio.holdings
+        quantity = holdings.view('quantity')
+        values = quantity * holdings.view('current_price')
+
+        df = pd.DataFrame({
+            'Symbol': [stock.symbol for stock in stocks],
+            'Quantity': [stock.quantity for stock in stocks],
+            'Initial Price': holdings.view('initial_price'),
+            'Purchase Price': holdings.view('purchase_price'),
+            'Current Price': holdings.view('current_price'),
+            'Value': values,
+            'Change': holdings.view('change'),
+            'Change %': holdings.view('change_percent'),
+            'Purchase Date': [stock.purchase_date.strftime(TIMESTAMP_FORMAT) for stock in stocks],
+            'Last Updated': [stock.last_updated.strftime(TIMESTAMP_FORMAT) for stock in stocks]
         })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(filename, index=False)
-    
+        total = pd.DataFrame([{
+            'Symbol': 'TOTAL',
+            'Value': values.sum(),
+            'Last Updated': datetime.now().strftime(TIMESTAMP_FORMAT)
+        }])
+
+        with atomic_write(filename, 'w', newline='') as file:
+            pd.concat([df, total], ignore_index=True).to_csv(file, index=False)
+
     def load_portfolio_from_csv(self, filename: str) -> Optional[Portfolio]:
+        """Load a portfolio CSV column-wise; problems are collected in ``last_load_report``.
+
+        Only Symbol, Quantity and Initial Price are required. Current Price
+        and Purchase Price default to the initial price, Change and Change %
+        to zero, and missing dates to now. Returns None if the file cannot be
+        read at all.
+        """
+        report = CsvLoadReport(filename)
+        self.last_load_report = report
         try:
-            df = pd.read_csv(filename)
-            portfolio = Portfolio()
-            
-            for _, row in df.iterrows():
-                if row['Symbol'] == 'TOTAL':
-                    continue
-                
-                stock = Stock(
-                    row['Symbol'],
-                    int(row['Quantity']),
-                    float(row['Initial Price'])
-                )
-                stock.current_price = float(row['Current Price'])
-                stock.change = float(row['Change']) if pd.notna(row['Change']) else 0
-                stock.change_percent = float(row['Change %']) if pd.notna(row['Change %']) else 0
-                
-                portfolio.stocks.append(stock)
-            
-            return portfolio
-            
+            # Only empty fields are missing: 'NA' and friends are valid tickers.
+            # Dates stay text: a column of bare 20240101 values would otherwise be read as numbers.
+            df = pd.read_csv(filename, dtype={'Symbol': object, 'Last Updated': object, 'Purchase Date': object},
+                             keep_default_na=False, na_values=[''], low_memory=False, skipinitialspace=True)
         except Exception as e:
-            print(f"Error loading portfolio: {e}")
-            return None
\ No newline at end of file
+            report.add_error(None, None, '', f"Cannot read file: {e}")
+            return None
+
+        missing = [column for column in self.REQUIRED_COLUMNS if column not in df.columns]
+        if missing:
+            for column in missing:
+                report.add_error(None, None, column, "Required column missing")
+            return None
+
+        symbols = df['Symbol'].fillna('').str.strip().str.upper().to_numpy(dtype=object)
+        keep = symbols != 'TOTAL'
+        lines = np.arange(len(df)) + 2
+        report.rows_read = int(keep.sum())
+        bad = np.zeros(len(df), dtype=bool)
+
+        def flag(mask: np.ndarray, column: str, message: str, raw: Optional[np.ndarray] = None):
+            mask = mask & keep
+            for position in np.flatnonzero(mask):
+                report.add_error(int(lines[position]), symbols[position] or None, column, message,
+                                 raw[position] if raw is not None else None)
+            bad[mask] = True
+
+        flag(symbols == '', 'Symbol', "Missing symbol")
+
+        def numbers(column: str, required: bool = False) -> Optional[np.ndarray]:
+            if column not in df.columns:
+                return None
+            raw = df[column]
+            missing = raw.isna().to_numpy()
+            if required:
+                flag(missing, column, "Missing value")
+            # The C parser already typed clean columns; only a column with a stray value is coerced.
+            if pd.api.types.is_numeric_dtype(raw):
+                parsed = raw.to_numpy(dtype=float)
+            else:
+                parsed = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+                flag(np.isnan(parsed) & ~missing, column, "Not a number", raw.to_numpy(dtype=object))
+            flag(np.isinf(parsed), column, "Not a finite number", raw.to_numpy(dtype=object))
+            return parsed
+
+        quantity = numbers('Quantity', required=True)
+        flag(quantity < 0, 'Quantity', "Negative quantity", df['Quantity'].to_numpy(dtype=object))
+
+        initial_price = numbers('Initial Price', required=True)
+        flag(initial_price <= 0, 'Initial Price', "Initial price must be positive",
+             df['Initial Price'].to_numpy(dtype=object))
+
+        columns = {'quantity': quantity, 'initial_price': initial_price}
+        for column, name in (('Current Price', 'current_price'), ('Purchase Price', 'purchase_price')):
+            prices = numbers(column)
+            if prices is None:
+                prices = initial_price.copy()
+            else:
+                flag(prices < 0, column, "Negative price", df[column].to_numpy(dtype=object))
+                prices = np.where(np.isnan(prices), initial_price, prices)
+            columns[name] = prices
+        for column, name in (('Change', 'change'), ('Change %', 'change_percent')):
+            values = numbers(column)
+            columns[name] = np.zeros(len(df)) if values is None else np.nan_to_num(values, nan=0.0)
+
+        now = datetime.now()
+
+        def dates(column: str) -> np.ndarray:
+            if column not in df.columns:
+                return np.full(len(df), now, dtype=object)
+            raw = df[column].astype(object)
+            parsed = pd.to_datetime(raw, format=TIMESTAMP_FORMAT, errors='coerce')
+            # Hand-edited files may use other layouts; only those rows pay for format inference.
+            retry = parsed.isna() & raw.notna()
+            if retry.any():
+                parsed[retry] = pd.to_datetime(raw[retry].astype(str).str.strip(), format='mixed', errors='coerce')
+            flag((parsed.isna() & raw.notna()).to_numpy(), column, "Unrecognized date", raw.to_numpy(dtype=object))
+            result = np.array(parsed.dt.to_pydatetime(), dtype=object)
+            result[parsed.isna().to_numpy()] = now
+            return result
+
+        last_updated = dates('Last Updated')
+        purchase_dates = dates('Purchase Date')
+
+        positions = np.flatnonzero(keep & ~bad)
+        portfolio = Portfolio()
+        portfolio.extend(
+            symbols[positions],
+            last_updated=last_updated[positions],
+            purchase_dates=purchase_dates[positions],
+            **{name: values[positions] for name, values in columns.items()}
+        )
+        report.loaded = len(positions)
+        report.errors.sort(key=lambda error: error['line'])
+        return portfolio
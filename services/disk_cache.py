@@ -0,0 +1,111 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class DiskCache:
+    """SQLite-backed cache tier that survives restarts.
+
+    Values are stored as JSON together with the time they were fetched, so
+    the in-memory tier above can decide whether an entry is still fresh or
+    only good enough to show while a refresh runs. The table is capped at
+    ``max_entries`` rows (oldest first) and free pages are reclaimed with an
+    incremental vacuum once ``vacuum_threshold`` rows have been pruned.
+    One connection is shared by all threads and guarded by a lock.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, vacuum_threshold: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.vacuum_threshold = vacuum_threshold
+
+        self._lock = threading.Lock()
+        self._pruned_since_vacuum = 0
+        self._writes_since_prune = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_timestamp ON cache_entries (timestamp)")
+        self._conn.commit()
+
+    def get(self, key: str, kind: str = 'quote') -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, timestamp FROM cache_entries WHERE kind = ? AND key = ?",
+                (kind, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, kind: str = 'quote', timestamp: Optional[float] = None):
+        payload = json.dumps(value, default=_json_default)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (kind, key, value, timestamp) VALUES (?, ?, ?, ?)",
+                (kind, key, payload, timestamp if timestamp is not None else time.time())
+            )
+            self._conn.commit()
+
+            # Counting rows on every write is wasteful, check the bound periodically.
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= max(1, self.max_entries // 100):
+                self._writes_since_prune = 0
+                self._prune()
+
+    def delete(self, key: str, kind: str = 'quote'):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE kind = ? AND key = ?", (kind, key))
+            self._conn.commit()
+
+    def _prune(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+
+        self._conn.execute("""
+            DELETE FROM cache_entries WHERE rowid IN (
+                SELECT rowid FROM cache_entries ORDER BY timestamp ASC LIMIT ?
+            )
+        """, (excess,))
+        self._conn.commit()
+
+        self._pruned_since_vacuum += excess
+        if self._pruned_since_vacuum >= self.vacuum_threshold:
+            self._pruned_since_vacuum = 0
+            self._conn.execute("PRAGMA incremental_vacuum").fetchall()
+
+    def compact(self):
+        with self._lock:
+            self._prune()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+            self._pruned_since_vacuum = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from services.providers import HISTORY_COLUMNS, QuoteProvider
+
+
+class HistoryStore:
+    """Local daily OHLCV store that only downloads what it does not have yet.
+
+    Bars live in SQLite next to a per-symbol list of covered date ranges.
+    A range query fetches just the uncovered gaps from the provider, merges
+    them in and then answers from disk, so repeating a multi-year request
+    costs no network calls. Today is never marked covered because its bar
+    is still changing, and neither is a gap the provider returned no bars
+    for.
+    """
+
+    def __init__(self, path: str, provider: QuoteProvider):
+        self.path = path
+        self.provider = provider
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                day TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, day)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS coverage (
+                symbol TEXT NOT NULL,
+                start_day TEXT NOT NULL,
+                end_day TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_coverage_symbol ON coverage (symbol)")
+        self._conn.commit()
+
+    def coverage(self, symbol: str) -> List[Tuple[date, date]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT start_day, end_day FROM coverage WHERE symbol = ? ORDER BY start_day",
+                (symbol.upper(),)
+            ).fetchall()
+        return [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in rows]
+
+    def missing_ranges(self, symbol: str, start: date, end: date) -> List[Tuple[date, date]]:
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self.coverage(symbol):
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start - timedelta(days=1)))
+            cursor = max(cursor, covered_end + timedelta(days=1))
+            if cursor > end:
+                break
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def _mark_covered(self, symbol: str, start: date, end: date):
+        with self._lock:
+            ranges = self.coverage(symbol) + [(start, end)]
+            ranges.sort()
+            merged = [ranges[0]]
+            for range_start, range_end in ranges[1:]:
+                last_start, last_end = merged[-1]
+                if range_start <= last_end + timedelta(days=1):
+                    merged[-1] = (last_start, max(last_end, range_end))
+                else:
+                    merged.append((range_start, range_end))
+
+            self._conn.execute("DELETE FROM coverage WHERE symbol = ?", (symbol,))
+            self._conn.executemany(
+                "INSERT INTO coverage (symbol, start_day, end_day) VALUES (?, ?, ?)",
+                [(symbol, range_start.isoformat(), range_end.isoformat()) for range_start, range_end in merged]
+            )
+            self._conn.commit()
+
+    def _store_bars(self, symbol: str, bars: pd.DataFrame):
+        rows = [
+            (symbol, day.date().isoformat(), *(float(value) for value in values))
+            for day, values in zip(pd.to_datetime(bars.index), bars[HISTORY_COLUMNS].to_numpy())
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars (symbol, day, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def fetch_missing(self, symbol: str, start: date, end: date) -> int:
+        """Download the uncovered parts of [start, end]; returns how many gaps were fetched."""
+        symbol = symbol.upper()
+        today = date.today()
+        gaps = self.missing_ranges(symbol, start, end)
+        for gap_start, gap_end in gaps:
+            bars = self.provider.get_history(symbol, gap_start, gap_end)
+            if bars is None or not len(bars):
+                # No answer is not proof there is no data (a provider may have been rate limited); ask again later.
+                continue
+            self._store_bars(symbol, bars)
+            covered_end = min(gap_end, today - timedelta(days=1))
+            if covered_end >= gap_start:
+                self._mark_covered(symbol, gap_start, covered_end)
+        return len(gaps)
+
+    def get_history(self, symbol: str, start: date, end: Optional[date] = None,
+                    fetch: bool = True) -> pd.DataFrame:
+        """Daily bars for [start, end] (inclusive), fetching only the gaps when ``fetch``."""
+        symbol = symbol.upper()
+        end = end or date.today()
+        if fetch:
+            self.fetch_missing(symbol, start, end)
+        return self.read(symbol, start, end)
+
+    def read(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, open, high, low, close, volume FROM bars "
+                "WHERE symbol = ? AND day BETWEEN ? AND ? ORDER BY day",
+                (symbol.upper(), start.isoformat(), end.isoformat())
+            ).fetchall()
+        frame = pd.DataFrame(rows, columns=['Date'] + HISTORY_COLUMNS)
+        frame.index = pd.to_datetime(frame.pop('Date'))
+        return frame
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,226 @@
+import glob
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models.portfolio import Portfolio
+
+JOURNAL_OPS: Dict[str, Callable] = {}
+
+
+def _op(name: str):
+    def register(function: Callable) -> Callable:
+        JOURNAL_OPS[name] = function
+        return function
+    return register
+
+
+@_op('add_stock')
+def _add_stock(portfolio: Portfolio, when: datetime, symbol: str, quantity: float, price: float):
+    portfolio.add_stock(symbol, quantity, price, when=when)
+
+
+@_op('remove_stock')
+def _remove_stock(portfolio: Portfolio, when: datetime, symbol: str):
+    portfolio.remove_stock(symbol)
+
+
+@_op('update_price')
+def _update_price(portfolio: Portfolio, when: datetime, symbol: str, price: float, volume: Optional[int] = None,
+                  change: Optional[float] = None, change_percent: Optional[float] = None):
+    """A quote; ``change``/``change_percent`` as reported by the feed override the ones derived from the price."""
+    stock = portfolio.get_stock(symbol)
+    if stock is None:
+        return
+    stock.update_price(price, volume=volume, when=when)
+    if change is not None:
+        stock.change = change
+    if change_percent is not None:
+        stock.change_percent = change_percent
+
+
+@_op('update_fundamentals')
+def _update_fundamentals(portfolio: Portfolio, when: datetime, symbol: str, market_cap=None, pe_ratio=None,
+                         dividend_yield=None):
+    stock = portfolio.get_stock(symbol)
+    if stock is not None:
+        stock.update_fundamentals(market_cap=market_cap, pe_ratio=pe_ratio, dividend_yield=dividend_yield)
+
+
+@_op('add_quantity')
+def _add_quantity(portfolio: Portfolio, when: datetime, symbol: str, quantity: float, price: Optional[float] = None):
+    stock = portfolio.get_stock(symbol)
+    if stock is not None:
+        stock.add_quantity(quantity, price)
+
+
+@_op('split_stock')
+def _split_stock(portfolio: Portfolio, when: datetime, symbol: str, ratio: float, effective: Optional[float] = None):
+    stock = portfolio.get_stock(symbol)
+    if stock is not None:
+        return stock.split_stock(ratio, effective if effective is not None else when)
+
+
+@_op('add_alert')
+def _add_alert(portfolio: Portfolio, when: datetime, symbol: str, alert_type: str, threshold: float,
+               message: str = ""):
+    stock = portfolio.get_stock(symbol)
+    if stock is None:
+        return None
+    alert = stock.add_alert(alert_type, threshold, message)
+    alert['created'] = when
+    return alert
+
+
+@_op('remove_alert')
+def _remove_alert(portfolio: Portfolio, when: datetime, symbol: str, index: int):
+    stock = portfolio.get_stock(symbol)
+    if stock is not None and index < len(stock.alerts):
+        del stock.alerts[index]
+        stock.touch()
+
+
+@_op('trigger_alert')
+def _trigger_alert(portfolio: Portfolio, when: datetime, symbol: str, index: int):
+    stock = portfolio.get_stock(symbol)
+    if stock is not None and index < len(stock.alerts):
+        stock.alerts[index]['triggered'] = True
+        stock.alerts[index]['triggered_at'] = when
+        stock.touch()
+
+
+def _plain(value):
+    # numpy scalars from the quote pipeline
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Cannot journal {type(value).__name__}")
+
+
+def alert_index(stock, alert: Dict) -> int:
+    """Position of ``alert`` (by identity, alerts can compare equal) in ``stock.alerts``."""
+    return next(index for index, candidate in enumerate(stock.alerts) if candidate is alert)
+
+
+class PortfolioJournal:
+    """Append-only log of portfolio mutations since the last store save.
+
+    Each mutation is one JSON line ``[seq, timestamp, op, *args]`` appended
+    to the current segment file (``<path>.000001``, ...) and flushed to the
+    OS, so persisting a price tick costs one short write instead of a save.
+    Ops are replayed through the same functions that applied them (see
+    JOURNAL_OPS), with the recorded timestamp, so recovery rebuilds the
+    same state: load the store, then replay the records after the store's
+    ``journal_seq``.
+
+    Compaction: checkpoint() seals the current segment and returns the last
+    sequence number; save the portfolio with it, and once that write has
+    committed, discard_through() the sealed segment. A torn last line from
+    a crash mid-write ends replay of its segment. ``fsync`` also makes each
+    record survive power loss, at the cost of a disk flush per mutation.
+    Set ``enabled`` to False to apply mutations without logging them.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.enabled = True
+        self.seq = 0
+        self.pending = 0
+        self._file = None
+        segments = self.segments()
+        self._segment = segments[-1][0] if segments else 0
+
+    def segments(self) -> List[Tuple[int, str]]:
+        """(number, file name) of the segment files on disk, oldest first."""
+        found = []
+        for name in glob.glob(glob.escape(self.path) + '.*'):
+            suffix = name[len(self.path) + 1:]
+            if suffix.isdigit():
+                found.append((int(suffix), name))
+        return sorted(found)
+
+    def is_empty(self) -> bool:
+        return self.pending == 0 and not self.segments()
+
+    def record(self, op: str, *args, timestamp: Optional[float] = None) -> int:
+        """Append one record for a mutation already applied; returns its sequence number (0 if disabled)."""
+        if op not in JOURNAL_OPS:
+            raise ValueError(f"Unknown journal op: {op}")
+        if not self.enabled:
+            return 0
+        if self._file is None:
+            self._segment += 1
+            self._file = open(f"{self.path}.{self._segment:06d}", 'a', encoding='utf-8')
+        self.seq += 1
+        entry = [self.seq, timestamp if timestamp is not None else time.time(), op, *args]
+        self._file.write(json.dumps(entry, separators=(',', ':'), default=_plain) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.pending += 1
+        return self.seq
+
+    def apply(self, portfolio: Portfolio, op: str, *args, timestamp: Optional[float] = None):
+        """Apply a mutation to ``portfolio`` and log it; returns what the op returned.
+
+        The op runs first, so a mutation that raises is never logged.
+        ``timestamp`` backdates it (e.g. a cached quote), default now.
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        result = JOURNAL_OPS[op](portfolio, datetime.fromtimestamp(timestamp), *args)
+        self.record(op, *args, timestamp=timestamp)
+        return result
+
+    def replay(self, portfolio: Portfolio, after: int = 0) -> int:
+        """Apply every record with a sequence number above ``after``; returns how many were applied."""
+        applied = 0
+        self.seq = max(self.seq, after)
+        for _, name in self.segments():
+            with open(name, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        seq, timestamp, op, *args = json.loads(line)
+                    except ValueError:
+                        print(f"Journal {name}: ignoring torn record")
+                        break
+                    self.seq = max(self.seq, seq)
+                    if seq <= after:
+                        continue
+                    try:
+                        JOURNAL_OPS[op](portfolio, datetime.fromtimestamp(timestamp), *args)
+                        applied += 1
+                    except Exception as e:
+                        print(f"Journal {name}: cannot replay record {seq} ({op}): {e}")
+        return applied
+
+    def checkpoint(self) -> Tuple[int, int]:
+        """Seal the current segment; returns (last sequence number, last sealed segment).
+
+        Records after this go to a new segment, so the sealed ones can be
+        discarded once a save that includes the returned sequence number
+        has committed.
+        """
+        if self._file is not None:
+            if not self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+        self.pending = 0
+        return self.seq, self._segment
+
+    def discard_through(self, segment: int):
+        """Delete the sealed segments up to and including ``segment``."""
+        for number, name in self.segments():
+            if number > segment or (number == self._segment and self._file is not None):
+                break
+            try:
+                os.remove(name)
+            except OSError as e:
+                print(f"Error removing journal segment {name}: {e}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
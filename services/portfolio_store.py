@@ -0,0 +1,366 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.portfolio import Portfolio
+from models.price_history import TieredPriceHistory
+from models.stock import Stock
+from services.snapshot import HOLDING_COLUMNS, INTEGER_COLUMNS, TIERS, apply_extras, stock_extras
+
+SCHEMA_VERSION = 1
+VALUE_COLUMNS = ('v1', 'v2', 'v3', 'v4')
+
+
+class PortfolioStore:
+    """SQLite portfolio storage that writes only what changed since the last save.
+
+    Holdings are versioned rows: saving revision r closes the current row
+    of each changed holding (``rev_to = r``) and inserts its new state from
+    r on, so a point-in-time snapshot is just a revision number and reading
+    it back selects the rows alive at that revision. Price history points
+    of all three tiers are upserted from the last saved timestamp per
+    symbol and tier, and points a tier has dropped (or of a removed
+    holding) are retired. History points are versioned the same way, so a
+    snapshot keeps its history too. A replaced row or point version is
+    deleted straight away unless a snapshot can see it.
+
+    The store follows one Portfolio lineage: call load() (or save() every
+    holding once) before relying on incremental saves.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._watermarks: Dict[Tuple[str, int], float] = {}
+        self._positions: Dict[str, int] = {}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        numeric = ", ".join(f"{name} REAL" for name in HOLDING_COLUMNS)
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS holdings (
+                symbol TEXT NOT NULL,
+                rev_from INTEGER NOT NULL,
+                rev_to INTEGER,
+                position INTEGER NOT NULL,
+                {numeric},
+                last_updated REAL, purchase_date REAL, extras TEXT,
+                PRIMARY KEY (symbol, rev_from)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_holdings_current ON holdings (symbol) WHERE rev_to IS NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_holdings_closed ON holdings (rev_to) WHERE rev_to IS NOT NULL")
+        # Like holdings, points are versioned so snapshots keep what later saves trim or remove;
+        # at most one live (rev_to IS NULL) row per point.
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                symbol TEXT NOT NULL,
+                tier INTEGER NOT NULL,
+                timestamp REAL NOT NULL,
+                v1 REAL, v2 REAL, v3 REAL, v4 REAL,
+                rev_from INTEGER NOT NULL,
+                rev_to INTEGER,
+                PRIMARY KEY (symbol, tier, timestamp, rev_from)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_history_current ON history (symbol, tier, timestamp) "
+                           "WHERE rev_to IS NULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                revision INTEGER NOT NULL,
+                created REAL NOT NULL,
+                label TEXT
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('revision', '0')")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('next_position', '0')")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('journal_seq', '0')")
+        # A store that already holds a portfolio was filled before this flag existed.
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('legacy_imported', ?)", (str(int(not self.is_empty())),))
+        self._conn.commit()
+        self._next_position = self._meta('next_position')
+        self._prepared_seq = self._meta('journal_seq')
+
+    def _meta(self, key: str) -> int:
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0])
+
+    def _set_meta(self, key: str, value: int):
+        self._conn.execute("UPDATE meta SET value = ? WHERE key = ?", (str(value), key))
+
+    @property
+    def revision(self) -> int:
+        with self._lock:
+            return self._meta('revision')
+
+    @property
+    def journal_seq(self) -> int:
+        """Sequence number of the last journal record the saved state includes."""
+        with self._lock:
+            return self._meta('journal_seq')
+
+    @property
+    def legacy_imported(self) -> bool:
+        """Whether the pre-database save files were already looked for (and imported if there were any)."""
+        with self._lock:
+            return bool(self._meta('legacy_imported'))
+
+    def mark_legacy_imported(self):
+        with self._lock, self._conn:
+            self._set_meta('legacy_imported', 1)
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM holdings LIMIT 1").fetchone() is None
+
+    def save(self, portfolio: Portfolio, journal_seq: Optional[int] = None) -> int:
+        """Write the holdings changed since the last save; returns how many were written or removed."""
+        batch = self.prepare(portfolio, journal_seq)
+        if batch is None:
+            return 0
+        try:
+            self.write(batch)
+        except Exception:
+            self.retry_later(portfolio, batch)
+            raise
+        return len(batch['holdings']) + len(batch['removed'])
+
+    def prepare(self, portfolio: Portfolio, journal_seq: Optional[int] = None) -> Optional[Dict]:
+        """Collect the pending changes of ``portfolio`` as plain rows, or None if there are none.
+
+        This is the only step that reads the portfolio, so it belongs on the
+        thread that mutates it; write() can then run anywhere. ``journal_seq``
+        is the last journal record applied to the portfolio, stored with the
+        revision so recovery knows where to resume replaying.
+        """
+        changed, removed = portfolio.take_changes()
+        if not changed and not removed and journal_seq in (None, self._prepared_seq):
+            return None
+
+        with self._lock:
+            if journal_seq is not None:
+                self._prepared_seq = journal_seq
+            for symbol in removed:
+                self._positions.pop(symbol, None)
+                for tier in range(len(TIERS)):
+                    self._watermarks.pop((symbol, tier), None)
+            holdings = []
+            history = []
+            for stock in changed:
+                position = self._positions.get(stock.symbol)
+                if position is None:
+                    position = self._positions[stock.symbol] = self._next_position
+                    self._next_position += 1
+                holdings.append(self._holding_row(stock, position))
+                if stock._price_history is not None:
+                    history.extend(self._history_rows(stock.symbol, stock._price_history))
+        return {'removed': removed, 'holdings': holdings, 'history': history, 'next_position': self._next_position,
+                'journal_seq': journal_seq}
+
+    def write(self, batch: Dict):
+        """Apply a prepare()d batch as one new revision, in one transaction."""
+        with self._lock, self._conn:
+            if batch['journal_seq'] is not None:
+                self._set_meta('journal_seq', batch['journal_seq'])
+            if not batch['holdings'] and not batch['removed']:
+                return  # only journal records whose effects were already saved
+            revision = self._meta('revision') + 1
+            closing = [(revision, symbol) for symbol in batch['removed']]
+            closing += [(revision, row[0]) for row in batch['holdings']]
+            self._conn.executemany("UPDATE holdings SET rev_to = ? WHERE symbol = ? AND rev_to IS NULL", closing)
+            newest_snapshot = self._conn.execute("SELECT MAX(revision) FROM snapshots").fetchone()[0]
+            self._retire_history("symbol = ?", [(symbol,) for symbol in batch['removed']], revision, newest_snapshot)
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO holdings VALUES ({','.join('?' * (len(HOLDING_COLUMNS) + 7))})",
+                [(symbol, revision, None, *rest) for symbol, *rest in batch['holdings']]
+            )
+
+            for symbol, tier, keep_from, points in batch['history']:
+                if keep_from is None:
+                    self._retire_history("symbol = ? AND tier = ?", [(symbol, tier)], revision, newest_snapshot)
+                    continue
+                self._retire_history("symbol = ? AND tier = ? AND timestamp < ?", [(symbol, tier, keep_from)],
+                                     revision, newest_snapshot)
+                if points and newest_snapshot is not None:
+                    # Points being rewritten are replaced in place unless a snapshot can see the old value.
+                    self._conn.execute(
+                        "UPDATE history SET rev_to = ? WHERE symbol = ? AND tier = ? AND timestamp >= ? "
+                        "AND rev_to IS NULL AND rev_from <= ?",
+                        (revision, symbol, tier, points[0][2], newest_snapshot)
+                    )
+                self._conn.executemany("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                                       [(*point, revision) for point in points])
+
+            # Versions closed now are kept only if a snapshot can still see them.
+            self._conn.execute("""
+                DELETE FROM holdings
+                WHERE rev_to = ? AND NOT EXISTS (
+                    SELECT 1 FROM snapshots s WHERE s.revision >= holdings.rev_from AND s.revision < holdings.rev_to
+                )
+            """, (revision,))
+            self._set_meta('revision', revision)
+            self._set_meta('next_position', batch['next_position'])
+
+    def _retire_history(self, condition: str, params: List[Tuple], revision: int, newest_snapshot: Optional[int]):
+        """Drop the live history points matching ``condition``; ones a snapshot can see are closed instead."""
+        if newest_snapshot is not None:
+            self._conn.executemany(
+                f"UPDATE history SET rev_to = ? WHERE rev_to IS NULL AND rev_from <= ? AND {condition}",
+                [(revision, newest_snapshot, *values) for values in params]
+            )
+        self._conn.executemany(f"DELETE FROM history WHERE rev_to IS NULL AND {condition}", params)
+
+    def retry_later(self, portfolio: Portfolio, batch: Dict):
+        """After a failed write(), mark the batch's holdings changed again and rewrite their full history."""
+        with self._lock:
+            self._prepared_seq = None
+            for symbol, *_ in batch['holdings']:
+                for tier in range(len(TIERS)):
+                    self._watermarks.pop((symbol, tier), None)
+                stock = portfolio.get_stock(symbol)
+                if stock is not None:
+                    stock.touch()
+        portfolio.requeue_removed(batch['removed'])
+
+    @staticmethod
+    def _holding_row(stock: Stock, position: int) -> Tuple:
+        extras = stock_extras(stock)
+        return (
+            stock.symbol, position,
+            *(float(getattr(stock, name)) for name in HOLDING_COLUMNS),
+            stock.last_updated.timestamp(), stock.purchase_date.timestamp(),
+            json.dumps(extras) if extras else None
+        )
+
+    def _history_rows(self, symbol: str, history: TieredPriceHistory) -> List[Tuple]:
+        """Per tier: (symbol, tier, drop points before, points to upsert) for what changed since the last save."""
+        rows = []
+        for tier, points in enumerate(history.packed()):
+            key = (symbol, tier)
+            watermark = self._watermarks.get(key)
+            timestamps = points[0]
+            if not len(timestamps):
+                if watermark is not None:
+                    rows.append((symbol, tier, None, []))
+                    del self._watermarks[key]
+                continue
+
+            if watermark is not None:
+                # The bar at the watermark may still have changed since it was written.
+                points = points[:, int(np.searchsorted(timestamps, watermark, side='left')):]
+            padded = [[None] * points.shape[1]] * (len(VALUE_COLUMNS) + 1 - len(points))
+            upserts = [(symbol, tier, *point) for point in zip(*points.tolist(), *padded)]
+            rows.append((symbol, tier, float(timestamps[0]), upserts))
+            self._watermarks[key] = float(timestamps[-1])
+        return rows
+
+    def load(self, revision: Optional[int] = None) -> Portfolio:
+        """The portfolio as of ``revision`` (default: the latest save)."""
+        with self._lock:
+            if revision is None:
+                where, params = "rev_to IS NULL", ()
+            else:
+                where, params = "rev_from <= ? AND (rev_to IS NULL OR rev_to > ?)", (revision, revision)
+            names = ', '.join(HOLDING_COLUMNS)
+            holdings = self._conn.execute(
+                f"SELECT symbol, position, {names}, last_updated, purchase_date, extras FROM holdings "
+                f"WHERE {where} ORDER BY position", params
+            ).fetchall()
+            history = self._conn.execute(
+                f"SELECT symbol, tier, timestamp, v1, v2, v3, v4 FROM history WHERE {where} "
+                f"ORDER BY symbol, tier, timestamp", params
+            ).fetchall()
+
+        portfolio = Portfolio()
+        if holdings:
+            columns = list(zip(*holdings))
+            values = {name: np.array(columns[2 + i], dtype=float) for i, name in enumerate(HOLDING_COLUMNS)}
+            count = len(HOLDING_COLUMNS)
+            last_updated = [datetime.fromtimestamp(timestamp) for timestamp in columns[2 + count]]
+            purchase_dates = [datetime.fromtimestamp(timestamp) for timestamp in columns[3 + count]]
+            stocks = portfolio.extend(np.array(columns[0], dtype=object), last_updated, purchase_dates,
+                                      **{name: values[name] for name in portfolio.holdings.COLUMNS})
+            for name in HOLDING_COLUMNS:
+                if name not in portfolio.holdings.COLUMNS:
+                    for stock, value in zip(stocks, values[name].tolist()):
+                        setattr(stock, name, int(value) if name in INTEGER_COLUMNS and value.is_integer() else value)
+            for stock, extras in zip(stocks, columns[4 + count]):
+                if extras:
+                    apply_extras(stock, json.loads(extras))
+        watermarks = self._restore_history(portfolio, history)
+
+        portfolio.take_changes()
+        if revision is None:
+            with self._lock:
+                self._positions = {row[0]: row[1] for row in holdings}
+                self._watermarks = watermarks
+        return portfolio
+
+    def _restore_history(self, portfolio: Portfolio, history: List[Tuple]) -> Dict[Tuple[str, int], float]:
+        """Give each stock its stored tiers; returns the last stored timestamp per (symbol, tier)."""
+        watermarks = {}
+        if not history:
+            return watermarks
+        symbols, tiers, *values = zip(*history)
+        points = np.array(values, dtype=float)
+        tiers = np.array(tiers)
+        symbols = np.array(symbols, dtype=object)
+        # Rows come sorted by (symbol, tier), so each symbol is one contiguous block.
+        starts = np.flatnonzero(np.concatenate([[True], symbols[1:] != symbols[:-1]]))
+        ends = np.append(starts[1:], len(symbols))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            stock = portfolio.get_stock(symbols[start])
+            if stock is None:
+                continue
+            bounds = np.searchsorted(tiers[start:end], np.arange(len(TIERS) + 1)) + start
+            for tier in range(len(TIERS)):
+                if bounds[tier + 1] > bounds[tier]:
+                    watermarks[(symbols[start], tier)] = float(points[0, bounds[tier + 1] - 1])
+            raw, minutes, days = (points[:1 + field_count, bounds[tier]:bounds[tier + 1]]
+                                  for tier, field_count in enumerate((3, 4, 4)))
+            stock.price_history = TieredPriceHistory.unpack(raw, minutes, days)
+        return watermarks
+
+    def create_snapshot(self, label: str = "") -> int:
+        """Mark the latest saved revision as a point-in-time snapshot; returns the revision."""
+        with self._lock, self._conn:
+            revision = self._meta('revision')
+            self._conn.execute("INSERT INTO snapshots (revision, created, label) VALUES (?, ?, ?)",
+                               (revision, datetime.now().timestamp(), label))
+        return revision
+
+    def snapshots(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, revision, created, label FROM snapshots ORDER BY id").fetchall()
+        return [{'id': snapshot_id, 'revision': revision, 'created': datetime.fromtimestamp(created), 'label': label}
+                for snapshot_id, revision, created, label in rows]
+
+    def prune_snapshots(self, keep: int = 10):
+        """Keep the newest ``keep`` snapshots and drop holding and history versions only older ones could see."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM snapshots WHERE id NOT IN (SELECT id FROM snapshots ORDER BY id DESC LIMIT ?)", (keep,)
+            )
+            self._conn.execute("""
+                DELETE FROM holdings
+                WHERE rev_to IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM snapshots s WHERE s.revision >= holdings.rev_from AND s.revision < holdings.rev_to
+                )
+            """)
+            self._conn.execute("""
+                DELETE FROM history
+                WHERE rev_to IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM snapshots s WHERE s.revision >= history.rev_from AND s.revision < history.rev_to
+                )
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,195 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.providers import ProviderError, QuoteProvider, SymbolNotFoundError
+from services.resilience import call_deadline
+
+
+class ProviderMetrics:
+    """Latency and error-rate tracking for one provider.
+
+    Both are exponentially weighted moving averages so recent behaviour
+    dominates; ``alpha`` is the weight of the newest sample.
+    """
+
+    def __init__(self, name: str, alpha: float = 0.2):
+        self.name = name
+        self.alpha = alpha
+        self.calls = 0
+        self.errors = 0
+        self.avg_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: Optional[float], ok: bool):
+        """Count one call; ``latency`` None counts it towards the error rate only."""
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            if latency is not None:
+                if self.avg_latency is None:
+                    self.avg_latency = latency
+                else:
+                    self.avg_latency += self.alpha * (latency - self.avg_latency)
+            self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'error_rate': round(self.error_rate, 3),
+                'avg_latency': round(self.avg_latency, 3) if self.avg_latency is not None else None
+            }
+
+
+class ProviderChain(QuoteProvider):
+    """Tries an ordered list of providers per symbol until one answers.
+
+    A provider is skipped for a symbol when it raises, returns nothing or
+    takes longer than ``timeout`` seconds; keep that well below any
+    caller's own deadline so the fallback still has time to answer. With
+    ``prefer_fastest`` the healthy providers (breaker not open, error rate
+    below ``max_error_rate``) are tried fastest first, with the configured
+    order breaking ties and unhealthy providers kept as a last resort. A
+    provider without a latency sample yet goes after the measured healthy
+    ones, so a rate-limited fallback is not promoted just for being unused.
+
+    A bulk get_quotes call gets ``timeout`` plus ``batch_timeout_per_symbol``
+    per symbol, since one download of hundreds of symbols legitimately takes
+    longer than a single quote. Bulk calls count towards the error rate but
+    not the latency average, which compares single round trips.
+
+    Each call carries its timeout as a deadline, so a ResilientProvider
+    that is retrying gives up when the chain does rather than keeping one
+    of the chain's worker threads busy.
+    """
+    name = "chain"
+
+    def __init__(self, providers: List[QuoteProvider], timeout: float = 5.0,
+                 prefer_fastest: bool = True, max_error_rate: float = 0.5,
+                 batch_timeout_per_symbol: float = 0.1):
+        self.providers = list(providers)
+        self.timeout = timeout
+        self.batch_timeout_per_symbol = batch_timeout_per_symbol
+        self.prefer_fastest = prefer_fastest
+        self.max_error_rate = max_error_rate
+        self.provider_metrics = {provider.name: ProviderMetrics(provider.name) for provider in self.providers}
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="provider-call")
+
+    def is_healthy(self, provider: QuoteProvider) -> bool:
+        breaker = getattr(provider, 'breaker', None)
+        if breaker is not None and breaker.state == breaker.OPEN:
+            return False
+        return self.provider_metrics[provider.name].error_rate < self.max_error_rate
+
+    def ordered_providers(self) -> List[QuoteProvider]:
+        if not self.prefer_fastest:
+            return list(self.providers)
+
+        def sort_key(item):
+            position, provider = item
+            latency = self.provider_metrics[provider.name].avg_latency
+            return (
+                not self.is_healthy(provider),
+                latency is None,
+                latency if latency is not None else 0.0,
+                position
+            )
+
+        return [provider for _, provider in sorted(enumerate(self.providers), key=sort_key)]
+
+    def batch_timeout(self, count: int) -> float:
+        return self.timeout + self.batch_timeout_per_symbol * count
+
+    def _timed_call(self, provider: QuoteProvider, fn: Callable, *args, timeout: Optional[float] = None,
+                    sample_latency: bool = True):
+        metrics = self.provider_metrics[provider.name]
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        future = self._executor.submit(self._call_before, started + timeout, fn, *args)
+
+        def record(ok: bool):
+            metrics.record(time.monotonic() - started if sample_latency else None, ok=ok)
+
+        try:
+            result = future.result(timeout=timeout)
+        except SymbolNotFoundError:
+            record(ok=True)  # a healthy answer, just not for this symbol
+            raise
+        except FutureTimeoutError:
+            record(ok=False)
+            raise ProviderError(f"{provider.name} timed out after {timeout:g}s")
+        except Exception:
+            record(ok=False)
+            raise
+        record(ok=True)
+        return result
+
+    @staticmethod
+    def _call_before(deadline: float, fn: Callable, *args):
+        # A ResilientProvider stops retrying once we have stopped waiting for it.
+        with call_deadline(deadline):
+            return fn(*args)
+
+    def _first_answer(self, method: str, *args):
+        errors = []
+        for provider in self.ordered_providers():
+            try:
+                result = self._timed_call(provider, getattr(provider, method), *args)
+            except Exception as e:
+                errors.append(f"{provider.name}: {e}")
+                continue
+            if result is not None and len(result):
+                return result
+
+        if errors and len(errors) == len(self.providers):
+            raise ProviderError("; ".join(errors))
+        return None
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        return self._first_answer('get_quote', symbol)
+
+    def get_fundamentals(self, symbol: str) -> Optional[Dict]:
+        return self._first_answer('get_fundamentals', symbol)
+
+    def get_history(self, symbol: str, start, end):
+        return self._first_answer('get_history', symbol, start, end)
+
+    def get_quotes(self, symbols: List[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        quotes = {}
+        errors = {}
+        remaining = list(symbols)
+
+        for provider in self.ordered_providers():
+            if not remaining:
+                break
+            try:
+                fetched, failed = self._timed_call(provider, provider.get_quotes, remaining,
+                                                   timeout=self.batch_timeout(len(remaining)), sample_latency=False)
+            except Exception as e:
+                for symbol in remaining:
+                    errors[symbol] = f"{provider.name}: {e}"
+                continue
+
+            quotes.update(fetched)
+            for symbol, message in failed.items():
+                errors[symbol] = f"{provider.name}: {message}"
+            remaining = [symbol for symbol in remaining if symbol not in fetched]
+
+        for symbol in quotes:
+            errors.pop(symbol, None)
+        return quotes, errors
+
+    def metrics(self) -> Dict[str, Dict]:
+        stats = {}
+        for provider in self.providers:
+            snapshot = self.provider_metrics[provider.name].snapshot()
+            snapshot['healthy'] = self.is_healthy(provider)
+            breaker = getattr(provider, 'breaker', None)
+            snapshot['breaker'] = breaker.state if breaker is not None else None
+            stats[provider.name] = snapshot
+        return stats
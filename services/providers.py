@@ -0,0 +1,356 @@
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class ProviderError(Exception):
+    """The provider itself failed (network, throttling, outage)."""
+
+
+class SymbolNotFoundError(ProviderError):
+    """The provider is healthy but does not know the symbol."""
+
+
+def build_quote(symbol: str, closes: List[float], volume: float = 0) -> Optional[Dict]:
+    if not closes:
+        return None
+
+    current_price = float(closes[-1])
+    change = 0
+    change_percent = 0
+    if len(closes) > 1:
+        prev_price = float(closes[-2])
+        change = current_price - prev_price
+        change_percent = (change / prev_price) * 100 if prev_price > 0 else 0
+
+    return {
+        'symbol': symbol.upper(),
+        'price': round(current_price, 2),
+        'change': round(change, 2),
+        'change_percent': round(change_percent, 2),
+        'volume': volume or 0
+    }
+
+
+def build_fundamentals(symbol: str, name=None, sector=None, industry=None, market_cap=None,
+                       pe_ratio=None, dividend_yield=None, beta=None, description=None) -> Dict:
+    return {
+        'symbol': symbol.upper(),
+        'company_name': name or symbol.upper(),
+        'sector': sector or 'N/A',
+        'industry': industry or 'N/A',
+        'market_cap': market_cap or 0,
+        'pe_ratio': pe_ratio or 0,
+        'dividend_yield': dividend_yield or 0,
+        'beta': beta or 0,
+        'description': description or 'N/A'
+    }
+
+
+class QuoteProvider:
+    """Interface every quote source implements.
+
+    Prices and fundamentals are fetched separately because they change at
+    very different rates. get_quote returns the price dict for one symbol,
+    get_quotes fetches many symbols in one bulk call and returns
+    (quotes, errors) where errors maps each failed symbol to a message, and
+    get_fundamentals returns the slow-changing reference data.
+    get_history returns daily OHLCV bars for an inclusive date range as a
+    DataFrame indexed by date with HISTORY_COLUMNS.
+    """
+    name = "base"
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def get_fundamentals(self, symbol: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def get_history(self, symbol: str, start: date, end: date) -> Optional[pd.DataFrame]:
+        raise NotImplementedError
+
+    def get_quotes(self, symbols: List[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        quotes = {}
+        errors = {}
+        for symbol in symbols:
+            try:
+                data = self.get_quote(symbol)
+            except Exception as e:
+                errors[symbol] = str(e)
+                continue
+            if data:
+                quotes[symbol] = data
+            else:
+                errors[symbol] = "No data returned"
+        return quotes, errors
+
+
+class YFinanceProvider(QuoteProvider):
+    name = "yfinance"
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        hist = yf.Ticker(symbol).history(period="2d")
+
+        if hist.empty:
+            return None
+
+        volume = hist['Volume'].iloc[-1] if 'Volume' in hist else 0
+        return build_quote(symbol, hist['Close'].tolist(), volume=int(volume))
+
+    def get_fundamentals(self, symbol: str) -> Optional[Dict]:
+        info = yf.Ticker(symbol).info
+        if not info:
+            return None
+
+        summary = info.get('longBusinessSummary')
+        return build_fundamentals(
+            symbol,
+            name=info.get('longName'),
+            sector=info.get('sector'),
+            industry=info.get('industry'),
+            market_cap=info.get('marketCap'),
+            pe_ratio=info.get('trailingPE'),
+            dividend_yield=info.get('dividendYield'),
+            beta=info.get('beta'),
+            description=summary[:200] + '...' if summary else None
+        )
+
+    def get_history(self, symbol: str, start: date, end: date) -> Optional[pd.DataFrame]:
+        hist = yf.Ticker(symbol).history(start=start.isoformat(),
+                                         end=(end + timedelta(days=1)).isoformat(),
+                                         interval="1d")
+        if hist.empty:
+            return None
+
+        hist = hist[HISTORY_COLUMNS].copy()
+        hist.index = pd.to_datetime(hist.index).tz_localize(None).normalize()
+        return hist
+
+    def get_quotes(self, symbols: List[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        quotes = {}
+        errors = {}
+        if not symbols:
+            return quotes, errors
+
+        try:
+            frame = yf.download(symbols, period="2d", group_by='ticker',
+                                threads=True, progress=False)
+        except Exception as e:
+            return quotes, {symbol: str(e) for symbol in symbols}
+
+        for symbol in symbols:
+            try:
+                if len(symbols) == 1 and symbol not in frame.columns.get_level_values(0):
+                    hist = frame
+                else:
+                    hist = frame[symbol]
+                hist = hist.dropna(subset=['Close'])
+                if hist.empty:
+                    errors[symbol] = "No price data returned"
+                    continue
+
+                volume = hist['Volume'].iloc[-1] if 'Volume' in hist else 0
+                quotes[symbol] = build_quote(symbol, hist['Close'].tolist(), volume=int(volume))
+            except Exception as e:
+                errors[symbol] = str(e)
+
+        return quotes, errors
+
+
+class AlphaVantageProvider(QuoteProvider):
+    name = "alphavantage"
+    BASE_URL = "https://www.alphavantage.co/query"
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = 10):
+        self.api_key = api_key or os.environ.get("ALPHAVANTAGE_API_KEY", "GQ5DS63MNI7EZ9UD")
+        self.timeout = timeout
+
+    def _query(self, function: str, symbol: str) -> Dict:
+        response = requests.get(
+            self.BASE_URL,
+            params={'function': function, 'symbol': symbol, 'apikey': self.api_key},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise ProviderError(f"Alpha Vantage returned HTTP {response.status_code}")
+
+        return self._check(response.json())
+
+    @staticmethod
+    def _check(data: Dict) -> Dict:
+        # Throttled or invalid-key responses come back as 200 with a message;
+        # an unknown symbol gets 'Error Message' ("Invalid API call").
+        for key in ('Note', 'Information'):
+            if key in data:
+                raise ProviderError(data[key])
+        if 'Error Message' in data:
+            raise SymbolNotFoundError(data['Error Message'])
+        return data
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        quote = self._query("GLOBAL_QUOTE", symbol).get("Global Quote")
+        if not quote or not quote.get("05. price"):
+            return None
+
+        price = float(quote["05. price"])
+        previous_close = float(quote.get("08. previous close") or 0)
+        closes = [previous_close, price] if previous_close else [price]
+        return build_quote(symbol, closes, volume=int(quote.get("06. volume") or 0))
+
+    def get_fundamentals(self, symbol: str) -> Optional[Dict]:
+        overview = self._query("OVERVIEW", symbol)
+        if not overview.get('Symbol'):
+            return None
+
+        def number(key):
+            try:
+                return float(overview.get(key))
+            except (TypeError, ValueError):
+                return None
+
+        description = overview.get('Description')
+        return build_fundamentals(
+            symbol,
+            name=overview.get('Name'),
+            sector=overview.get('Sector'),
+            industry=overview.get('Industry'),
+            market_cap=number('MarketCapitalization'),
+            pe_ratio=number('PERatio'),
+            dividend_yield=number('DividendYield'),
+            beta=number('Beta'),
+            description=description[:200] + '...' if description else None
+        )
+
+    def get_history(self, symbol: str, start: date, end: date) -> Optional[pd.DataFrame]:
+        # The compact series only covers the last 100 trading days.
+        output_size = 'compact' if (date.today() - start).days < 140 else 'full'
+        response = requests.get(
+            self.BASE_URL,
+            params={'function': 'TIME_SERIES_DAILY', 'symbol': symbol,
+                    'outputsize': output_size, 'apikey': self.api_key},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise ProviderError(f"Alpha Vantage returned HTTP {response.status_code}")
+
+        data = self._check(response.json())
+        series = data.get('Time Series (Daily)')
+        if not series:
+            return None
+
+        hist = pd.DataFrame.from_dict(series, orient='index').astype(float)
+        hist.columns = HISTORY_COLUMNS
+        hist.index = pd.to_datetime(hist.index)
+        hist = hist.sort_index()
+        return hist.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+
+class FakeQuoteProvider(QuoteProvider):
+    """Offline provider for tests and benchmarks.
+
+    Prices are taken from ``prices`` when given, otherwise derived from the
+    symbol so they are stable across runs. ``latency`` is slept once per call
+    to stand in for a network round trip, and ``calls`` counts round trips.
+
+    Failures can be injected: ``failure_rate`` makes a random share of calls
+    raise ProviderError, ``fail_next(n)`` fails the next n calls and
+    ``outage = True`` fails every call until cleared.
+    """
+    name = "fake"
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None, latency: float = 0.0,
+                 unknown_symbols: Optional[List[str]] = None, failure_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.prices = {symbol.upper(): price for symbol, price in (prices or {}).items()}
+        self.latency = latency
+        self.unknown_symbols = {symbol.upper() for symbol in (unknown_symbols or [])}
+        self.failure_rate = failure_rate
+        self.outage = False
+        self.calls = 0
+        self.failures = 0
+        self._pending_failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fail_next(self, count: int = 1):
+        with self._lock:
+            self._pending_failures += count
+
+    def _closes(self, symbol: str) -> Optional[List[float]]:
+        symbol = symbol.upper()
+        if symbol in self.unknown_symbols:
+            return None
+        price = self.prices.get(symbol)
+        if price is None:
+            price = 10 + zlib.crc32(symbol.encode()) % 49000 / 100
+        return [round(price * 0.99, 2), price]
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+            fail = self.outage or self._random.random() < self.failure_rate
+            if not fail and self._pending_failures > 0:
+                self._pending_failures -= 1
+                fail = True
+            if fail:
+                self.failures += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ProviderError("Injected provider failure")
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        self._round_trip()
+        closes = self._closes(symbol)
+        if closes is None:
+            return None
+        return build_quote(symbol, closes, volume=1000)
+
+    def get_fundamentals(self, symbol: str) -> Optional[Dict]:
+        self._round_trip()
+        if symbol.upper() in self.unknown_symbols:
+            return None
+        return build_fundamentals(symbol, name=f"{symbol.upper()} Corp", sector="Technology",
+                                  market_cap=1e9, pe_ratio=20.0, dividend_yield=0.01)
+
+    def get_history(self, symbol: str, start: date, end: date) -> Optional[pd.DataFrame]:
+        self._round_trip()
+        closes = self._closes(symbol)
+        if closes is None:
+            return None
+
+        dates = pd.bdate_range(start, end)
+        if len(dates) == 0:
+            return None
+        # Deterministic per (symbol, day), so overlapping requests agree.
+        seeds = [zlib.crc32(f"{symbol.upper()}{day.date()}".encode()) for day in dates]
+        close = [closes[-1] * (1 + (seed % 2001 - 1000) / 100000) for seed in seeds]
+        return pd.DataFrame({
+            'Open': close,
+            'High': [price * 1.01 for price in close],
+            'Low': [price * 0.99 for price in close],
+            'Close': close,
+            'Volume': [1000] * len(close)
+        }, index=dates)
+
+    def get_quotes(self, symbols: List[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        self._round_trip()
+        quotes = {}
+        errors = {}
+        for symbol in symbols:
+            closes = self._closes(symbol)
+            if closes is None:
+                errors[symbol] = f"Unknown symbol {symbol}"
+            else:
+                quotes[symbol] = build_quote(symbol, closes, volume=1000)
+        return quotes, errors
@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+class Subscription:
+    def __init__(self, stream, symbols: Set[str], callback: Callable[[Dict], None]):
+        self.stream = stream
+        self.symbols = symbols
+        self.callback = callback
+
+    def unsubscribe(self):
+        self.stream.unsubscribe(self)
+
+
+class QuoteStream:
+    """Pushes price ticks for subscribed symbols to callbacks.
+
+    A source (polling, simulated or replay) publishes ticks into the stream;
+    each tick is a dict with symbol, price, change, change_percent, volume
+    and timestamp, and only reaches the callbacks subscribed to its symbol.
+    Callbacks run on the source's thread.
+    """
+
+    def __init__(self, source=None):
+        self._lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+        self._by_symbol: Dict[str, List[Subscription]] = {}
+        self.source = None
+        if source is not None:
+            self.set_source(source)
+
+    def set_source(self, source):
+        if self.source is not None:
+            self.source.stop()
+        self.source = source
+        if source is not None and self._by_symbol:
+            source.start(self)
+
+    def subscribe(self, symbols: Iterable[str], callback: Callable[[Dict], None]) -> Subscription:
+        subscription = Subscription(self, {symbol.upper() for symbol in symbols}, callback)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            for symbol in subscription.symbols:
+                self._by_symbol.setdefault(symbol, []).append(subscription)
+        if self.source is not None:
+            self.source.start(self)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.remove(subscription)
+            for symbol in subscription.symbols:
+                subscribers = self._by_symbol.get(symbol, [])
+                if subscription in subscribers:
+                    subscribers.remove(subscription)
+                if not subscribers:
+                    self._by_symbol.pop(symbol, None)
+            idle = not self._by_symbol
+        if idle and self.source is not None:
+            self.source.stop()
+
+    def symbols(self) -> Set[str]:
+        with self._lock:
+            return set(self._by_symbol)
+
+    def publish(self, tick: Dict):
+        with self._lock:
+            subscribers = list(self._by_symbol.get(tick['symbol'], ()))
+        for subscription in subscribers:
+            try:
+                subscription.callback(tick)
+            except Exception as e:
+                print(f"Error in quote stream callback for {tick['symbol']}: {e}")
+
+    def close(self):
+        if self.source is not None:
+            self.source.stop()
+
+
+class QuoteSource:
+    """Background thread that feeds ticks into a QuoteStream."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self, stream: QuoteStream):
+        if self.is_running():
+            return
+        # A fresh event per run, so a thread that is still winding down after
+        # stop() cannot be mistaken for a running one.
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._loop, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def is_running(self) -> bool:
+        return (self._thread is not None and self._thread.is_alive()
+                and not self._stop_event.is_set())
+
+    def _loop(self, stream: QuoteStream):
+        stop_event = self._stop_event
+        while not stop_event.is_set():
+            try:
+                self.poll(stream)
+            except Exception as e:
+                print(f"Error polling quotes: {e}")
+            stop_event.wait(self.interval)
+
+    def poll(self, stream: QuoteStream):
+        raise NotImplementedError
+
+
+class PollingQuoteSource(QuoteSource):
+    """Polls only the subscribed symbols in one batch and publishes the ones that moved."""
+
+    def __init__(self, stock_service, interval: float = 30.0):
+        super().__init__(interval)
+        self.stock_service = stock_service
+        self._last_prices: Dict[str, float] = {}
+
+    def poll(self, stream: QuoteStream):
+        symbols = sorted(stream.symbols())
+        if not symbols:
+            return
+
+        now = time.time()
+        results, _ = self.stock_service.get_multiple_stocks(symbols)
+        for symbol, stock_data in results.items():
+            if not stock_data or self._last_prices.get(symbol) == stock_data['price']:
+                continue
+            self._last_prices[symbol] = stock_data['price']
+            stream.publish({
+                'symbol': symbol,
+                'price': stock_data['price'],
+                'change': stock_data.get('change', 0),
+                'change_percent': stock_data.get('change_percent', 0),
+                'volume': stock_data.get('volume'),
+                'timestamp': now
+            })
+
+
+class SimulatedQuoteSource(QuoteSource):
+    """Random-walk prices for demos and tests, no network involved.
+
+    Each poll moves a random share (``activity``) of the subscribed symbols
+    by a normally distributed return with standard deviation ``volatility``.
+    """
+
+    def __init__(self, start_prices: Optional[Dict[str, float]] = None, interval: float = 1.0,
+                 volatility: float = 0.002, activity: float = 0.5, seed: Optional[int] = None):
+        super().__init__(interval)
+        self.volatility = volatility
+        self.activity = activity
+        self._random = random.Random(seed)
+        self._open = {symbol.upper(): price for symbol, price in (start_prices or {}).items()}
+        self._prices = dict(self._open)
+
+    def poll(self, stream: QuoteStream):
+        now = time.time()
+        for symbol in sorted(stream.symbols()):
+            if symbol not in self._prices:
+                self._prices[symbol] = self._open.setdefault(symbol, self._random.uniform(20, 500))
+            if self._random.random() >= self.activity:
+                continue
+
+            price = round(self._prices[symbol] * (1 + self._random.gauss(0, self.volatility)), 2)
+            self._prices[symbol] = price
+            change = price - self._open[symbol]
+            stream.publish({
+                'symbol': symbol,
+                'price': price,
+                'change': round(change, 2),
+                'change_percent': round(change / self._open[symbol] * 100, 2) if self._open[symbol] else 0,
+                'volume': None,
+                'timestamp': now
+            })
+
+
+class ReplayQuoteSource(QuoteSource):
+    """Replays recorded ticks in timestamp order.
+
+    ``speed`` scales the recorded gaps between ticks (2.0 replays twice as
+    fast, 0 publishes everything at once). Ticks for symbols nobody is
+    subscribed to are skipped.
+    """
+
+    def __init__(self, ticks: List[Dict], speed: float = 1.0):
+        super().__init__(interval=0)
+        self.ticks = sorted(ticks, key=lambda tick: tick['timestamp'])
+        self.speed = speed
+
+    def _loop(self, stream: QuoteStream):
+        stop_event = self._stop_event
+        previous = None
+        for tick in self.ticks:
+            if stop_event.is_set():
+                return
+            if previous is not None and self.speed > 0:
+                stop_event.wait((tick['timestamp'] - previous) / self.speed)
+            previous = tick['timestamp']
+            if tick['symbol'].upper() in stream.symbols():
+                stream.publish(dict(tick, symbol=tick['symbol'].upper()))
@@ -0,0 +1,229 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.providers import ProviderError, QuoteProvider, SymbolNotFoundError
+
+
+class CircuitOpenError(ProviderError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class RateLimitedError(ProviderError):
+    """Raised when no rate-limit token became available within ``max_wait``."""
+
+
+_local = threading.local()
+
+
+@contextmanager
+def call_deadline(deadline: Optional[float]):
+    """Give ResilientProvider calls on this thread a ``time.monotonic()`` deadline.
+
+    Used by ProviderChain, whose timed calls run on its own worker threads,
+    so a call it has given up on stops retrying instead of holding a worker.
+    """
+    previous = getattr(_local, 'deadline', None)
+    _local.deadline = deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def current_deadline() -> Optional[float]:
+    return getattr(_local, 'deadline', None)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter between attempts."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Sleep before retry number ``attempt`` (1 for the first retry)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Fails fast once a provider keeps erroring.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``reset_timeout`` seconds. It then goes half-open and
+    lets a single trial call through, rejecting the rest until that call
+    reports back: a success closes it again, a failure re-opens it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_thread: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_thread = None
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow_request(self) -> bool:
+        """Whether a call may go ahead; half-open, the caller that gets True is the trial call."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.HALF_OPEN:
+                if self._trial_thread is not None:
+                    return False
+                self._trial_thread = threading.get_ident()
+                return True
+            return state == self.CLOSED
+
+    def release(self):
+        """Give back this thread's trial call when it ended without reaching the provider."""
+        with self._lock:
+            if self._trial_thread == threading.get_ident():
+                self._trial_thread = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_thread = None
+            self._state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_thread = None
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._state = self.OPEN
+
+
+class ResilientProvider(QuoteProvider):
+    """Wraps a provider with rate limiting, retries and a circuit breaker.
+
+    An unknown symbol (None result or SymbolNotFoundError) counts as a healthy
+    response, so only provider-level failures trip the breaker. With
+    ``max_wait`` set, a call that cannot get a rate-limit token in time fails
+    with RateLimitedError instead of blocking.
+
+    A call with a deadline (passed to call() or set with call_deadline())
+    waits for tokens and retries only while it can still finish in time.
+    """
+
+    def __init__(self, provider: QuoteProvider, rate: float = 10.0, burst: Optional[float] = None,
+                 retry: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 max_wait: Optional[float] = None):
+        self.provider = provider
+        self.name = provider.name
+        self.max_wait = max_wait
+        self.bucket = TokenBucket(rate, burst)
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+
+    def call(self, fn: Callable, *args, deadline: Optional[float] = None):
+        if deadline is None:
+            deadline = current_deadline()
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"{self.name} is unavailable, circuit open")
+
+            max_wait = self.max_wait
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Queued past the caller's deadline; nobody is waiting for the answer any more.
+                    self.breaker.release()
+                    raise ProviderError(f"{self.name} call abandoned, deadline passed")
+                max_wait = remaining if max_wait is None else min(max_wait, remaining)
+            if not self.bucket.acquire(max_wait):
+                self.breaker.release()
+                raise RateLimitedError(f"{self.name} rate limit reached")
+            try:
+                result = fn(*args)
+            except SymbolNotFoundError:
+                self.breaker.record_success()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                attempt += 1
+                if attempt >= self.retry.max_attempts:
+                    raise
+                delay = self.retry.delay(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        return self.call(self.provider.get_quote, symbol)
+
+    def get_fundamentals(self, symbol: str) -> Optional[Dict]:
+        return self.call(self.provider.get_fundamentals, symbol)
+
+    def get_history(self, symbol: str, start, end):
+        return self.call(self.provider.get_history, symbol, start, end)
+
+    def get_quotes(self, symbols: List[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        if type(self.provider).get_quotes is QuoteProvider.get_quotes:
+            # No native bulk endpoint: go symbol by symbol so each call is rate limited.
+            return QuoteProvider.get_quotes(self, symbols)
+        return self.call(self.provider.get_quotes, symbols)
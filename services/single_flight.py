@@ -0,0 +1,117 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running block until it finishes and share its result (or its
+    exception). Safe to use from QThreads and pool workers alike.
+
+    do_many() takes part with a whole batch of keys at once, so a bulk fetch
+    and per-key fetches of the same key share one execution as well. The
+    ``executed`` and ``coalesced`` counters count keys, not calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def do_many(self, keys: List[Hashable],
+                fn: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Tuple[Dict[Hashable, Any], Dict[Hashable, BaseException]]:
+        """Fetch many keys with one call of ``fn``, sharing keys already in flight.
+
+        ``fn`` receives the keys nobody else is fetching and returns their
+        results as a dict (a missing key counts as None); do() callers for
+        those keys wait for it meanwhile. Keys another caller is already
+        fetching are waited for instead. Returns (results, errors), errors
+        mapping a key to the exception its fetch raised.
+        """
+        led = []
+        joined = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is not None:
+                    self.coalesced += 1
+                    joined.append((key, call))
+                else:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executed += 1
+                    led.append((key, call))
+
+        # Finish our own keys before waiting on anyone else's, so two
+        # overlapping batches cannot end up waiting for each other.
+        if led:
+            try:
+                fetched = fn([key for key, _ in led])
+                for key, call in led:
+                    call.result = fetched.get(key)
+            except Exception as e:
+                for _, call in led:
+                    call.error = e
+            finally:
+                with self._lock:
+                    for key, _ in led:
+                        del self._calls[key]
+                for _, call in led:
+                    call.done.set()
+
+        results = {}
+        errors = {}
+        for key, call in led + joined:
+            call.done.wait()
+            if call.error is not None:
+                errors[key] = call.error
+            else:
+                results[key] = call.result
+        return results, errors
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Union
+
+import numpy as np
+
+from models.corporate_actions import CorporateActions
+from models.portfolio import Portfolio
+from models.price_history import TieredPriceHistory
+from models.stock import Stock
+
+SNAPSHOT_FORMAT = 'stock-portfolio-snapshot'
+SNAPSHOT_VERSION = 1
+
+HOLDING_COLUMNS = ('quantity', 'initial_price', 'purchase_price', 'current_price', 'change', 'change_percent',
+                   'daily_high', 'daily_low', 'volume', 'market_cap', 'pe_ratio', 'dividend_yield')
+INTEGER_COLUMNS = ('volume', 'market_cap')
+TIERS = ('raw', 'minute', 'daily')
+ALERT_TIMES = ('created', 'triggered_at')
+
+
+def alerts_to_json(alerts: List[Dict]) -> List[Dict]:
+    return [{key: value.isoformat() if key in ALERT_TIMES and value is not None else value
+             for key, value in alert.items()} for alert in alerts]
+
+
+def alerts_from_json(alerts: List[Dict]) -> List[Dict]:
+    return [{key: datetime.fromisoformat(value) if key in ALERT_TIMES and value is not None else value
+             for key, value in alert.items()} for alert in alerts]
+
+
+def stock_extras(stock: Stock) -> Dict:
+    """The non-numeric state of a stock (alerts, notes, corporate actions), omitting defaults."""
+    extras = {}
+    if stock.alerts:
+        extras['alerts'] = alerts_to_json(stock.alerts)
+    if stock.notes:
+        extras['notes'] = stock.notes
+    if stock._corporate_actions is not None and len(stock._corporate_actions):
+        extras['corporate_actions'] = stock._corporate_actions.to_list()
+    return extras
+
+
+def apply_extras(stock: Stock, extras: Dict):
+    if 'alerts' in extras:
+        stock.alerts = alerts_from_json(extras['alerts'])
+    if 'notes' in extras:
+        stock.notes = extras['notes']
+    if 'corporate_actions' in extras:
+        stock.corporate_actions = CorporateActions.from_list(extras['corporate_actions'])
+
+
+def write_snapshot(portfolio: Portfolio, file: Union[str, BinaryIO]):
+    """Write the full portfolio state as an uncompressed .npz archive.
+
+    Per-holding numbers are one array per field; the three price history
+    tiers of all holdings are concatenated into one points array per tier
+    with an offsets array marking where each holding's points start.
+    Everything else (alerts, notes, corporate actions) goes into a JSON
+    metadata string, keyed by holding position and only where non-empty.
+    """
+    stocks = portfolio.stocks
+    arrays = {
+        'symbols': np.array([stock.symbol for stock in stocks], dtype=str),
+        'last_updated': np.array([stock.last_updated.timestamp() for stock in stocks], dtype=float),
+        'purchase_date': np.array([stock.purchase_date.timestamp() for stock in stocks], dtype=float)
+    }
+    for name in HOLDING_COLUMNS:
+        if name in portfolio.holdings.COLUMNS:
+            arrays[name] = portfolio.holdings.view(name).copy()
+        else:
+            arrays[name] = np.array([getattr(stock, name) for stock in stocks], dtype=float)
+
+    empty = TieredPriceHistory().packed()
+    tiers = [stock._price_history.packed() if stock._price_history is not None else empty for stock in stocks]
+    for position, tier in enumerate(TIERS):
+        points = [packed[position] for packed in tiers]
+        offsets = np.zeros(len(stocks) + 1, dtype=np.int64)
+        np.cumsum([block.shape[1] for block in points], out=offsets[1:])
+        arrays[f'{tier}_points'] = np.concatenate(points, axis=1) if points else empty[position]
+        arrays[f'{tier}_offsets'] = offsets
+
+    extras = {}
+    for position, stock in enumerate(stocks):
+        stock_state = stock_extras(stock)
+        if stock_state:
+            extras[str(position)] = stock_state
+    meta = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'created': datetime.now().isoformat(),
+        'count': len(stocks),
+        'extras': extras
+    }
+    arrays['meta'] = np.array(json.dumps(meta))
+    np.savez(file, **arrays)
+
+
+def read_snapshot(file: Union[str, BinaryIO]) -> Portfolio:
+    """Rebuild a portfolio written by write_snapshot; raises ValueError for foreign or newer files."""
+    with np.load(file, allow_pickle=False) as data:
+        if 'meta' not in data.files:
+            raise ValueError("Not a portfolio snapshot")
+        meta = json.loads(str(data['meta']))
+        if meta.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError("Not a portfolio snapshot")
+        if meta.get('version', 0) > SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot version {meta['version']} is newer than supported ({SNAPSHOT_VERSION})")
+
+        symbols = data['symbols'].astype(object)
+        columns = {name: data[name] for name in HOLDING_COLUMNS}
+        last_updated = [datetime.fromtimestamp(timestamp) for timestamp in data['last_updated'].tolist()]
+        purchase_dates = [datetime.fromtimestamp(timestamp) for timestamp in data['purchase_date'].tolist()]
+        tiers = [(data[f'{tier}_points'], data[f'{tier}_offsets']) for tier in TIERS]
+
+    portfolio = Portfolio()
+    stocks = portfolio.extend(symbols, last_updated, purchase_dates,
+                              **{name: columns[name] for name in portfolio.holdings.COLUMNS})
+    for name in HOLDING_COLUMNS:
+        if name not in portfolio.holdings.COLUMNS:
+            for stock, value in zip(stocks, columns[name].tolist()):
+                setattr(stock, name, int(value) if name in INTEGER_COLUMNS and value.is_integer() else value)
+
+    (raw, raw_offsets), (minutes, minute_offsets), (days, day_offsets) = tiers
+    has_history = (np.diff(raw_offsets) > 0) | (np.diff(minute_offsets) > 0) | (np.diff(day_offsets) > 0)
+    for position in np.flatnonzero(has_history).tolist():
+        stocks[position].price_history = TieredPriceHistory.unpack(
+            raw[:, raw_offsets[position]:raw_offsets[position + 1]],
+            minutes[:, minute_offsets[position]:minute_offsets[position + 1]],
+            days[:, day_offsets[position]:day_offsets[position + 1]]
+        )
+
+    for position, extras in meta.get('extras', {}).items():
+        apply_extras(stocks[int(position)], extras)
+    return portfolio
@@ -1,64 +1,287 @@
-import yfinance as yf
-from typing import Optional, Dict,List
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Optional, Dict, List, Set, Tuple
+
+import pandas as pd
+
+from services.cache import QuoteCache
+from services.disk_cache import DiskCache
+from services.history_store import HistoryStore
+from services.provider_chain import ProviderChain
+from services.providers import AlphaVantageProvider, QuoteProvider, YFinanceProvider
+from services.resilience import CircuitBreaker, ResilientProvider
+from services.single_flight import SingleFlight
 
 class StockService:
-    def __init__(self):
-        self.cache = {}
-        self.cache_timeout = 60  
-    
+    """Quote access with separate caching for prices and fundamentals.
+
+    Prices ('quote') expire after ``quote_ttl`` seconds, fundamentals such as
+    company name, sector and market cap ('fundamentals') after
+    ``fundamentals_ttl``, so a routine price refresh does not re-download
+    reference data. Concurrent fetches of the same symbol, from the refresh
+    pool or the add-stock dialog, share one provider request.
+
+    Without an explicit provider, quotes come from a ProviderChain of
+    yfinance with Alpha Vantage as fallback. Unless ``resilient`` is False,
+    every provider is wrapped in a ResilientProvider (rate limit, retries,
+    circuit breaker).
+
+    With ``stale_while_revalidate`` an expired quote up to ``max_staleness``
+    seconds past its TTL is returned at once, marked ``'stale': True``, while
+    a background refresh updates the cache and notifies listeners added with
+    add_listener(). Older quotes are fetched synchronously as usual.
+    """
+
+    def __init__(self, provider: Optional[QuoteProvider] = None, cache: Optional[QuoteCache] = None,
+                 cache_path: Optional[str] = None, quote_ttl: float = 60,
+                 fundamentals_ttl: float = 24 * 3600, resilient: bool = True,
+                 history_path: Optional[str] = None, stale_while_revalidate: bool = False,
+                 max_staleness: float = 300):
+        if provider is None:
+            providers = [YFinanceProvider(), AlphaVantageProvider()]
+            if resilient:
+                providers = [
+                    ResilientProvider(providers[0], rate=20.0, burst=40),
+                    # Free Alpha Vantage keys allow 5 requests per minute.
+                    ResilientProvider(providers[1], rate=5 / 60, burst=5, max_wait=0)
+                ]
+            # Short enough that a timed-out primary still leaves the fallback time within a UI refresh (15s).
+            provider = ProviderChain(providers, timeout=5.0)
+        elif resilient and not isinstance(provider, (ResilientProvider, ProviderChain)):
+            provider = ResilientProvider(provider, rate=20.0, burst=40)
+        self.provider = provider
+        if cache is None:
+            backing = DiskCache(cache_path) if cache_path else None
+            cache = QuoteCache(
+                max_entries=2000,
+                ttls={'quote': quote_ttl, 'fundamentals': fundamentals_ttl},
+                backing=backing,
+                stale_grace={'quote': max_staleness} if stale_while_revalidate else None
+            )
+        self.cache = cache
+        self.flights = SingleFlight()
+        self.history_store = HistoryStore(history_path, self.provider) if history_path else None
+
+        self.stale_while_revalidate = stale_while_revalidate
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self._revalidating: Set[str] = set()
+        self._revalidate_lock = threading.Lock()
+        self._revalidator = ThreadPoolExecutor(max_workers=4, thread_name_prefix="revalidate") \
+            if stale_while_revalidate else None
+
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        """Call ``callback(symbol, stock_data)`` whenever a background refresh lands."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, Dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        cache_key = symbol.upper()
+        if self.stale_while_revalidate:
+            entry = self.cache.get_entry(cache_key, kind='quote')
+            if entry is not None:
+                quote, timestamp, stale = entry
+                if not stale:
+                    return quote
+                self._schedule_revalidation(cache_key)
+                return dict(quote, stale=True, fetched_at=timestamp)
+        else:
+            quote = self.cache.get(cache_key, kind='quote')
+            if quote is not None:
+                return quote
+
+        return self.flights.do(('quote', cache_key), self._fetch_quote, cache_key)
+
+    def _fetch_quote(self, cache_key: str) -> Optional[Dict]:
+        quote = self.provider.get_quote(cache_key)
+        if quote:
+            self.cache.set(cache_key, quote, kind='quote')
+        return quote
+
+    def _schedule_revalidation(self, cache_key: str):
+        with self._revalidate_lock:
+            if cache_key in self._revalidating:
+                return
+            self._revalidating.add(cache_key)
+        try:
+            self._revalidator.submit(self._revalidate, cache_key)
+        except RuntimeError:
+            # Executor already shut down; the stale value is all we can offer.
+            with self._revalidate_lock:
+                self._revalidating.discard(cache_key)
+
+    def _revalidate(self, cache_key: str):
+        try:
+            quote = self.flights.do(('quote', cache_key), self._fetch_quote, cache_key)
+        except Exception as e:
+            print(f"Error revalidating quote for {cache_key}: {e}")
+            quote = None
+        finally:
+            with self._revalidate_lock:
+                self._revalidating.discard(cache_key)
+
+        if not quote:
+            return
+        stock_data = self.merge_stock_data(cache_key, quote, self.cache.peek(cache_key, kind='fundamentals'))
+        for callback in list(self._listeners):
+            try:
+                callback(cache_key, stock_data)
+            except Exception as e:
+                print(f"Error in quote listener for {cache_key}: {e}")
+
+    def get_fundamentals(self, symbol: str) -> Optional[Dict]:
+        cache_key = symbol.upper()
+        fundamentals = self.cache.get(cache_key, kind='fundamentals')
+        if fundamentals is not None:
+            return fundamentals
+
+        try:
+            fundamentals = self.flights.do(('fundamentals', cache_key), self._fetch_fundamentals, cache_key)
+        except Exception as e:
+            print(f"Error fetching fundamentals for {symbol}: {e}")
+            fundamentals = None
+
+        if not fundamentals:
+            # Fall back to whatever we knew before rather than losing the name.
+            fundamentals = self.cache.peek(cache_key, kind='fundamentals')
+        return fundamentals
+
+    def _fetch_fundamentals(self, cache_key: str) -> Optional[Dict]:
+        fundamentals = self.provider.get_fundamentals(cache_key)
+        if fundamentals:
+            self.cache.set(cache_key, fundamentals, kind='fundamentals')
+        return fundamentals
+
+    def merge_stock_data(self, symbol: str, quote: Dict, fundamentals: Optional[Dict]) -> Dict:
+        stock_data = dict(quote)
+        stock_data['company_name'] = fundamentals['company_name'] if fundamentals else symbol.upper()
+        stock_data['market_cap'] = fundamentals['market_cap'] if fundamentals else 0
+        stock_data['fundamentals'] = fundamentals
+        return stock_data
+
     def get_stock_data(self, symbol: str) -> Optional[Dict]:
         try:
-        
-            cache_key = symbol.upper()
-            current_time = time.time()
-            
-            if (cache_key in self.cache and 
-                current_time - self.cache[cache_key]['timestamp'] < self.cache_timeout):
-                return self.cache[cache_key]['data']
-            
-            
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            hist = stock.history(period="2d")
-            
-            if hist.empty:
+            quote = self.get_quote(symbol)
+            if not quote:
                 return None
-            
-            current_price = hist['Close'].iloc[-1]
-            
-           
-            change = 0
-            change_percent = 0
-            if len(hist) > 1:
-                prev_price = hist['Close'].iloc[-2]
-                change = current_price - prev_price
-                change_percent = (change / prev_price) * 100 if prev_price > 0 else 0
-            
-            stock_data = {
-                'symbol': symbol.upper(),
-                'price': round(current_price, 2),
-                'change': round(change, 2),
-                'change_percent': round(change_percent, 2),
-                'company_name': info.get('longName', symbol.upper()),
-                'market_cap': info.get('marketCap', 0),
-                'volume': info.get('volume', 0)
-            }
-            
-   
-            self.cache[cache_key] = {
-                'data': stock_data,
-                'timestamp': current_time
-            }
-            
-            return stock_data
-            
+
+            return self.merge_stock_data(symbol, quote, self.get_fundamentals(symbol))
+
         except Exception as e:
             print(f"Error fetching data for {symbol}: {e}")
             return None
-    
-    def get_multiple_stocks(self, symbols: List[str]) -> Dict[str, Optional[Dict]]:
+
+    def get_multiple_stocks(self, symbols: List[str]) -> Tuple[Dict[str, Optional[Dict]], Dict[str, str]]:
+        """Fetch quotes for many symbols with a single bulk provider call.
+
+        Symbols already fresh in the cache are served from it; the rest go to
+        the provider together, sharing symbols that a concurrent get_quote or
+        batch is already fetching. Returns (results, errors): failed symbols map
+        to None in results and to their error message in errors. Fundamentals
+        are only taken from the cache here, a bulk price refresh never fetches
+        them.
+        """
+        quotes = {}
+        missing = []
+        failures = {}
+
+        for symbol in symbols:
+            quote = self.cache.get(symbol.upper(), kind='quote')
+            if quote is None:
+                missing.append(symbol)
+            else:
+                quotes[symbol] = quote
+
+        if missing:
+            names = {symbol.upper(): symbol for symbol in missing}
+            batch_errors = {}
+
+            def fetch(keys):
+                requested = [names[cache_key] for _, cache_key in keys]
+                try:
+                    fetched, errors = self.provider.get_quotes(requested)
+                except Exception as e:
+                    print(f"Error fetching batch quotes: {e}")
+                    fetched, errors = {}, {symbol: str(e) for symbol in requested}
+                batch_errors.update(errors)
+                for symbol, quote in fetched.items():
+                    if quote:
+                        self.cache.set(symbol.upper(), quote, kind='quote')
+                return {('quote', symbol.upper()): quote for symbol, quote in fetched.items()}
+
+            # Symbols a per-symbol refresh or another batch is already fetching are shared, not re-requested.
+            shared, raised = self.flights.do_many([('quote', cache_key) for cache_key in names], fetch)
+
+            for symbol in missing:
+                key = ('quote', symbol.upper())
+                quote = shared.get(key)
+                if key in raised:
+                    failures[symbol] = str(raised[key])
+                elif not quote:
+                    failures[symbol] = batch_errors.get(symbol, "No data returned")
+                else:
+                    quotes[symbol] = quote
+
         results = {}
         for symbol in symbols:
-            results[symbol] = self.get_stock_data(symbol)
-        return results
\ No newline at end of file
+            quote = quotes.get(symbol)
+            if quote is None:
+                results[symbol] = None
+            else:
+                fundamentals = self.cache.peek(symbol.upper(), kind='fundamentals')
+                results[symbol] = self.merge_stock_data(symbol, quote, fundamentals)
+        return results, failures
+
+    def get_history(self, symbol: str, start: date, end: Optional[date] = None) -> Optional[pd.DataFrame]:
+        """Daily OHLCV bars, served from the local history store when one is configured."""
+        end = end or date.today()
+        try:
+            if self.history_store is not None:
+                return self.history_store.get_history(symbol, start, end)
+            return self.provider.get_history(symbol, start, end)
+        except Exception as e:
+            print(f"Error fetching history for {symbol}: {e}")
+            return None
+
+    def get_cached_stock_data(self, symbol: str) -> Optional[Dict]:
+        """Last known quote for symbol, however old, without going to the network."""
+        cache_key = symbol.upper()
+        entry = self.cache.get_stale(cache_key, kind='quote')
+        if entry is None:
+            return None
+        quote, timestamp = entry
+        stock_data = self.merge_stock_data(symbol, quote, self.cache.peek(cache_key, kind='fundamentals'))
+        stock_data['fetched_at'] = timestamp
+        stock_data['stale'] = time.time() - timestamp >= self.cache.ttl_for('quote')
+        return stock_data
+
+    def connection_state(self) -> str:
+        """Best circuit breaker state across providers: 'closed', 'open' or 'half_open'."""
+        providers = self.provider.providers if isinstance(self.provider, ProviderChain) else [self.provider]
+        states = [provider.breaker.state for provider in providers if isinstance(provider, ResilientProvider)]
+        if not states or CircuitBreaker.CLOSED in states:
+            return CircuitBreaker.CLOSED
+        if CircuitBreaker.HALF_OPEN in states:
+            return CircuitBreaker.HALF_OPEN
+        return CircuitBreaker.OPEN
+
+    def get_provider_stats(self) -> Dict[str, Dict]:
+        if isinstance(self.provider, ProviderChain):
+            return self.provider.metrics()
+        return {}
+
+    def get_cache_stats(self) -> Dict:
+        stats = self.cache.stats()
+        stats['single_flight'] = self.flights.stats()
+        with self._revalidate_lock:
+            stats['revalidating'] = len(self._revalidating)
+        return stats
+
+    def shutdown(self):
+        """Stop accepting background refreshes; ones already running are abandoned."""
+        if self._revalidator is not None:
+            self._revalidator.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,61 @@
+from models.stock import Stock
+from services.alert_engine import AlertEngine
+
+
+def make_stock() -> Stock:
+    return Stock('AAA', 10, 100.0)
+
+
+def test_price_fires_only_the_alerts_it_crosses():
+    engine = AlertEngine()
+    stock = make_stock()
+    above_105 = engine.add_alert(stock, 'above', 105)
+    above_120 = engine.add_alert(stock, 'above', 120)
+    below_95 = engine.add_alert(stock, 'below', 95)
+    move_5 = engine.add_alert(stock, 'change_percent', 5)
+
+    assert engine.evaluate('AAA', 106.0, 6.0) == [above_105, move_5]
+    assert above_105['triggered'] and not above_120['triggered']
+    assert engine.evaluate('aaa', 94.0, -1.0) == [below_95]
+    assert engine.pending_count('AAA') == 1
+    # Fired alerts are out of the index and do not fire twice.
+    assert engine.evaluate('AAA', 106.0, 6.0) == []
+    assert [alert for _, alert in engine.drain()] == [above_105, move_5, below_95]
+    assert engine.drain() == []
+
+
+def test_thresholds_are_inclusive():
+    engine = AlertEngine()
+    stock = make_stock()
+    above = engine.add_alert(stock, 'above', 110)
+    below = engine.add_alert(stock, 'below', 90)
+
+    assert engine.evaluate('AAA', 110.0) == [above]
+    assert engine.evaluate('AAA', 90.0) == [below]
+
+
+def test_remove_alert_goes_by_identity():
+    engine = AlertEngine()
+    stock = make_stock()
+    original = engine.add_alert(stock, 'above', 110, 'take profit')
+    twin = dict(original)
+    stock.alerts.insert(0, twin)
+    engine.track('AAA', twin)
+
+    engine.remove_alert(stock, original)
+
+    assert len(stock.alerts) == 1 and stock.alerts[0] is twin
+    assert engine.evaluate('AAA', 111.0) == [twin]
+
+
+def test_rebuild_skips_triggered_alerts():
+    engine = AlertEngine()
+    stock = make_stock()
+    pending = stock.add_alert('above', 110)
+    done = stock.add_alert('above', 105)
+    done['triggered'] = True
+
+    engine.rebuild([stock])
+
+    assert engine.pending_count() == 1
+    assert engine.evaluate('AAA', 120.0) == [pending]
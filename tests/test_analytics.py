@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models.price_history import TieredPriceHistory
+from models.stock import Stock
+from services.analytics import PerformanceAnalytics, correlation_columns, correlation_matrix
+
+START = datetime(2026, 1, 5)
+DAYS = 60
+
+
+def make_stocks(count: int = 6, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    stocks = []
+    for i in range(count):
+        stock = Stock(f"S{i}", 10 + i, 100.0, when=START)
+        history = TieredPriceHistory()
+        first = i * 3  # staggered starts give leading gaps
+        closes = 100 * np.cumprod(1 + rng.normal(0, 0.01, DAYS - first))
+        bars = np.zeros((5, DAYS - first))
+        bars[0] = [(START + timedelta(days=day)).timestamp() for day in range(first, DAYS)]
+        bars[1:] = closes
+        history.days.load(bars)
+        stock.price_history = history
+        stocks.append(stock)
+    return stocks
+
+
+def tick(stock: Stock, price: float, day: int = DAYS - 1):
+    stock.update_price(price, when=START + timedelta(days=day, hours=15))
+
+
+def assert_same(result, expected):
+    assert result['symbols'] == expected['symbols']
+    assert (result['start'], result['end']) == (expected['start'], expected['end'])
+    for symbol in expected['symbols']:
+        assert result['metrics'][symbol] == pytest.approx(expected['metrics'][symbol], rel=1e-9, nan_ok=True)
+    assert result['portfolio'] == pytest.approx(expected['portfolio'], rel=1e-9, nan_ok=True)
+    np.testing.assert_allclose(result['correlation'], expected['correlation'], atol=1e-12)
+
+
+def test_unchanged_portfolio_returns_the_cached_result():
+    stocks = make_stocks()
+    analytics = PerformanceAnalytics()
+
+    assert analytics.analyze(stocks) is analytics.analyze(stocks)
+
+
+@pytest.mark.parametrize('benchmark', [None, 'S1'])
+def test_incremental_updates_match_a_full_recompute(benchmark):
+    stocks = make_stocks()
+    analytics = PerformanceAnalytics()
+    analytics.analyze(stocks, benchmark)
+
+    tick(stocks[2], 150.0)
+    assert_same(analytics.analyze(stocks, benchmark), PerformanceAnalytics().analyze(stocks, benchmark))
+    tick(stocks[1], 90.0)  # the benchmark itself
+    assert_same(analytics.analyze(stocks, benchmark), PerformanceAnalytics().analyze(stocks, benchmark))
+    stocks[4].add_quantity(50, 100.0)
+    assert_same(analytics.analyze(stocks, benchmark), PerformanceAnalytics().analyze(stocks, benchmark))
+    tick(stocks[0], 101.0, day=DAYS)  # a new day grows the axis
+    assert_same(analytics.analyze(stocks, benchmark), PerformanceAnalytics().analyze(stocks, benchmark))
+    stocks[3].split_stock(2, START + timedelta(days=30))
+    assert_same(analytics.analyze(stocks, benchmark), PerformanceAnalytics().analyze(stocks, benchmark))
+
+
+def test_switching_benchmark_and_holdings():
+    stocks = make_stocks()
+    analytics = PerformanceAnalytics()
+    analytics.analyze(stocks)
+
+    assert_same(analytics.analyze(stocks, 'S3'), PerformanceAnalytics().analyze(stocks, 'S3'))
+    assert_same(analytics.analyze(stocks[1:], 'S3'), PerformanceAnalytics().analyze(stocks[1:], 'S3'))
+    assert analytics.analyze(stocks, 'NOPE')['benchmark'] is None
+
+
+def test_only_the_changed_column_is_recomputed(monkeypatch):
+    stocks = make_stocks()
+    analytics = PerformanceAnalytics()
+    analytics.analyze(stocks, 'S1')
+    rebuilt = []
+    monkeypatch.setattr(analytics, '_rebuild_columns', lambda *args: rebuilt.append(args))
+
+    tick(stocks[2], 120.0)
+    analytics.analyze(stocks, 'S1')
+
+    assert rebuilt == []
+
+
+def test_correlation_columns_match_the_full_matrix():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(size=(100, 8))
+    returns[rng.random(returns.shape) < 0.2] = np.nan
+    returns[:80, 5] = np.nan
+
+    full = correlation_matrix(returns)
+    np.testing.assert_allclose(correlation_columns(returns, np.array([2, 5])), full[:, [2, 5]], atol=1e-12)
+    assert np.allclose(np.diag(full), 1.0)
+
+
+def test_invalidated_symbol_is_recomputed():
+    stocks = make_stocks()
+    analytics = PerformanceAnalytics()
+    first = analytics.analyze(stocks)
+
+    analytics.invalidate('s2')
+    second = analytics.analyze(stocks)
+
+    assert second is not first
+    assert_same(second, first)
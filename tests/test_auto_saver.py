@@ -0,0 +1,157 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from models.portfolio import Portfolio
+from services.portfolio_store import PortfolioStore
+from ui.auto_saver import AutoSaver
+
+START = datetime(2026, 1, 5, 10, 0)
+
+
+class RecordingStore(PortfolioStore):
+    """Records each write's symbols; ``fail_next`` writes raise and ``gate`` holds writes until set."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.writes = []
+        self.fail_next = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def write(self, batch):
+        self.gate.wait(5)
+        self.writes.append(sorted([row[0] for row in batch['holdings']] + list(batch['removed'])))
+        if self.fail_next:
+            self.fail_next -= 1
+            raise OSError("disk full")
+        super().write(batch)
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def pump(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+        QCoreApplication.processEvents()
+        time.sleep(0.005)
+
+
+def holdings(portfolio: Portfolio):
+    return [(stock.symbol, stock.quantity, stock.current_price) for stock in portfolio.stocks]
+
+
+def make(tmp_path, **kwargs):
+    store = RecordingStore(str(tmp_path / 'portfolio.db'))
+    portfolio = Portfolio()
+    for symbol in ('AAA', 'BBB', 'CCC'):
+        portfolio.add_stock(symbol, 1, 10.0, when=START)
+    saver = AutoSaver(store, lambda: portfolio, **kwargs)
+    events = []
+    saver.saved.connect(lambda count: events.append(('saved', count)))
+    saver.failed.connect(lambda error: events.append(('failed', error)))
+    return store, portfolio, saver, events
+
+
+def test_changes_are_debounced_into_one_save(app, tmp_path):
+    store, portfolio, saver, events = make(tmp_path, delay_ms=60, max_delay_ms=2000)
+
+    for i in range(4):
+        portfolio.get_stock('AAA').update_price(11.0 + i, when=START + timedelta(minutes=i + 1))
+        saver.schedule()
+        QCoreApplication.processEvents()
+        time.sleep(0.02)
+    assert store.writes == []
+
+    pump(lambda: events)
+    assert events == [('saved', 3)]
+    assert store.writes == [['AAA', 'BBB', 'CCC']]
+    saver.close()
+
+
+def test_a_steady_stream_of_changes_is_saved_by_the_max_delay(app, tmp_path):
+    store, portfolio, saver, events = make(tmp_path, delay_ms=100, max_delay_ms=150)
+    started = time.monotonic()
+
+    while not events:
+        assert time.monotonic() - started < 1.0
+        portfolio.get_stock('AAA').update_price(12.0, when=START + timedelta(minutes=1))
+        saver.schedule()
+        QCoreApplication.processEvents()
+        time.sleep(0.03)
+
+    assert time.monotonic() - started < 0.4
+    saver.close()
+
+
+def test_failed_write_puts_holdings_and_removals_back(app, tmp_path):
+    store, portfolio, saver, events = make(tmp_path, delay_ms=10_000)
+    saver.flush()
+    portfolio.get_stock('AAA').update_price(20.0, when=START + timedelta(minutes=1))
+    portfolio.remove_stock('BBB')
+    store.fail_next = 1
+
+    saver.save_in_background()
+    pump(lambda: events)
+    assert events == [('failed', "disk full")]
+    assert saver.is_pending()  # the failure scheduled a retry
+
+    saver.save_in_background()
+    pump(lambda: len(events) == 2)
+    assert events[1] == ('saved', 2)
+    assert store.writes[-2:] == [['AAA', 'BBB'], ['AAA', 'BBB']]
+    assert holdings(PortfolioStore(str(tmp_path / 'portfolio.db')).load()) == holdings(portfolio)
+    saver.close()
+
+
+def test_writes_queued_behind_a_failure_are_skipped_and_put_back(app, tmp_path):
+    store, portfolio, saver, events = make(tmp_path, delay_ms=10_000)
+    saver.flush()
+    revision = store.revision
+    store.gate.clear()
+    store.fail_next = 1
+
+    portfolio.get_stock('AAA').update_price(20.0, when=START + timedelta(minutes=1))
+    saver.save_in_background()
+    portfolio.get_stock('CCC').update_price(30.0, when=START + timedelta(minutes=1))
+    saver.save_in_background()
+    store.gate.set()
+    pump(lambda: len(events) == 2)
+
+    assert [event[0] for event in events] == ['failed', 'failed']
+    assert store.writes[-1] == ['AAA']  # the queued CCC write never reached the store
+    assert store.revision == revision
+
+    saver.save_in_background()
+    pump(lambda: len(events) == 3)
+    assert events[2] == ('saved', 2)
+    assert store.revision == revision + 1
+    assert holdings(PortfolioStore(str(tmp_path / 'portfolio.db')).load()) == holdings(portfolio)
+    saver.close()
+
+
+def test_flush_waits_for_the_background_write_then_saves_the_rest(app, tmp_path):
+    store, portfolio, saver, events = make(tmp_path, delay_ms=10_000)
+    saver.flush()
+    store.gate.clear()
+
+    portfolio.get_stock('AAA').update_price(20.0, when=START + timedelta(minutes=1))
+    saver.save_in_background()
+    portfolio.get_stock('BBB').update_price(25.0, when=START + timedelta(minutes=1))
+    saver.schedule()
+    threading.Timer(0.05, store.gate.set).start()
+
+    assert saver.flush() == 1
+    assert store.writes[-2:] == [['AAA'], ['BBB']]
+    assert not saver.is_pending()
+    QCoreApplication.processEvents()
+    assert events == []  # flush settled the background write itself
+    assert holdings(PortfolioStore(str(tmp_path / 'portfolio.db')).load()) == holdings(portfolio)
+    saver.close()
@@ -0,0 +1,62 @@
+import time
+
+from services.cache import QuoteCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QuoteCache(max_entries=2)
+    cache.set('AAA', 1)
+    cache.set('BBB', 2)
+    cache.get('AAA')
+    cache.set('CCC', 3)
+
+    assert cache.get('BBB') is None
+    assert (cache.get('AAA'), cache.get('CCC')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_their_kind_ttl():
+    cache = QuoteCache(ttls={'quote': 60, 'fundamentals': 3600})
+    old = time.time() - 120
+    cache.set('AAA', {'price': 1.0}, timestamp=old)
+    cache.set('AAA', {'sector': 'Tech'}, kind='fundamentals', timestamp=old)
+
+    assert cache.get('AAA') is None
+    assert cache.get('AAA', kind='fundamentals') == {'sector': 'Tech'}
+    assert len(cache) == 1
+    by_kind = cache.stats()['by_kind']
+    assert by_kind['quote']['expirations'] == 1 and by_kind['fundamentals']['hits'] == 1
+
+
+def test_stats_count_hits_and_misses():
+    cache = QuoteCache()
+    cache.set('AAA', 1)
+    cache.get('AAA')
+    cache.get('AAA')
+    cache.get('BBB')
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+    assert stats['hit_rate'] == 2 / 3
+
+
+def test_stale_grace_serves_expired_entries_only_through_get_entry():
+    cache = QuoteCache(ttls={'quote': 60}, stale_grace={'quote': 300})
+    fetched = time.time() - 120
+    cache.set('AAA', 1, timestamp=fetched)
+
+    assert cache.get('AAA') is None
+    assert cache.get_entry('AAA') == (1, fetched, True)
+
+    cache.set('BBB', 2, timestamp=time.time() - 400)
+    assert cache.get_entry('BBB') is None
+
+
+def test_purge_and_peek():
+    cache = QuoteCache(ttls={'quote': 60})
+    cache.set('AAA', 1, timestamp=time.time() - 120)
+    cache.set('BBB', 2)
+
+    assert cache.peek('AAA') == 1  # regardless of age
+    assert cache.purge_expired() == 1
+    assert cache.peek('AAA') is None and 'BBB' in cache
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from models.corporate_actions import CorporateActions
+from models.stock import Stock
+
+DAY1 = datetime(2026, 3, 2, 10, 0)
+DAY2 = datetime(2026, 3, 3, 10, 0)
+DAY3 = datetime(2026, 3, 4, 10, 0)
+
+
+def test_factors_multiply_every_later_action():
+    actions = CorporateActions()
+    actions.add_split(2, DAY2)
+    actions.add_dividend(1.0, 50.0, DAY3)
+
+    factors = actions.factors(np.array([DAY1.timestamp(), DAY2.timestamp(), DAY3.timestamp()]))
+
+    assert factors.tolist() == pytest.approx([0.5 * 0.98, 0.98, 1.0])
+    assert actions.factor_at(DAY1.timestamp()) == pytest.approx(0.49)
+
+
+def test_actions_round_trip_through_to_list():
+    actions = CorporateActions()
+    actions.add_split(3, DAY2)
+    restored = CorporateActions.from_list(actions.to_list())
+
+    assert restored.factor_at(DAY1.timestamp()) == pytest.approx(1 / 3)
+    assert len(restored) == 1
+
+
+def test_invalid_actions_are_rejected():
+    actions = CorporateActions()
+    with pytest.raises(ValueError):
+        actions.add_split(0, DAY1)
+    with pytest.raises(ValueError):
+        actions.add_dividend(60.0, 50.0, DAY1)
+
+
+def test_split_adjusts_history_on_read_only():
+    stock = Stock('AAA', 10, 100.0, when=DAY1)
+    stock.update_price(102.0, when=DAY1.replace(hour=11))
+    stock.split_stock(2, DAY2)
+    stock.update_price(52.0, when=DAY2.replace(hour=11))
+
+    assert (stock.quantity, stock.purchase_price) == (20, 50.0)
+    assert stock.get_price_window(DAY1, DAY1.replace(hour=12)).prices.tolist() == [50.0, 51.0]
+    assert stock.get_price_window(DAY1, DAY1.replace(hour=12), adjusted=False).prices.tolist() == [100.0, 102.0]
+    assert stock.get_price_as_of(DAY1.replace(hour=12)) == 51.0
+    # Stored prices are untouched.
+    assert stock.price_history.days.closes.tolist() == [102.0, 52.0]
+
+
+def test_undo_split_restores_the_holding():
+    stock = Stock('AAA', 10, 100.0, when=DAY1)
+    stock.split_stock(4, DAY2)
+    undone = stock.undo_corporate_action()
+
+    assert undone['type'] == 'split'
+    assert (stock.quantity, stock.purchase_price, stock.current_price) == (10, 100.0, 100.0)
+    assert stock.get_price_as_of(DAY1) == 100.0
+    assert stock.undo_corporate_action() is None
+
+
+def test_undoing_splits_restores_exact_values():
+    stock = Stock('AAA', 10, 10.0, when=DAY1)
+    for ratio in (3, 7, 1 / 3):
+        stock.split_stock(ratio, DAY2)
+    for _ in range(3):
+        stock.undo_corporate_action()
+
+    assert (stock.quantity, stock.purchase_price, stock.initial_price, stock.current_price) == (10, 10.0, 10.0, 10.0)
+
+
+def test_undo_after_a_new_price_scales_it_back():
+    stock = Stock('AAA', 10, 100.0, when=DAY1)
+    stock.split_stock(4, DAY2)
+    stock.update_price(26.0, when=DAY2.replace(hour=11))
+    stock.undo_corporate_action()
+
+    assert (stock.quantity, stock.purchase_price, stock.current_price) == (10, 100.0, 104.0)
+
+
+def test_dividend_uses_the_close_before_the_ex_date():
+    stock = Stock('AAA', 1, 50.0, when=DAY1)
+    stock.update_price(40.0, when=DAY2)
+    action = stock.record_dividend(2.0, DAY2)
+
+    assert action['factor'] == pytest.approx(1 - 2.0 / 50.0)
+    assert stock.get_price_as_of(DAY1) == pytest.approx(48.0)
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from models.portfolio import Portfolio
+from services.data_service import DataService
+
+
+def write(tmp_path, text: str) -> str:
+    path = tmp_path / 'portfolio.csv'
+    path.write_text(text)
+    return str(path)
+
+
+def test_csv_export_loads_back(tmp_path):
+    portfolio = Portfolio()
+    portfolio.add_stock('AAA', 10, 100.0, when=datetime(2026, 1, 5, 10, 0))
+    portfolio.add_stock('NA', 3, 7.5, when=datetime(2026, 1, 6, 10, 0))
+    portfolio.get_stock('AAA').update_price(110.0, when=datetime(2026, 1, 7, 10, 0))
+    service = DataService()
+    filename = str(tmp_path / 'export.csv')
+    service.save_portfolio_to_csv(portfolio, filename)
+
+    loaded = service.load_portfolio_from_csv(filename)
+
+    assert service.last_load_report.ok
+    assert service.last_load_report.loaded == 2  # the TOTAL row is not a holding
+    assert [(stock.symbol, stock.quantity, stock.purchase_price, stock.current_price, stock.change)
+            for stock in loaded.stocks] == [('AAA', 10, 100.0, 110.0, 10.0), ('NA', 3, 7.5, 7.5, 0.0)]
+    assert loaded.get_stock('AAA').last_updated == datetime(2026, 1, 7, 10, 0)
+    assert loaded.get_stock('NA').purchase_date == datetime(2026, 1, 6, 10, 0)
+
+
+def test_optional_columns_get_defaults(tmp_path):
+    service = DataService()
+    loaded = service.load_portfolio_from_csv(write(tmp_path, "Symbol,Quantity,Initial Price\n aaa ,4,25\n"))
+
+    stock = loaded.get_stock('AAA')
+    assert (stock.quantity, stock.purchase_price, stock.current_price, stock.change_percent) == (4, 25.0, 25.0, 0.0)
+
+
+def test_bad_rows_are_reported_by_line_and_column(tmp_path):
+    service = DataService()
+    filename = write(tmp_path, "\n".join([
+        "Symbol,Quantity,Initial Price,Purchase Date",
+        "AAA,10,100,2026-01-05 10:00:00",
+        "BBB,ten,50,2026-01-05 10:00:00",
+        ",5,20,2026-01-05 10:00:00",
+        "CCC,1,9,not a date",
+        "DDD,-2,9,",
+        "EEE,3,12,01/06/2026",
+    ]) + "\n")
+
+    loaded = service.load_portfolio_from_csv(filename)
+    report = service.last_load_report
+
+    assert [stock.symbol for stock in loaded.stocks] == ['AAA', 'EEE']
+    assert loaded.get_stock('EEE').purchase_date == datetime(2026, 1, 6)
+    assert [(error['line'], error['symbol'], error['column']) for error in report.errors] == [
+        (3, 'BBB', 'Quantity'), (4, None, 'Symbol'), (5, 'CCC', 'Purchase Date'), (6, 'DDD', 'Quantity')
+    ]
+    assert report.errors[0]['value'] == 'ten'
+    assert (report.rows_read, report.loaded, report.skipped) == (6, 2, 4)
+    assert not report.ok
+    assert "line 3 BBB [Quantity]: Not a number" in str(report)
+
+
+def test_missing_required_column_loads_nothing(tmp_path):
+    service = DataService()
+    assert service.load_portfolio_from_csv(write(tmp_path, "Symbol,Quantity\nAAA,1\n")) is None
+    assert [(error['line'], error['column']) for error in service.last_load_report.errors] == [(None, 'Initial Price')]
+
+
+def test_unreadable_file_is_reported(tmp_path):
+    service = DataService()
+    assert service.load_portfolio_from_csv(str(tmp_path / 'missing.csv')) is None
+    assert service.last_load_report.errors[0]['message'].startswith("Cannot read file")
+
+
+def test_numeric_looking_dates_are_parsed_or_reported(tmp_path):
+    service = DataService()
+    loaded = service.load_portfolio_from_csv(write(
+        tmp_path,
+        "Symbol,Quantity,Initial Price,Purchase Date\n"
+        "AAA,1,10,20240101\n"
+        "BBB,2,20,\n"
+        "CCC,3,30,7\n"
+    ))
+
+    assert loaded.get_stock('AAA').purchase_date == datetime(2024, 1, 1)
+    assert loaded.get_stock('BBB') is not None
+    report = service.last_load_report
+    assert report.loaded == 2
+    assert [(error['line'], error['symbol'], error['column']) for error in report.errors] == [
+        (4, 'CCC', 'Purchase Date')
+    ]
@@ -0,0 +1,49 @@
+import time
+
+from services.cache import QuoteCache
+from services.disk_cache import DiskCache
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'quote_cache.db')
+    disk = DiskCache(path)
+    QuoteCache(backing=disk).set('AAA', {'price': 10.5, 'volume': 100})
+    disk.close()
+
+    cache = QuoteCache(backing=DiskCache(path))
+    assert cache.get('AAA') == {'price': 10.5, 'volume': 100}
+    assert cache.stats()['disk_hits'] == 1
+    # Promoted into memory: the next read does not touch disk.
+    cache.get('AAA')
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_expired_disk_entries_are_stale_or_missing(tmp_path):
+    disk = DiskCache(str(tmp_path / 'quote_cache.db'))
+    fetched = time.time() - 120
+    disk.set('AAA', 1, timestamp=fetched)
+
+    assert QuoteCache(ttls={'quote': 60}, backing=disk).get('AAA') is None
+    stale = QuoteCache(ttls={'quote': 60}, stale_grace={'quote': 300}, backing=disk)
+    assert stale.get_entry('AAA') == (1, fetched, True)
+    assert stale.get_stale('AAA') == (1, fetched)
+
+
+def test_oldest_rows_are_pruned_past_max_entries(tmp_path):
+    disk = DiskCache(str(tmp_path / 'quote_cache.db'), max_entries=100)
+    now = time.time()
+    for i in range(150):
+        disk.set(f"S{i:03d}", i, timestamp=now + i)
+
+    assert len(disk) == 100
+    assert disk.get('S000') is None
+    assert disk.get('S149') == (149, now + 149)
+
+
+def test_invalidate_removes_both_tiers(tmp_path):
+    disk = DiskCache(str(tmp_path / 'quote_cache.db'))
+    cache = QuoteCache(backing=disk)
+    cache.set('AAA', 1)
+    cache.invalidate('AAA')
+
+    assert cache.get('AAA') is None and disk.get('AAA') is None
@@ -0,0 +1,46 @@
+import os
+import stat
+
+import pytest
+
+from utils.helpers import atomic_write
+
+
+def mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_the_default_permissions(tmp_path):
+    path = tmp_path / 'export.csv'
+    with atomic_write(str(path), 'w') as file:
+        file.write("Symbol\n")
+
+    assert path.read_text() == "Symbol\n"
+    umask = os.umask(0)
+    os.umask(umask)
+    assert mode(path) == 0o666 & ~umask
+
+
+def test_replaced_file_keeps_its_permissions(tmp_path):
+    path = tmp_path / 'portfolio.csv'
+    path.write_text("old")
+    os.chmod(path, 0o640)
+
+    with atomic_write(str(path), 'w') as file:
+        file.write("new")
+
+    assert path.read_text() == "new"
+    assert mode(path) == 0o640
+
+
+def test_failed_write_leaves_the_original_untouched(tmp_path):
+    path = tmp_path / 'portfolio.csv'
+    path.write_text("original")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path), 'w') as file:
+            file.write("partial")
+            raise RuntimeError("disk full")
+
+    assert path.read_text() == "original"
+    assert os.listdir(tmp_path) == ['portfolio.csv']
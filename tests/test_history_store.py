@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from services.history_store import HistoryStore
+from services.providers import FakeQuoteProvider
+
+
+class EmptyHistoryProvider(FakeQuoteProvider):
+    """Answers history requests with nothing, like a failed provider chain does."""
+
+    def get_history(self, symbol, start, end):
+        self._round_trip()
+        return None
+
+
+def test_repeated_range_is_answered_from_disk(tmp_path):
+    fake = FakeQuoteProvider()
+    store = HistoryStore(str(tmp_path / 'history.db'), fake)
+    start, end = date(2024, 1, 1), date(2024, 3, 29)
+
+    first = store.get_history('AAA', start, end)
+    calls = fake.calls
+    second = store.get_history('AAA', start, end)
+
+    assert len(first) == 65
+    assert second.equals(first)
+    assert fake.calls == calls
+    assert store.coverage('AAA') == [(start, end)]
+
+
+def test_only_the_gaps_are_fetched(tmp_path):
+    fake = FakeQuoteProvider()
+    store = HistoryStore(str(tmp_path / 'history.db'), fake)
+    store.get_history('AAA', date(2024, 2, 1), date(2024, 2, 29))
+
+    assert store.missing_ranges('AAA', date(2024, 1, 1), date(2024, 3, 31)) == [
+        (date(2024, 1, 1), date(2024, 1, 31)), (date(2024, 3, 1), date(2024, 3, 31))
+    ]
+    assert store.fetch_missing('AAA', date(2024, 1, 1), date(2024, 3, 31)) == 2
+    assert store.coverage('AAA') == [(date(2024, 1, 1), date(2024, 3, 31))]
+
+
+def test_empty_answer_is_not_recorded_as_coverage(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'), EmptyHistoryProvider())
+    start, end = date.today() - timedelta(days=5 * 365), date.today()
+
+    assert len(store.get_history('AAA', start, end)) == 0
+    assert store.coverage('AAA') == []
+    assert store.missing_ranges('AAA', start, end) == [(start, end)]
+
+    store.provider = FakeQuoteProvider()
+    assert len(store.get_history('AAA', start, end)) > 1000
@@ -0,0 +1,57 @@
+import numpy as np
+
+from models.holdings import HoldingsTable
+
+
+def test_rows_grow_past_the_initial_capacity():
+    table = HoldingsTable(capacity=2)
+    rows = [table.append(f"S{i}", quantity=i, current_price=10.0) for i in range(5)]
+
+    assert rows == [0, 1, 2, 3, 4]
+    assert table.capacity >= 5
+    assert table.view('quantity').tolist() == [0, 1, 2, 3, 4]
+    assert table.view('purchase_price').tolist() == [0.0] * 5
+
+
+def test_extend_appends_column_arrays():
+    table = HoldingsTable()
+    table.append('AAA', quantity=1)
+    rows = table.extend(np.array(['BBB', 'CCC'], dtype=object), quantity=np.array([2.0, 3.0]),
+                        current_price=np.array([20.0, 30.0]))
+
+    assert rows.tolist() == [1, 2]
+    assert table.symbol_view().tolist() == ['AAA', 'BBB', 'CCC']
+    assert table.view('current_price').tolist() == [0.0, 20.0, 30.0]
+
+
+def test_remove_tombstones_and_compact_keeps_order():
+    table = HoldingsTable()
+    for i, symbol in enumerate(['AAA', 'BBB', 'CCC', 'DDD']):
+        table.append(symbol, quantity=i + 1)
+    table.take_dirty()
+
+    table.remove(1)
+    assert table.size == 4 and table.live_count == 3
+    assert table.view('quantity').tolist() == [1, 0, 3, 4]
+    assert table.alive_view().tolist() == [True, False, True, True]
+
+    table.set('quantity', 3, 40)
+    kept = table.compact()
+    assert kept.tolist() == [0, 2, 3]
+    assert table.symbol_view().tolist() == ['AAA', 'CCC', 'DDD']
+    assert table.view('quantity').tolist() == [1, 3, 40]
+    # The dirty row moved with the compaction.
+    assert table.take_dirty() == [2]
+    assert table.compact() is None
+
+
+def test_dirty_rows_are_handed_out_once():
+    table = HoldingsTable()
+    table.append('AAA')
+    table.append('BBB')
+    assert table.take_dirty() == [0, 1]
+
+    table.touch(1)
+    table.set('current_price', 0, 5.0)
+    assert table.take_dirty() == [0, 1]
+    assert table.take_dirty() == []
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+from models.portfolio import Portfolio
+from services.journal import PortfolioJournal, alert_index
+from services.portfolio_store import PortfolioStore
+
+
+def state(portfolio: Portfolio):
+    return [
+        (stock.symbol, stock.quantity, stock.purchase_price, stock.current_price, stock.change, stock.change_percent,
+         stock.volume, stock.market_cap, stock.last_updated, stock.purchase_date,
+         [entry['price'] for entry in stock.price_history],
+         [(alert['type'], alert['threshold'], alert['triggered'], alert['created'], alert.get('triggered_at'))
+          for alert in stock.alerts],
+         stock.corporate_actions.to_list())
+        for stock in portfolio.stocks
+    ]
+
+
+def mutate(journal: PortfolioJournal, portfolio: Portfolio):
+    journal.apply(portfolio, 'add_stock', 'AAA', 10, 100.0)
+    journal.apply(portfolio, 'add_stock', 'BBB', 5, 50.0)
+    journal.apply(portfolio, 'add_stock', 'CCC', 1, 9.0)
+    for i in range(50):
+        journal.apply(portfolio, 'update_price', 'AAA', 100.0 + i * 0.5, 1000 + i, 0.5, 0.5)
+    journal.apply(portfolio, 'update_fundamentals', 'BBB', 1e9, 15.0, 0.02)
+    journal.apply(portfolio, 'add_quantity', 'BBB', 5, 60.0)
+    journal.apply(portfolio, 'split_stock', 'BBB', 2.0, None)
+    journal.apply(portfolio, 'add_alert', 'AAA', 'above', 110.0, 'take profit')
+    alert = journal.apply(portfolio, 'add_alert', 'AAA', 'below', 90.0, '')
+    alert['triggered'] = True
+    alert['triggered_at'] = datetime.now()
+    journal.record('trigger_alert', 'AAA', alert_index(portfolio.get_stock('AAA'), alert),
+                   timestamp=alert['triggered_at'].timestamp())
+    journal.apply(portfolio, 'remove_alert', 'AAA', 0)
+    journal.apply(portfolio, 'remove_stock', 'CCC')
+
+
+def test_replay_rebuilds_the_same_portfolio(tmp_path):
+    journal = PortfolioJournal(str(tmp_path / 'portfolio.journal'))
+    live = Portfolio(check_consistency=True)
+    mutate(journal, live)
+    journal.close()
+
+    recovered = Portfolio(check_consistency=True)
+    applied = PortfolioJournal(str(tmp_path / 'portfolio.journal')).replay(recovered)
+
+    assert applied == journal.seq
+    assert state(recovered) == state(live)
+
+
+def test_replay_resumes_after_the_saved_sequence(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    journal = PortfolioJournal(str(tmp_path / 'portfolio.journal'))
+    live = Portfolio()
+    journal.apply(live, 'add_stock', 'AAA', 10, 100.0)
+    seq, segment = journal.checkpoint()
+    store.save(live, seq)
+    journal.discard_through(segment)
+
+    # Changes after the save exist only in the journal.
+    journal.apply(live, 'add_stock', 'AAA', 5, 100.0)
+    journal.apply(live, 'update_price', 'AAA', 105.0, None, 5.0, 5.0)
+    journal.close()
+
+    recovered = store.load()
+    reopened = PortfolioJournal(str(tmp_path / 'portfolio.journal'))
+    assert reopened.replay(recovered, after=store.journal_seq) == 2
+    assert state(recovered) == state(live)
+    assert reopened.seq == journal.seq
+
+
+def test_compaction_leaves_nothing_to_replay(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    journal = PortfolioJournal(str(tmp_path / 'portfolio.journal'))
+    live = Portfolio()
+    mutate(journal, live)
+
+    seq, segment = journal.checkpoint()
+    store.save(live, seq)
+    journal.discard_through(segment)
+
+    assert journal.segments() == []
+    recovered = store.load()
+    assert PortfolioJournal(str(tmp_path / 'portfolio.journal')).replay(recovered, after=store.journal_seq) == 0
+    assert [stock.symbol for stock in recovered.stocks] == ['AAA', 'BBB']
+
+
+def test_torn_last_record_is_ignored(tmp_path):
+    journal = PortfolioJournal(str(tmp_path / 'portfolio.journal'))
+    live = Portfolio()
+    journal.apply(live, 'add_stock', 'AAA', 10, 100.0)
+    journal.close()
+    with open(journal.segments()[-1][1], 'a', encoding='utf-8') as file:
+        file.write('[2,1700000000.0,"update_pr')
+
+    recovered = Portfolio()
+    assert PortfolioJournal(str(tmp_path / 'portfolio.journal')).replay(recovered) == 1
+    assert recovered.get_stock('AAA').current_price == 100.0
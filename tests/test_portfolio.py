@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from models.portfolio import Portfolio
+
+
+def test_lookup_is_case_insensitive_and_follows_removals():
+    portfolio = Portfolio()
+    for symbol in ('AAA', 'BBB', 'CCC'):
+        portfolio.add_stock(symbol, 1, 10.0)
+
+    assert portfolio.get_stock('bbb').symbol == 'BBB'
+    assert 'ccc' in portfolio
+    portfolio.remove_stock('BBB')
+    assert portfolio.get_stock('BBB') is None
+    assert 'BBB' not in portfolio
+    assert len(portfolio) == 2
+    portfolio.remove_stock('BBB')  # removing twice is a no-op
+    assert len(portfolio) == 2
+
+
+def test_index_stays_right_across_compaction():
+    portfolio = Portfolio()
+    symbols = [f"S{i:02d}" for i in range(20)]
+    for i, symbol in enumerate(symbols):
+        portfolio.add_stock(symbol, i + 1, 10.0)
+
+    # Removing more than half leaves more tombstones than live rows, which compacts the table.
+    removed = symbols[::3] + symbols[1::3]
+    for symbol in removed:
+        portfolio.remove_stock(symbol)
+    kept = [symbol for symbol in symbols if symbol not in removed]
+
+    assert [stock.symbol for stock in portfolio.stocks] == kept
+    for position, symbol in enumerate(kept):
+        assert portfolio.index_of(symbol) == position
+        assert portfolio.get_stock(symbol).quantity == symbols.index(symbol) + 1
+    assert portfolio.holdings.dead == 0
+
+
+def test_removed_symbol_can_be_added_again():
+    portfolio = Portfolio()
+    portfolio.add_stock('AAA', 5, 10.0)
+    old = portfolio.get_stock('AAA')
+    portfolio.remove_stock('AAA')
+    portfolio.add_stock('AAA', 2, 20.0)
+
+    assert portfolio.get_stock('AAA').quantity == 2
+    assert old.quantity == 5  # the removed Stock keeps its own copy of the row
+    changed, removed = portfolio.take_changes()
+    assert [stock.symbol for stock in changed] == ['AAA'] and removed == ['AAA']
+
+
+def brute_force(portfolio: Portfolio):
+    stocks = portfolio.stocks
+    return {
+        'total_value': sum(stock.quantity * stock.current_price for stock in stocks),
+        'total_cost': sum(stock.quantity * stock.purchase_price for stock in stocks),
+        'total_change': sum(stock.quantity * stock.change for stock in stocks),
+        'best': max((stock.change_percent for stock in stocks), default=None),
+        'worst': min((stock.change_percent for stock in stocks), default=None),
+    }
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_running_aggregates_match_a_full_recompute(seed):
+    rng = random.Random(seed)
+    # check_consistency verifies the running state on every write as well.
+    portfolio = Portfolio(check_consistency=True)
+    symbols = [f"S{i:02d}" for i in range(30)]
+
+    for step in range(2000):
+        symbol = rng.choice(symbols)
+        stock = portfolio.get_stock(symbol)
+        op = rng.random()
+        if stock is None or op < 0.15:
+            portfolio.add_stock(symbol, rng.randint(1, 100), round(rng.uniform(1, 500), 2))
+        elif op < 0.6:
+            stock.update_price(round(stock.current_price * rng.uniform(0.9, 1.1), 4))
+        elif op < 0.7:
+            stock.add_quantity(rng.randint(1, 50), round(rng.uniform(1, 500), 2))
+        elif op < 0.75:
+            stock.remove_quantity(rng.randint(1, 50))
+        elif op < 0.8:
+            stock.split_stock(rng.choice([2, 3, 0.5]))
+        elif op < 0.95:
+            portfolio.remove_stock(symbol)
+        else:
+            portfolio.take_changes()  # compacts
+
+        if step % 50 == 0:
+            expected = brute_force(portfolio)
+            summary = portfolio.summary()
+            assert portfolio.get_total_value() == pytest.approx(expected['total_value'], rel=1e-9, abs=1e-6)
+            assert portfolio.get_total_gain_loss() == pytest.approx(
+                expected['total_value'] - expected['total_cost'], rel=1e-9, abs=1e-6)
+            assert summary['total_change'] == pytest.approx(expected['total_change'], rel=1e-9, abs=1e-6)
+            assert summary['count'] == len(portfolio.stocks)
+            if expected['best'] is None:
+                assert summary['best_performer'] is None and summary['worst_performer'] is None
+            else:
+                assert summary['best_performer'].change_percent == expected['best']
+                assert summary['worst_performer'].change_percent == expected['worst']
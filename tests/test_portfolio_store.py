@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+from models.portfolio import Portfolio
+from services.portfolio_store import PortfolioStore
+
+START = datetime(2026, 1, 5, 10, 0)
+
+
+def holdings(portfolio: Portfolio):
+    return [(stock.symbol, stock.quantity, stock.purchase_price, stock.current_price, stock.volume)
+            for stock in portfolio.stocks]
+
+
+def prices(portfolio: Portfolio, symbol: str):
+    return [entry['price'] for entry in portfolio.get_stock(symbol).price_history]
+
+
+def make_portfolio() -> Portfolio:
+    portfolio = Portfolio()
+    portfolio.add_stock('AAA', 10, 100.0, when=START)
+    portfolio.add_stock('BBB', 5, 50.0, when=START)
+    portfolio.add_stock('CCC', 1, 9.0, when=START)
+    for i in range(5):
+        portfolio.get_stock('AAA').update_price(100.0 + i, volume=1000 + i, when=START + timedelta(minutes=i + 1))
+    return portfolio
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    live = make_portfolio()
+
+    assert store.save(live) == 3
+
+    loaded = PortfolioStore(str(tmp_path / 'portfolio.db')).load()
+    assert holdings(loaded) == holdings(live)
+    assert prices(loaded, 'AAA') == prices(live, 'AAA')
+
+
+def test_only_changed_holdings_are_written(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    live = make_portfolio()
+    store.save(live)
+
+    assert store.save(live) == 0
+    live.get_stock('BBB').update_price(55.0, when=START + timedelta(hours=1))
+    live.remove_stock('CCC')
+    assert store.save(live) == 2
+    assert store.revision == 2
+
+    loaded = PortfolioStore(str(tmp_path / 'portfolio.db')).load()
+    assert holdings(loaded) == holdings(live)
+    assert prices(loaded, 'BBB') == prices(live, 'BBB')
+
+
+def test_incremental_history_matches_a_full_write(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    live = make_portfolio()
+    store.save(live)
+    aaa = live.get_stock('AAA')
+    for i in range(5, 10):
+        aaa.update_price(100.0 + i, when=START + timedelta(minutes=i + 1))
+        store.save(live)
+
+    loaded = PortfolioStore(str(tmp_path / 'portfolio.db')).load()
+    assert prices(loaded, 'AAA') == prices(live, 'AAA')
+
+
+def test_snapshot_revision_keeps_its_state(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    live = make_portfolio()
+    store.save(live)
+    revision = store.create_snapshot("before")
+    before = holdings(live)
+    before_prices = prices(live, 'AAA')
+
+    live.get_stock('AAA').update_price(200.0, when=START + timedelta(days=1))
+    live.remove_stock('BBB')
+    store.save(live)
+
+    assert holdings(store.load(revision)) == before
+    assert prices(store.load(revision), 'AAA') == before_prices
+    assert holdings(store.load()) == holdings(live)
+    assert [snapshot['label'] for snapshot in store.snapshots()] == ["before"]
+
+
+def test_prune_snapshots_drops_versions_only_old_snapshots_see(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    live = make_portfolio()
+    store.save(live)
+    store.create_snapshot("old")
+    live.get_stock('AAA').update_price(150.0, when=START + timedelta(days=1))
+    store.save(live)
+    revision = store.create_snapshot("new")
+    kept = holdings(live)
+    live.get_stock('AAA').update_price(175.0, when=START + timedelta(days=2))
+    store.save(live)
+
+    store.prune_snapshots(keep=1)
+
+    assert [snapshot['revision'] for snapshot in store.snapshots()] == [revision]
+    assert holdings(store.load(revision)) == kept
+    versions = store._conn.execute("SELECT COUNT(*) FROM holdings WHERE symbol = 'AAA'").fetchone()[0]
+    assert versions == 2  # the one the kept snapshot sees and the live one
+
+
+def test_legacy_import_flag(tmp_path):
+    store = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    assert not store.legacy_imported
+    store.mark_legacy_imported()
+    live = make_portfolio()
+    store.save(live)
+    for symbol in ('AAA', 'BBB', 'CCC'):
+        live.remove_stock(symbol)
+    store.save(live)
+
+    reopened = PortfolioStore(str(tmp_path / 'portfolio.db'))
+    assert reopened.is_empty()
+    assert reopened.legacy_imported
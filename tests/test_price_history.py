@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models.price_history import PriceHistory, TieredPriceHistory
+from models.stock import Stock
+
+T0 = datetime(2026, 3, 2, 9, 30).timestamp()
+
+
+def make_history(count: int, capacity=100) -> PriceHistory:
+    history = PriceHistory(capacity)
+    for i in range(count):
+        history.append(T0 + i * 60, 100.0 + i)
+    return history
+
+
+def test_between_bisects_inclusive_bounds():
+    history = make_history(10)
+
+    window = history.between(T0 + 120, T0 + 300)
+
+    assert window.prices.tolist() == [102.0, 103.0, 104.0, 105.0]
+    assert len(history.between(T0 + 121, T0 + 179)) == 0
+    assert len(history.between(None, T0 + 60)) == 2
+    assert history.since(T0 + 480).prices.tolist() == [108.0, 109.0]
+
+
+def test_window_is_a_view_of_the_buffer():
+    history = make_history(10)
+    window = history.between(T0, T0 + 540)
+
+    assert np.shares_memory(window.prices, history.prices)
+
+
+def test_queries_survive_ring_wraparound():
+    history = make_history(250, capacity=100)
+
+    assert len(history) == 100
+    assert history.timestamps[0] == T0 + 150 * 60
+    assert np.all(np.diff(history.timestamps) > 0)
+    assert history.between(T0 + 200 * 60, T0 + 202 * 60).prices.tolist() == [300.0, 301.0, 302.0]
+    assert len(history.between(None, T0 + 149 * 60)) == 0
+
+
+def test_as_of_returns_the_latest_point_not_after():
+    history = make_history(5)
+
+    assert history.as_of(T0 + 150)['price'] == 102.0
+    assert history.as_of(T0 + 120)['price'] == 102.0
+    assert history.as_of(T0 - 1) is None
+    assert history.as_of(datetime.fromtimestamp(T0) + timedelta(days=1))['price'] == 104.0
+
+
+def test_last_days_is_relative_to_now():
+    history = make_history(10)
+    now = datetime.fromtimestamp(T0 + 540)
+
+    assert len(history.last_days(1 / 24 / 60 * 2.5, now=now)) == 3
+
+
+def ticks(history, start: datetime, prices, step=timedelta(seconds=20)):
+    for i, price in enumerate(prices):
+        history.append((start + i * step).timestamp(), price)
+
+
+def test_ticks_are_downsampled_into_minute_and_daily_bars():
+    history = TieredPriceHistory()
+    day = datetime(2026, 3, 2, 9, 30)
+    ticks(history, day, [10.0, 12.0, 9.0, 11.0, 11.5])
+
+    assert len(history.raw) == 5
+    assert history.minutes.to_list()[0] == {'timestamp': day, 'open': 10.0, 'high': 12.0, 'low': 9.0, 'close': 9.0}
+    assert history.minutes.closes.tolist() == [9.0, 11.5]
+    assert history.days.to_list() == [{'timestamp': datetime(2026, 3, 2), 'open': 10.0, 'high': 12.0, 'low': 9.0,
+                                       'close': 11.5}]
+
+
+def test_raw_ticks_only_cover_the_current_session():
+    history = TieredPriceHistory()
+    ticks(history, datetime(2026, 3, 2, 9, 30), [10.0, 11.0])
+    ticks(history, datetime(2026, 3, 3, 9, 30), [12.0, 13.0])
+
+    assert history.prices.tolist() == [12.0, 13.0]
+    assert history.days.closes.tolist() == [11.0, 13.0]
+    assert len(history.minutes) == 2
+
+
+def test_minute_bars_expire_after_the_retention_window():
+    history = TieredPriceHistory(minute_days=1)
+    ticks(history, datetime(2026, 3, 2, 9, 30), [10.0])
+    ticks(history, datetime(2026, 3, 3, 9, 30), [11.0])
+    ticks(history, datetime(2026, 3, 4, 9, 30), [12.0])
+
+    assert history.minutes.closes.tolist() == [11.0, 12.0]
+    assert history.days.closes.tolist() == [10.0, 11.0, 12.0]
+    # Older ranges fall back to daily closes.
+    assert history.between(datetime(2026, 3, 1), None).prices.tolist() == [10.0, 11.0, 12.0]
+    assert history.as_of(datetime(2026, 3, 2, 23, 0))['price'] == 10.0
+
+
+def test_previous_point_crosses_the_session_boundary():
+    history = TieredPriceHistory()
+    assert history.previous_point() is None
+    ticks(history, datetime(2026, 3, 2, 15, 59), [10.0, 10.5])
+    assert history.previous_point()[1] == 10.0
+
+    ticks(history, datetime(2026, 3, 3, 9, 30), [11.0])
+    assert len(history.raw) == 1
+    assert history.previous_point()[1] == 10.5
+
+
+def test_day_gain_on_the_first_tick_of_a_session():
+    stock = Stock('AAA', 10, 100.0, when=datetime(2026, 3, 2, 15, 0))
+    stock.update_price(104.0, when=datetime(2026, 3, 2, 15, 30))
+    stock.update_price(110.0, when=datetime(2026, 3, 3, 9, 30))
+
+    assert stock.get_day_gain_loss() == 60.0
+    assert round(stock.get_day_gain_loss_percent(), 6) == round(6 / 104 * 100, 6)
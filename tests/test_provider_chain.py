@@ -0,0 +1,73 @@
+import pytest
+
+from services.provider_chain import ProviderChain
+from services.providers import FakeQuoteProvider, ProviderError
+
+
+def named(name: str, **kwargs) -> FakeQuoteProvider:
+    provider = FakeQuoteProvider(**kwargs)
+    provider.name = name
+    return provider
+
+
+def test_falls_back_when_the_first_provider_fails():
+    primary, fallback = named('primary'), named('fallback', prices={'AAA': 42.0})
+    primary.outage = True
+    chain = ProviderChain([primary, fallback], prefer_fastest=False)
+
+    assert chain.get_quote('AAA')['price'] == 42.0
+    assert chain.provider_metrics['primary'].errors == 1
+
+
+def test_falls_back_when_the_first_provider_times_out():
+    slow, fast = named('slow', latency=0.3), named('fast', prices={'AAA': 7.0})
+    chain = ProviderChain([slow, fast], timeout=0.05, prefer_fastest=False)
+
+    assert chain.get_quote('AAA')['price'] == 7.0
+
+
+def test_fastest_healthy_provider_goes_first():
+    slow, fast, unused = named('slow', latency=0.02), named('fast'), named('unused')
+    chain = ProviderChain([slow, fast, unused])
+    chain.provider_metrics['slow'].record(0.5, ok=True)
+    chain.provider_metrics['fast'].record(0.1, ok=True)
+
+    assert [provider.name for provider in chain.ordered_providers()] == ['fast', 'slow', 'unused']
+
+    for _ in range(5):
+        chain.provider_metrics['fast'].record(0.1, ok=False)
+    assert [provider.name for provider in chain.ordered_providers()] == ['slow', 'unused', 'fast']
+
+
+def test_all_providers_failing_raises():
+    first, second = named('first'), named('second')
+    first.outage = second.outage = True
+    chain = ProviderChain([first, second])
+
+    with pytest.raises(ProviderError, match='first.*second'):
+        chain.get_quote('AAA')
+
+
+def test_batch_only_sends_the_leftovers_to_the_fallback():
+    primary = named('primary', unknown_symbols=['BBB'])
+    fallback = named('fallback', prices={'BBB': 3.0})
+    chain = ProviderChain([primary, fallback], prefer_fastest=False)
+
+    quotes, errors = chain.get_quotes(['AAA', 'BBB'])
+
+    assert set(quotes) == {'AAA', 'BBB'} and quotes['BBB']['price'] == 3.0
+    assert errors == {}
+
+
+def test_batch_timeout_scales_with_the_batch_and_skips_latency():
+    bulk = named('bulk', latency=0.2)
+    fallback = named('fallback')
+    chain = ProviderChain([bulk, fallback], timeout=0.1, batch_timeout_per_symbol=0.01, prefer_fastest=False)
+    symbols = [f"S{i}" for i in range(20)]
+
+    quotes, errors = chain.get_quotes(symbols)
+
+    # 0.1s + 20 * 0.01s leaves the 0.2s bulk call time to finish.
+    assert len(quotes) == 20 and fallback.calls == 0
+    assert chain.provider_metrics['bulk'].avg_latency is None
+    assert chain.provider_metrics['bulk'].errors == 0
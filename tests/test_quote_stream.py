@@ -0,0 +1,95 @@
+from services.providers import FakeQuoteProvider
+from services.quote_stream import PollingQuoteSource, QuoteStream, ReplayQuoteSource, SimulatedQuoteSource
+from services.stock_service import StockService
+
+
+class RecordingProvider(FakeQuoteProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requested = []
+
+    def get_quotes(self, symbols):
+        self.requested.append(sorted(symbols))
+        return super().get_quotes(symbols)
+
+
+def tick(symbol: str, price: float, timestamp: float = 0.0):
+    return {'symbol': symbol, 'price': price, 'change': 0, 'change_percent': 0, 'volume': None,
+            'timestamp': timestamp}
+
+
+def test_ticks_reach_only_the_subscribers_of_their_symbol():
+    stream = QuoteStream()
+    aaa, both = [], []
+    stream.subscribe(['aaa'], lambda t: aaa.append(t['price']))
+    stream.subscribe(['AAA', 'BBB'], lambda t: both.append((t['symbol'], t['price'])))
+
+    stream.publish(tick('AAA', 1.0))
+    stream.publish(tick('BBB', 2.0))
+    stream.publish(tick('CCC', 3.0))
+
+    assert aaa == [1.0]
+    assert both == [('AAA', 1.0), ('BBB', 2.0)]
+    assert stream.symbols() == {'AAA', 'BBB'}
+
+
+def test_unsubscribe_stops_delivery_and_the_idle_source():
+    source = SimulatedQuoteSource(interval=60, seed=1)
+    stream = QuoteStream(source)
+    received = []
+    subscription = stream.subscribe(['AAA'], received.append)
+    assert source.is_running()
+
+    subscription.unsubscribe()
+    stream.publish(tick('AAA', 1.0))
+
+    assert received == [] and stream.symbols() == set()
+    assert not source.is_running()
+    subscription.unsubscribe()  # a second call is a no-op
+
+
+def test_poller_requests_subscribed_symbols_and_publishes_moves_only():
+    fake = RecordingProvider(prices={'AAA': 10.0, 'BBB': 20.0, 'CCC': 30.0})
+    service = StockService(provider=fake, resilient=False)
+    source = PollingQuoteSource(service)
+    stream = QuoteStream()
+    received = []
+    stream.subscribe(['BBB', 'AAA'], lambda t: received.append((t['symbol'], t['price'])))
+
+    source.poll(stream)
+    assert fake.requested == [['AAA', 'BBB']]
+    assert received == [('AAA', 10.0), ('BBB', 20.0)]
+
+    fake.prices['BBB'] = 21.0
+    service.cache.clear()
+    source.poll(stream)
+
+    assert fake.requested[-1] == ['AAA', 'BBB']
+    assert received[2:] == [('BBB', 21.0)]
+
+
+def test_replay_publishes_in_timestamp_order_and_skips_unsubscribed_symbols():
+    ticks = [tick('BBB', 2.0, 3.0), tick('AAA', 1.0, 1.0), tick('CCC', 9.0, 2.0), tick('aaa', 1.5, 4.0)]
+    source = ReplayQuoteSource(ticks, speed=0)
+    stream = QuoteStream()
+    received = []
+    stream.subscribe(['AAA', 'BBB'], lambda t: received.append((t['symbol'], t['timestamp'])))
+
+    stream.set_source(source)
+    source._thread.join(1)
+
+    assert received == [('AAA', 1.0), ('BBB', 3.0), ('AAA', 4.0)]
+
+
+def test_simulated_source_moves_only_subscribed_symbols():
+    source = SimulatedQuoteSource({'AAA': 100.0}, activity=1.0, seed=7)
+    stream = QuoteStream()
+    received = []
+    stream.subscribe(['AAA'], received.append)
+
+    for _ in range(3):
+        source.poll(stream)
+
+    assert [t['symbol'] for t in received] == ['AAA'] * 3
+    assert all(abs(t['price'] - 100.0) < 5 for t in received)
+    assert received[-1]['change'] == round(received[-1]['price'] - 100.0, 2)
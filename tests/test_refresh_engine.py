@@ -0,0 +1,140 @@
+import threading
+import time
+
+from PyQt6.QtCore import Qt
+
+from services.providers import FakeQuoteProvider
+from services.stock_service import StockService
+from ui.refresh_engine import RefreshEngine
+
+
+class SlowService:
+    """Answers per symbol only, after waiting for ``release`` when the symbol is in ``blocked``."""
+
+    def __init__(self, latency: float = 0.0, blocked=()):
+        self.latency = latency
+        self.blocked = set(blocked)
+        self.release = threading.Event()
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_multiple_stocks(self, symbols):
+        return {symbol: None for symbol in symbols}, {}
+
+    def get_stock_data(self, symbol):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if symbol in self.blocked:
+                self.release.wait(5)
+            time.sleep(self.latency)
+            return {'symbol': symbol, 'price': 1.0, 'fundamentals': None}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def run(engine: RefreshEngine, symbols, cancel_after: float = None):
+    events = []
+    finished = threading.Event()
+    # No Qt event loop in the tests: run the slots on the coordinator thread.
+    direct = Qt.ConnectionType.DirectConnection
+    engine.quote_received.connect(lambda symbol, data: events.append(('received', symbol)), direct)
+    engine.quote_failed.connect(lambda symbol, error: events.append(('failed', symbol, error)), direct)
+    engine.progress_changed.connect(lambda completed, total: events.append(('progress', completed, total)), direct)
+    engine.refresh_finished.connect(lambda ok, bad: (events.append(('finished', ok, bad)), finished.set()), direct)
+
+    assert engine.start(symbols)
+    if cancel_after is not None:
+        time.sleep(cancel_after)
+        engine.cancel()
+    assert finished.wait(5)
+    engine._coordinator.join(5)
+    return events
+
+
+def test_portfolio_is_refreshed_in_batches():
+    fake = FakeQuoteProvider(unknown_symbols=['NOPE'])
+    service = StockService(provider=fake, resilient=False)
+    engine = RefreshEngine(service, max_workers=4, batch_size=50)
+    symbols = [f"S{i:03d}" for i in range(120)] + ['NOPE']
+
+    events = run(engine, symbols)
+    # 3 batches, then one fundamentals call per new symbol and one retry of the miss.
+    assert fake.calls == 3 + 120 + 1
+    assert events[-1] == ('finished', 120, 1)
+    assert ('failed', 'NOPE', "No data returned") in events
+
+    # Fundamentals are cached now, so a price refresh is just the batches and the miss.
+    for symbol in symbols:
+        service.cache.invalidate(symbol, kind='quote')
+    calls = fake.calls
+    run(RefreshEngine(service, max_workers=4, batch_size=50), symbols)
+    assert fake.calls - calls == 3 + 1
+    engine.shutdown()
+
+
+def test_each_symbol_is_reported_once_before_its_progress_and_the_finish():
+    fake = FakeQuoteProvider(unknown_symbols=['NOPE'])
+    engine = RefreshEngine(StockService(provider=fake, resilient=False), max_workers=3, batch_size=4)
+    symbols = ['AAA', 'BBB', 'NOPE', 'CCC', 'DDD', 'EEE']
+
+    events = run(engine, symbols)
+
+    outcomes = [event for event in events if event[0] in ('received', 'failed')]
+    assert sorted(event[1] for event in outcomes) == sorted(symbols)
+    for i, event in enumerate(events[:-1]):
+        if event[0] in ('received', 'failed'):
+            assert events[i + 1][0] == 'progress'
+    progress = [event[1] for event in events if event[0] == 'progress']
+    assert progress == list(range(1, len(symbols) + 1))
+    assert events[-1] == ('finished', 5, 1)
+    engine.shutdown()
+
+
+def test_calls_never_exceed_the_worker_limit():
+    service = SlowService(latency=0.02)
+    engine = RefreshEngine(service, max_workers=3)
+
+    events = run(engine, [f"S{i}" for i in range(12)])
+
+    assert events[-1] == ('finished', 12, 0)
+    assert service.peak == 3
+    engine.shutdown()
+
+
+def test_timed_out_call_keeps_its_worker_slot():
+    service = SlowService(blocked=['STUCK'])
+    engine = RefreshEngine(service, max_workers=2, timeout=0.1)
+
+    events = run(engine, ['STUCK', 'AAA'])
+    assert ('failed', 'STUCK', "Timed out after 0.1s") in events
+    assert events[-1] == ('finished', 1, 1)
+    assert engine.busy_workers() == 1
+
+    # With the limit lowered to one, the next refresh waits for the stuck call to return.
+    engine.set_max_workers(1)
+    assert engine.start(['BBB'])
+    time.sleep(0.1)
+    assert service.peak == 2 and engine.busy_workers() == 1
+    service.release.set()
+    engine._coordinator.join(5)
+    assert engine.busy_workers() == 0
+    assert service.peak == 2
+    engine.shutdown()
+
+
+def test_cancel_reports_every_unfinished_symbol():
+    service = SlowService(blocked=['AAA', 'BBB'])
+    engine = RefreshEngine(service, max_workers=1)
+
+    events = run(engine, ['AAA', 'BBB', 'CCC'], cancel_after=0.1)
+    service.release.set()
+
+    assert [event for event in events if event[0] == 'failed'] == [
+        ('failed', 'BBB', "Cancelled"), ('failed', 'CCC', "Cancelled"), ('failed', 'AAA', "Cancelled")
+    ]
+    assert events[-1] == ('finished', 0, 3)
+    engine.shutdown()
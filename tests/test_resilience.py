@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+
+from services.provider_chain import ProviderChain
+from services.providers import FakeQuoteProvider, ProviderError, SymbolNotFoundError
+from services.resilience import (CircuitBreaker, CircuitOpenError, RateLimitedError, ResilientProvider, RetryPolicy,
+                                 TokenBucket)
+from services.stock_service import StockService
+
+
+class UnknownSymbolProvider(FakeQuoteProvider):
+    def get_quote(self, symbol):
+        self._round_trip()
+        raise SymbolNotFoundError(f"Unknown symbol {symbol}")
+
+
+def make_service(fake: FakeQuoteProvider, failure_threshold: int = 2, reset_timeout: float = 0.05) -> StockService:
+    provider = ResilientProvider(fake, rate=1000.0, retry=RetryPolicy(max_attempts=1),
+                                 breaker=CircuitBreaker(failure_threshold, reset_timeout))
+    return StockService(provider=provider)
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    bucket = TokenBucket(rate=50.0, capacity=3)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    time.sleep(0.03)
+    assert bucket.try_acquire()
+
+
+def test_token_bucket_gives_up_after_the_timeout():
+    bucket = TokenBucket(rate=1.0, capacity=1)
+    bucket.try_acquire()
+
+    started = time.monotonic()
+    assert not bucket.acquire(timeout=0.05)
+    assert time.monotonic() - started < 0.05
+
+
+def test_rate_limited_call_fails_fast_with_max_wait():
+    fake = FakeQuoteProvider()
+    provider = ResilientProvider(fake, rate=0.01, burst=1, max_wait=0)
+    provider.get_quote('AAA')
+
+    with pytest.raises(RateLimitedError):
+        provider.get_quote('BBB')
+    assert fake.calls == 1
+
+
+def test_retry_backoff_stays_under_the_ceiling():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+
+    assert all(0 <= policy.delay(1) <= 0.5 for _ in range(50))
+    assert all(0 <= policy.delay(5) <= 2.0 for _ in range(50))
+
+
+def test_transient_failures_are_retried():
+    fake = FakeQuoteProvider(prices={'AAA': 10.0})
+    provider = ResilientProvider(fake, rate=1000.0, retry=RetryPolicy(max_attempts=3, base_delay=0.001))
+    fake.fail_next(2)
+
+    assert provider.get_quote('AAA')['price'] == 10.0
+    assert fake.calls == 3
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unknown_symbol_does_not_trip_the_breaker_or_retry():
+    fake = UnknownSymbolProvider()
+    provider = ResilientProvider(fake, rate=1000.0, breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(SymbolNotFoundError):
+        provider.get_quote('NOPE')
+    assert fake.calls == 1
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+
+    chain = ProviderChain([provider])
+    with pytest.raises(Exception):
+        chain.get_quote('NOPE')
+    assert chain.provider_metrics[provider.name].error_rate == 0.0
+
+
+def test_breaker_opens_after_repeated_failures_and_recovers():
+    fake = FakeQuoteProvider()
+    service = make_service(fake, failure_threshold=2, reset_timeout=0.05)
+    breaker = service.provider.breaker
+
+    fake.fail_next(2)
+    service.get_multiple_stocks(['AAA'])
+    service.get_multiple_stocks(['BBB'])
+    assert breaker.state == CircuitBreaker.OPEN
+    assert service.connection_state() == CircuitBreaker.OPEN
+
+    # Open: rejected without reaching the provider.
+    calls = fake.calls
+    with pytest.raises(CircuitOpenError):
+        service.provider.get_quote('CCC')
+    assert fake.calls == calls
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert service.get_multiple_stocks(['CCC'])[0]['CCC'] is not None
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_failure_reopens_the_breaker():
+    fake = FakeQuoteProvider()
+    service = make_service(fake, failure_threshold=1, reset_timeout=0.05)
+    breaker = service.provider.breaker
+
+    fake.fail_next(1)
+    service.get_multiple_stocks(['AAA'])
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    fake.fail_next(1)
+    service.get_multiple_stocks(['BBB'])
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+class FixedDelay(RetryPolicy):
+    def delay(self, attempt):
+        return self.base_delay
+
+
+def test_retries_stop_at_the_deadline():
+    fake = FakeQuoteProvider()
+    fake.outage = True
+    provider = ResilientProvider(fake, rate=1000.0, retry=FixedDelay(max_attempts=10, base_delay=0.05),
+                                 breaker=CircuitBreaker(failure_threshold=100))
+
+    started = time.monotonic()
+    with pytest.raises(ProviderError):
+        provider.call(fake.get_quote, 'AAA', deadline=started + 0.12)
+
+    assert time.monotonic() - started < 0.12
+    assert fake.calls <= 3
+
+
+def test_chain_timeout_stops_a_retrying_provider():
+    fake = FakeQuoteProvider(latency=0.02)
+    fake.outage = True
+    provider = ResilientProvider(fake, rate=1000.0, retry=FixedDelay(max_attempts=50, base_delay=0.02),
+                                 breaker=CircuitBreaker(failure_threshold=100))
+    chain = ProviderChain([provider], timeout=0.1)
+
+    with pytest.raises(ProviderError):
+        chain.get_quote('AAA')
+    calls = fake.calls
+    time.sleep(0.2)
+
+    # The worker gave up with the chain instead of retrying on in the background.
+    assert fake.calls == calls <= 3
+
+
+def test_half_open_breaker_lets_a_single_trial_call_through():
+    fake = FakeQuoteProvider(latency=0.1)
+    provider = ResilientProvider(fake, rate=1000.0, retry=RetryPolicy(max_attempts=1),
+                                 breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+    fake.fail_next(1)
+    with pytest.raises(ProviderError):
+        provider.get_quote('AAA')
+    time.sleep(0.06)
+    assert provider.breaker.state == CircuitBreaker.HALF_OPEN
+
+    trial = threading.Thread(target=provider.get_quote, args=('AAA',))
+    trial.start()
+    time.sleep(0.02)
+    with pytest.raises(CircuitOpenError):
+        provider.get_quote('BBB')
+    trial.join(1)
+
+    assert fake.calls == 2
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+    assert provider.get_quote('BBB') is not None
+
+
+def test_trial_call_that_never_reaches_the_provider_is_given_back():
+    fake = FakeQuoteProvider()
+    provider = ResilientProvider(fake, rate=1000.0, retry=RetryPolicy(max_attempts=1),
+                                 breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.01))
+    fake.fail_next(1)
+    with pytest.raises(ProviderError):
+        provider.get_quote('AAA')
+    time.sleep(0.02)
+
+    with pytest.raises(ProviderError):
+        provider.call(fake.get_quote, 'AAA', deadline=time.monotonic())
+    assert fake.calls == 1
+    assert provider.get_quote('AAA') is not None
+    assert provider.breaker.state == CircuitBreaker.CLOSED
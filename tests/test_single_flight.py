@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def wait_until_in_flight(flights: SingleFlight, count: int = 1):
+    deadline = time.monotonic() + 1.0
+    while flights.stats()['in_flight'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    runs = []
+    results = []
+
+    def fetch():
+        runs.append(1)
+        release.wait(1)
+        return 42
+
+    leader = threading.Thread(target=lambda: results.append(flights.do('AAA', fetch)))
+    leader.start()
+    wait_until_in_flight(flights)
+    followers = [threading.Thread(target=lambda: results.append(flights.do('AAA', fetch))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    time.sleep(0.02)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert results == [42] * 4
+    assert len(runs) == 1
+    assert flights.stats() == {'executed': 1, 'coalesced': 3, 'in_flight': 0}
+
+
+def test_exception_reaches_every_waiter():
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fetch():
+        release.wait(1)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flights.do('AAA', fetch)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    wait_until_in_flight(flights)
+    followers = [threading.Thread(target=call) for _ in range(2)]
+    for follower in followers:
+        follower.start()
+    time.sleep(0.02)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+    # A finished key runs again on the next call.
+    assert flights.do('AAA', lambda: 1) == 1
+    assert flights.stats()['executed'] == 2
+
+
+def test_do_many_fetches_only_keys_nobody_else_is_fetching():
+    flights = SingleFlight()
+    release = threading.Event()
+    single = []
+    batches = []
+
+    def fetch_one():
+        release.wait(1)
+        return 'single'
+
+    leader = threading.Thread(target=lambda: single.append(flights.do('AAA', fetch_one)))
+    leader.start()
+    wait_until_in_flight(flights)
+
+    def fetch_many(keys):
+        batches.append(keys)
+        release.set()
+        return {key: f"batch {key}" for key in keys}
+
+    results, errors = flights.do_many(['AAA', 'BBB', 'CCC', 'BBB'], fetch_many)
+    leader.join(2)
+
+    assert batches == [['BBB', 'CCC']]
+    assert results == {'AAA': 'single', 'BBB': 'batch BBB', 'CCC': 'batch CCC'}
+    assert errors == {} and single == ['single']
+    assert flights.stats() == {'executed': 3, 'coalesced': 1, 'in_flight': 0}
+
+
+def test_do_many_failure_is_shared_with_per_key_waiters():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    raised = []
+    outcome = {}
+
+    def fetch_many(keys):
+        started.set()
+        release.wait(1)
+        raise ValueError("bulk down")
+
+    def batch():
+        outcome['batch'] = flights.do_many(['AAA', 'BBB'], fetch_many)
+
+    def single():
+        with pytest.raises(ValueError) as info:
+            flights.do('AAA', lambda: 'never')
+        raised.append(info.value)
+
+    leader = threading.Thread(target=batch)
+    leader.start()
+    assert started.wait(1)
+    follower = threading.Thread(target=single)
+    follower.start()
+    time.sleep(0.02)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    results, errors = outcome['batch']
+    assert results == {} and set(errors) == {'AAA', 'BBB'}
+    assert raised == [errors['AAA']]
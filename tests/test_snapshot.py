@@ -0,0 +1,83 @@
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models.portfolio import Portfolio
+from services.data_service import DataService
+from services.snapshot import read_snapshot, write_snapshot
+
+START = datetime(2026, 3, 2, 9, 30)
+
+
+def state(portfolio: Portfolio):
+    return [
+        (stock.symbol, stock.quantity, stock.initial_price, stock.purchase_price, stock.current_price, stock.change,
+         stock.change_percent, stock.daily_high, stock.daily_low, stock.volume, stock.market_cap, stock.pe_ratio,
+         stock.dividend_yield, stock.last_updated, stock.purchase_date, stock.notes, stock.alerts,
+         stock.corporate_actions.to_list(), [point.tolist() for point in stock.price_history.packed()])
+        for stock in portfolio.stocks
+    ]
+
+
+def make_portfolio() -> Portfolio:
+    portfolio = Portfolio()
+    portfolio.add_stock('AAA', 10, 100.0, when=START)
+    portfolio.add_stock('BBB', 3, 20.5, when=START)
+    portfolio.add_stock('NA', 1, 1.0, when=START)
+    aaa = portfolio.get_stock('AAA')
+    for day in range(3):
+        for minute in range(5):
+            aaa.update_price(100.0 + day + minute / 10, volume=1000 + minute,
+                             when=START + timedelta(days=day, minutes=minute))
+    aaa.update_fundamentals(market_cap=2_500_000_000, pe_ratio=31.5, dividend_yield=0.004)
+    aaa.notes = "long term"
+    aaa.add_alert('above', 150.0, "take profit")
+    aaa.split_stock(2, START + timedelta(days=1))
+    portfolio.get_stock('BBB').add_alert('below', 18.0)
+    return portfolio
+
+
+def test_snapshot_round_trip_is_lossless():
+    portfolio = make_portfolio()
+    buffer = io.BytesIO()
+    write_snapshot(portfolio, buffer)
+    buffer.seek(0)
+
+    restored = read_snapshot(buffer)
+
+    assert state(restored) == state(portfolio)
+    assert isinstance(restored.get_stock('AAA').market_cap, int)
+    assert restored.get_total_value() == portfolio.get_total_value()
+
+
+def test_empty_portfolio_round_trip():
+    buffer = io.BytesIO()
+    write_snapshot(Portfolio(), buffer)
+    buffer.seek(0)
+
+    assert len(read_snapshot(buffer)) == 0
+
+
+def test_foreign_or_newer_files_are_rejected(tmp_path):
+    foreign = tmp_path / 'foreign.npz'
+    np.savez(foreign, values=np.arange(3))
+    with pytest.raises(ValueError, match="Not a portfolio snapshot"):
+        read_snapshot(str(foreign))
+
+    newer = tmp_path / 'newer.npz'
+    np.savez(newer, meta=np.array('{"format": "stock-portfolio-snapshot", "version": 99}'))
+    with pytest.raises(ValueError, match="newer than supported"):
+        read_snapshot(str(newer))
+
+
+def test_data_service_saves_snapshots_atomically(tmp_path):
+    service = DataService()
+    filename = str(tmp_path / 'portfolio_backup.npz')
+    portfolio = make_portfolio()
+
+    service.save_snapshot(portfolio, filename)
+
+    assert state(service.load_snapshot(filename)) == state(portfolio)
+    assert [path.name for path in tmp_path.iterdir()] == ['portfolio_backup.npz']
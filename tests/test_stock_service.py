@@ -0,0 +1,205 @@
+import threading
+import time
+
+from services.providers import FakeQuoteProvider, ProviderError
+from services.resilience import CircuitBreaker, ResilientProvider, RetryPolicy
+from services.stock_service import StockService
+
+
+def make_service(fake: FakeQuoteProvider, failure_threshold: int = 2, reset_timeout: float = 0.05) -> StockService:
+    provider = ResilientProvider(fake, rate=1000.0, retry=RetryPolicy(max_attempts=1),
+                                 breaker=CircuitBreaker(failure_threshold, reset_timeout))
+    return StockService(provider=provider)
+
+
+def test_batch_fetch_is_one_round_trip():
+    fake = FakeQuoteProvider(prices={'AAA': 10.0, 'BBB': 20.0})
+    service = make_service(fake)
+
+    results, _ = service.get_multiple_stocks(['AAA', 'BBB'])
+
+    assert results['AAA']['price'] == 10.0
+    assert results['BBB']['price'] == 20.0
+    assert fake.calls == 1
+
+
+def test_batch_fetch_reports_unknown_symbols_without_failing_the_rest():
+    fake = FakeQuoteProvider(prices={'AAA': 10.0}, unknown_symbols=['NOPE'])
+    service = make_service(fake)
+
+    results, errors = service.get_multiple_stocks(['AAA', 'NOPE'])
+
+    assert results['AAA']['price'] == 10.0
+    assert results['NOPE'] is None
+    assert 'NOPE' in errors and 'AAA' not in errors
+
+
+def test_concurrent_batches_keep_their_own_errors():
+    fake = FakeQuoteProvider(unknown_symbols=['NOPE', 'GONE'], latency=0.02)
+    service = make_service(fake)
+    outcomes = {}
+
+    def fetch(symbols):
+        outcomes[symbols[0]] = service.get_multiple_stocks(symbols)[1]
+
+    threads = [threading.Thread(target=fetch, args=(symbols,)) for symbols in (['NOPE', 'AAA'], ['GONE', 'BBB'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(outcomes['NOPE']) == {'NOPE'}
+    assert set(outcomes['GONE']) == {'GONE'}
+
+
+def test_cached_quotes_skip_the_provider():
+    fake = FakeQuoteProvider()
+    service = make_service(fake)
+    service.get_multiple_stocks(['AAA', 'BBB'])
+
+    service.get_multiple_stocks(['AAA', 'BBB'])
+
+    assert fake.calls == 1
+
+
+def test_outage_maps_every_symbol_to_none():
+    fake = FakeQuoteProvider()
+    fake.outage = True
+    service = make_service(fake)
+
+    results, errors = service.get_multiple_stocks(['AAA', 'BBB'])
+
+    assert results == {'AAA': None, 'BBB': None}
+    assert set(errors) == {'AAA', 'BBB'}
+
+
+def make_swr_service(fake: FakeQuoteProvider) -> StockService:
+    service = StockService(provider=fake, resilient=False, quote_ttl=60, stale_while_revalidate=True,
+                           max_staleness=300)
+    service.cache.set('AAA', {'symbol': 'AAA', 'price': 1.0}, kind='quote', timestamp=time.time() - 120)
+    return service
+
+
+def test_stale_quote_is_served_while_it_revalidates():
+    fake = FakeQuoteProvider(prices={'AAA': 10.0}, latency=0.05)
+    service = make_swr_service(fake)
+    landed = threading.Event()
+    updates = []
+    service.add_listener(lambda symbol, data: (updates.append((symbol, data['price'])), landed.set()))
+
+    started = time.monotonic()
+    quotes = [service.get_quote('AAA') for _ in range(5)]
+    assert time.monotonic() - started < 0.05
+    assert all(quote['stale'] and quote['price'] == 1.0 for quote in quotes)
+
+    assert landed.wait(1.0)
+    service.shutdown()
+    assert updates == [('AAA', 10.0)]
+    assert fake.calls == 1  # one background refresh for all five stale reads
+    fresh = service.get_quote('AAA')
+    assert fresh['price'] == 10.0 and 'stale' not in fresh
+
+
+def test_quote_past_max_staleness_is_fetched_synchronously():
+    fake = FakeQuoteProvider(prices={'AAA': 10.0})
+    service = make_swr_service(fake)
+    service.cache.set('AAA', {'symbol': 'AAA', 'price': 1.0}, kind='quote', timestamp=time.time() - 400)
+
+    quote = service.get_quote('AAA')
+
+    assert quote['price'] == 10.0 and 'stale' not in quote
+    assert fake.calls == 1
+    service.shutdown()
+
+
+class CountingProvider(FakeQuoteProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.quote_calls = 0
+        self.fundamentals_calls = 0
+
+    def get_quote(self, symbol):
+        self.quote_calls += 1
+        return super().get_quote(symbol)
+
+    def get_fundamentals(self, symbol):
+        self.fundamentals_calls += 1
+        return super().get_fundamentals(symbol)
+
+
+def test_price_refresh_within_the_fundamentals_ttl_skips_fundamentals():
+    fake = CountingProvider(prices={'AAA': 10.0})
+    service = StockService(provider=fake, resilient=False, quote_ttl=0.05, fundamentals_ttl=3600)
+
+    for _ in range(3):
+        data = service.get_stock_data('AAA')
+    assert data['company_name'] == "AAA Corp" and data['price'] == 10.0
+    assert (fake.quote_calls, fake.fundamentals_calls) == (1, 1)
+
+    time.sleep(0.06)
+    fake.prices['AAA'] = 11.0
+    data = service.get_stock_data('AAA')
+
+    assert data['price'] == 11.0 and data['market_cap'] == 1e9
+    assert (fake.quote_calls, fake.fundamentals_calls) == (2, 1)
+
+    by_kind = service.get_cache_stats()['by_kind']
+    assert by_kind['quote']['hits'] == 2 and by_kind['quote']['misses'] == 2
+    assert by_kind['fundamentals']['hits'] == 3 and by_kind['fundamentals']['misses'] == 1
+
+
+def test_concurrent_quote_fetches_share_one_provider_call():
+    fake = FakeQuoteProvider(prices={'AAA': 10.0}, latency=0.1)
+    service = StockService(provider=fake, resilient=False)
+    quotes = []
+
+    threads = [threading.Thread(target=lambda: quotes.append(service.get_quote('AAA'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+
+    assert [quote['price'] for quote in quotes] == [10.0] * 4
+    assert fake.calls == 1
+    assert service.get_cache_stats()['single_flight'] == {'executed': 1, 'coalesced': 3, 'in_flight': 0}
+
+
+def test_batch_and_per_symbol_fetches_of_a_symbol_share_one_call():
+    fake = FakeQuoteProvider(prices={'AAA': 10.0, 'BBB': 20.0}, latency=0.1)
+    service = StockService(provider=fake, resilient=False)
+    outcome = {}
+
+    batch = threading.Thread(target=lambda: outcome.update(batch=service.get_multiple_stocks(['AAA', 'BBB'])))
+    batch.start()
+    while service.flights.stats()['in_flight'] < 2:
+        time.sleep(0.001)
+    single = threading.Thread(target=lambda: outcome.update(single=service.get_quote('AAA')))
+    single.start()
+    batch.join(2)
+    single.join(2)
+
+    assert fake.calls == 1
+    assert outcome['single']['price'] == 10.0
+    assert outcome['batch'][0]['BBB']['price'] == 20.0
+    assert service.flights.stats()['coalesced'] == 1
+
+
+def test_failed_fetch_reaches_every_waiter():
+    fake = FakeQuoteProvider(latency=0.1)
+    fake.fail_next(1)
+    service = StockService(provider=fake, resilient=False)
+    errors = []
+
+    def fetch():
+        try:
+            service.get_quote('AAA')
+        except ProviderError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(errors) == 3 and fake.calls == 1
@@ -0,0 +1,131 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+class AutoSaver(QObject):
+    """Debounced background saves of a portfolio to a PortfolioStore.
+
+    schedule() after each change; a save runs once changes have been quiet
+    for ``delay_ms``, or at the latest ``max_delay_ms`` after the first
+    unsaved change, so a steady stream of ticks still gets persisted.
+    Pending changes are collected on the GUI thread (store.prepare) and
+    written by a single background thread, which keeps revisions in order.
+    A failed write puts its changes back for the next attempt, and writes
+    queued behind it are skipped and put back too, so a committed revision
+    never lacks the changes of an earlier one. flush() saves synchronously,
+    for shutdown and explicit saves.
+
+    With a PortfolioJournal every mutation is already durable, so a save is
+    a compaction: it seals the journal segment, saves with the journal's
+    sequence number and deletes the sealed segments once that committed.
+    More than ``compact_after`` records since the last one start a save
+    straight away.
+    """
+    saved = pyqtSignal(int)
+    failed = pyqtSignal(str)
+    _write_finished = pyqtSignal(object)
+
+    def __init__(self, store, get_portfolio: Callable, delay_ms: int = 2000, max_delay_ms: int = 10000,
+                 journal=None, compact_after: int = 10000, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.get_portfolio = get_portfolio
+        self.delay_ms = delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.journal = journal
+        self.compact_after = compact_after
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.save_in_background)
+        self._first_change: Optional[float] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        # Writes whose outcome the GUI thread has not handled yet, in submission order.
+        self._in_flight: Dict[Future, Tuple] = {}
+        self._write_failed = False
+        self._write_finished.connect(self._on_write_finished)
+
+    def schedule(self):
+        if self.journal is not None and self.journal.pending >= self.compact_after:
+            self.save_in_background()
+            return
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        remaining_ms = self.max_delay_ms - (now - self._first_change) * 1000
+        self._timer.start(int(max(0, min(self.delay_ms, remaining_ms))))
+
+    def cancel(self):
+        self._timer.stop()
+        self._first_change = None
+
+    def is_pending(self) -> bool:
+        return self._timer.isActive() or bool(self._in_flight)
+
+    def save_in_background(self):
+        self.cancel()
+        portfolio = self.get_portfolio()
+        journal_seq, segment = self.journal.checkpoint() if self.journal is not None else (None, None)
+        batch = self.store.prepare(portfolio, journal_seq)
+        if batch is None:
+            return
+        future = self._executor.submit(self._write, batch)
+        self._in_flight[future] = (portfolio, batch, segment)
+        future.add_done_callback(self._write_finished.emit)
+
+    def _write(self, batch: Dict):
+        # Runs on the worker thread; the flag is only reset once nothing is queued.
+        if self._write_failed:
+            raise RuntimeError("skipped after an earlier save failed")
+        try:
+            self.store.write(batch)
+        except Exception:
+            self._write_failed = True
+            raise
+
+    def _settle(self, future: Future) -> Tuple[Dict, Optional[BaseException]]:
+        """Handle a write's outcome once (waiting for it if needed).
+
+        A failure puts its changes back; a success lets the journal drop the
+        segments the write covered.
+        """
+        portfolio, batch, segment = self._in_flight.pop(future)
+        error = future.exception()
+        if error is not None:
+            self.store.retry_later(portfolio, batch)
+        elif segment is not None:
+            self.journal.discard_through(segment)
+        if not self._in_flight:
+            self._write_failed = False
+        return batch, error
+
+    def _on_write_finished(self, future: Future):
+        if future not in self._in_flight:
+            return  # already settled by flush()
+        batch, error = self._settle(future)
+        if error is None:
+            self.saved.emit(len(batch['holdings']) + len(batch['removed']))
+            return
+        self.failed.emit(str(error))
+        self.schedule()
+
+    def flush(self) -> int:
+        """Wait for background writes, then save what is left on this thread; returns how many changed."""
+        self.cancel()
+        for future in list(self._in_flight):
+            _, error = self._settle(future)
+            if error is not None:
+                print(f"Background save failed: {error}")
+        if self.journal is None:
+            return self.store.save(self.get_portfolio())
+        journal_seq, segment = self.journal.checkpoint()
+        written = self.store.save(self.get_portfolio(), journal_seq)
+        self.journal.discard_through(segment)
+        return written
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=True)
@@ -1,5 +1,4 @@
 import sys
-import requests
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QSpinBox, QPushButton, QFormLayout,
                              QComboBox, QCompleter, QFrame, QGroupBox, QTextEdit,
@@ -12,78 +11,47 @@ class StockDataFetcher(QThread):
     data_received = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, symbol):
+    def __init__(self, symbol, stock_service=None):
         super().__init__()
         self.symbol = symbol
+        self.stock_service = stock_service
         
     def run(self):
         try:
-            try:
-                import yfinance as yf
-                ticker = yf.Ticker(self.symbol)
-                info = ticker.info
-                
-                # Get current price
-                hist = ticker.history(period="1d")
-                current_price = hist['Close'].iloc[-1] if not hist.empty else 0
-                
-                data = {
-                    'symbol': self.symbol,
-                    'name': info.get('longName', 'N/A'),
-                    'current_price': current_price,
-                    'market_cap': info.get('marketCap', 'N/A'),
-                    'pe_ratio': info.get('trailingPE', 'N/A'),
-                    'dividend_yield': info.get('dividendYield', 'N/A'),
-                    'beta': info.get('beta', 'N/A'),
-                    'sector': info.get('sector', 'N/A'),
-                    'industry': info.get('industry', 'N/A'),
-                    'description': info.get('longBusinessSummary', 'N/A')[:200] + '...' if info.get('longBusinessSummary') else 'N/A'
-                }
-                self.data_received.emit(data)
-                
-            except ImportError:
+            if self.stock_service is None:
+                from services.stock_service import StockService
+                self.stock_service = StockService()
             
-                API_KEY = "GQ5DS63MNI7EZ9UD"  
-                
-              
-                overview_url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={self.symbol}&apikey={API_KEY}"
-                quote_url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={self.symbol}&apikey={API_KEY}"
-                
-                overview_response = requests.get(overview_url, timeout=10)
-                quote_response = requests.get(quote_url, timeout=10)
-                
-                if overview_response.status_code == 200 and quote_response.status_code == 200:
-                    overview_data = overview_response.json()
-                    quote_data = quote_response.json()
-                    
-                    if "Global Quote" in quote_data:
-                        quote_info = quote_data["Global Quote"]
-                        current_price = float(quote_info.get("05. price", 0))
-                    else:
-                        current_price = 0
-                    
-                    data = {
-                        'symbol': self.symbol,
-                        'name': overview_data.get('Name', 'N/A'),
-                        'current_price': current_price,
-                        'market_cap': overview_data.get('MarketCapitalization', 'N/A'),
-                        'pe_ratio': overview_data.get('PERatio', 'N/A'),
-                        'dividend_yield': overview_data.get('DividendYield', 'N/A'),
-                        'beta': overview_data.get('Beta', 'N/A'),
-                        'sector': overview_data.get('Sector', 'N/A'),
-                        'industry': overview_data.get('Industry', 'N/A'),
-                        'description': overview_data.get('Description', 'N/A')[:200] + '...' if overview_data.get('Description') else 'N/A'
-                    }
-                    self.data_received.emit(data)
-                else:
-                    self.error_occurred.emit("Failed to fetch data from API")
+            # Goes through the shared service so this uses the same provider
+            # fallback chain as the refresh, and a refresh fetching the same
+            # symbol right now is coalesced with this request.
+            quote = self.stock_service.get_quote(self.symbol)
+            if not quote:
+                self.error_occurred.emit("Failed to fetch data from API")
+                return
+            fundamentals = self.stock_service.get_fundamentals(self.symbol) or {}
+            
+            data = {
+                'symbol': self.symbol,
+                'name': fundamentals.get('company_name', 'N/A'),
+                'current_price': quote['price'],
+                'market_cap': fundamentals.get('market_cap') or 'N/A',
+                'pe_ratio': fundamentals.get('pe_ratio') or 'N/A',
+                'dividend_yield': fundamentals.get('dividend_yield') or 'N/A',
+                'beta': fundamentals.get('beta') or 'N/A',
+                'sector': fundamentals.get('sector', 'N/A'),
+                'industry': fundamentals.get('industry', 'N/A'),
+                'description': fundamentals.get('description', 'N/A')
+            }
+            self.data_received.emit(data)
                     
         except Exception as e:
             self.error_occurred.emit(str(e))
 
 class AddStockDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, stock_service=None):
         super().__init__(parent)
+        self.stock_service = stock_service
         self.setWindowTitle("Add Stock to Portfolio")
         self.setModal(True)
         self.setFixedSize(600, 650)
@@ -405,7 +373,7 @@ class AddStockDialog(QDialog):
         self.progress_bar.setRange(0, 0)  
         self.details_text.setText("Fetching company data...")
         
-        self.fetch_thread = StockDataFetcher(symbol.upper())
+        self.fetch_thread = StockDataFetcher(symbol.upper(), stock_service=self.stock_service)
         self.fetch_thread.data_received.connect(self.on_data_received)
         self.fetch_thread.error_occurred.connect(self.on_error_occurred)
         self.fetch_thread.start()
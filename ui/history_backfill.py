@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Iterable, List, Set
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+class HistoryBackfill(QObject):
+    """Downloads daily history for held symbols into the local HistoryStore, off the GUI thread.
+
+    request() queues the symbols not fetched yet this session (or whose
+    last attempt failed); StockService.get_history only downloads the days
+    the store is missing, so repeat sessions cost little. Symbols that land
+    are reported together through ``loaded`` once ``batch_ms`` has passed,
+    so a large portfolio redraws once instead of once per symbol.
+    """
+    loaded = pyqtSignal(list)
+    _fetched = pyqtSignal(str, bool)
+
+    def __init__(self, stock_service, lookback_days: int = 5 * 365, max_workers: int = 2, batch_ms: int = 300,
+                 parent=None):
+        super().__init__(parent)
+        self.stock_service = stock_service
+        self.lookback_days = lookback_days
+        self._requested: Set[str] = set()
+        self._landed: List[str] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="history-backfill")
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(batch_ms)
+        self._timer.timeout.connect(self._emit_loaded)
+        self._fetched.connect(self._on_fetched)
+
+    def request(self, symbols: Iterable[str]):
+        for symbol in symbols:
+            symbol = symbol.upper()
+            if symbol in self._requested:
+                continue
+            self._requested.add(symbol)
+            self._executor.submit(self._fetch, symbol)
+
+    def _fetch(self, symbol: str):
+        start = date.today() - timedelta(days=self.lookback_days)
+        bars = self.stock_service.get_history(symbol, start)
+        self._fetched.emit(symbol, bars is not None)
+
+    def _on_fetched(self, symbol: str, ok: bool):
+        if not ok:
+            self._requested.discard(symbol)  # try again next time
+            return
+        self._landed.append(symbol)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _emit_loaded(self):
+        landed, self._landed = self._landed, []
+        if landed:
+            self.loaded.emit(landed)
+
+    def shutdown(self):
+        self._timer.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -4,13 +4,12 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox,
                              QProgressBar, QTextEdit, QSplitter, QGroupBox,
                              QGridLayout, QScrollArea, QSystemTrayIcon, QMenu,
-                             QSlider, QCheckBox, QDateEdit, QTimeEdit, QSizePolicy)
+                             QSlider, QCheckBox, QDateEdit, QTimeEdit, QSizePolicy, QFileDialog)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QPropertyAnimation, QEasingCurve, QRect, QDate, QTime, QSize
 from PyQt6.QtGui import QFont, QPixmap, QPainter, QIcon, QAction, QColor, QPalette
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import pandas as pd
 from datetime import datetime, timedelta
 import numpy as np
 import os
@@ -18,7 +17,15 @@ import os
 from models.portfolio import Portfolio
 from services.stock_service import StockService
 from services.data_service import DataService
+from services.journal import alert_index
+from services.quote_stream import QuoteStream, PollingQuoteSource, SimulatedQuoteSource
+from services.alert_engine import AlertEngine
+from services.analytics import PerformanceAnalytics
 from ui.dialogs import AddStockDialog
+from ui.refresh_engine import RefreshEngine
+from ui.quote_stream_bridge import QuoteStreamBridge
+from ui.auto_saver import AutoSaver
+from ui.history_backfill import HistoryBackfill
 from utils.helpers import format_currency, format_percentage
 
 class AnimatedButton(QPushButton):
@@ -121,14 +128,36 @@ class StockCard(QFrame):
         self.setLayout(layout)
 
 class MainWindow(QMainWindow):
+    quote_revalidated = pyqtSignal(str, dict)
+
     def __init__(self):
         super().__init__()
         self.portfolio = Portfolio()
-        self.stock_service = StockService()
-        self.data_service = DataService()
+        self.stock_service = StockService(cache_path="quote_cache.db", history_path="price_history.db",
+                                          stale_while_revalidate=True, max_staleness=300)
+        # Background refreshes land on a worker thread; the signal hops them to the GUI thread.
+        self.stale_symbols = set()
+        self.quote_revalidated.connect(self.on_quote_received)
+        self.stock_service.add_listener(self.quote_revalidated.emit)
+        self.data_service = DataService(store_path="portfolio.db", journal_path="portfolio.journal")
+        # Every change is journaled as it happens, so saves only need to compact the journal now and then.
+        self.journal = self.data_service.journal
+        self.auto_saver = AutoSaver(self.data_service.store, lambda: self.portfolio, delay_ms=30000,
+                                    max_delay_ms=300000, journal=self.journal, parent=self)
+        self.auto_saver.failed.connect(self.on_autosave_failed)
         
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.refresh_data)
+
+        self.refresh_engine = RefreshEngine(self.stock_service, max_workers=8, timeout=15.0, parent=self)
+        self.refresh_engine.quote_received.connect(self.on_quote_received)
+        self.refresh_engine.quote_failed.connect(self.on_quote_failed)
+        self.refresh_engine.progress_changed.connect(self.on_refresh_progress)
+        self.refresh_engine.refresh_finished.connect(self.on_refresh_finished)
+        
+        self.quote_stream = QuoteStreamBridge(QuoteStream(), parent=self)
+        self.quote_stream.tick_received.connect(self.on_tick)
+        self.stream_mode = "Off"
         
         self.clock_timer = QTimer()
         self.clock_timer.timeout.connect(self.update_clock)
@@ -139,8 +168,20 @@ class MainWindow(QMainWindow):
         self.notification_enabled = True
         self.refresh_interval = 30
         
-        self.performance_data = []
-        self.alerts = []
+        self.performance_window = timedelta(days=1)
+
+        # Alerts fired within the batch window are announced together.
+        self.alert_engine = AlertEngine()
+        self.alert_rows = []
+        self.alert_flush_timer = QTimer()
+        self.alert_flush_timer.setSingleShot(True)
+        self.alert_flush_timer.setInterval(500)
+        self.alert_flush_timer.timeout.connect(self.flush_alerts)
+
+        self.analytics = PerformanceAnalytics(history_store=self.stock_service.history_store)
+        self.history_backfill = HistoryBackfill(self.stock_service, lookback_days=self.analytics.lookback_days,
+                                                parent=self)
+        self.history_backfill.loaded.connect(self.on_history_backfilled)
         
         self.init_ui()
         self.load_portfolio()
@@ -212,6 +253,7 @@ class MainWindow(QMainWindow):
         self.create_alerts_tab()
         self.create_settings_tab()
         
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
         main_layout.addWidget(self.tab_widget)
         
         self.setup_status_bar()
@@ -555,14 +597,37 @@ class MainWindow(QMainWindow):
         perf_group = QGroupBox("Performance Analytics")
         perf_layout = QGridLayout()
         
-        perf_label = QLabel("Advanced analytics coming soon...")
-        perf_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        perf_label.setStyleSheet("font-size: 16px; color: #7f8c8d; padding: 40px;")
-        
-        perf_layout.addWidget(perf_label)
+        self.benchmark_combo = QComboBox()
+        self.benchmark_combo.currentIndexChanged.connect(self.update_analytics)
+        self.analytics_period_label = QLabel("No price history yet")
+        self.analytics_period_label.setStyleSheet("color: #7f8c8d;")
+        
+        self.analytics_table = QTableWidget()
+        self.analytics_table.setColumnCount(7)
+        self.analytics_table.setHorizontalHeaderLabels(["Symbol", "Return", "Volatility", "Sharpe",
+                                                        "Sortino", "Max Drawdown", "Beta"])
+        self.analytics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.analytics_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.analytics_table.setMinimumHeight(250)
+        
+        perf_layout.addWidget(QLabel("Beta against:"), 0, 0)
+        perf_layout.addWidget(self.benchmark_combo, 0, 1)
+        perf_layout.addWidget(self.analytics_period_label, 0, 2)
+        perf_layout.addWidget(self.analytics_table, 1, 0, 1, 3)
+        perf_layout.setColumnStretch(2, 1)
         perf_group.setLayout(perf_layout)
         layout.addWidget(perf_group)
         
+        correlation_group = QGroupBox("Return Correlation")
+        correlation_layout = QVBoxLayout()
+        self.correlation_figure = Figure(figsize=(6, 5), dpi=80)
+        self.correlation_canvas = FigureCanvas(self.correlation_figure)
+        self.correlation_canvas.setMinimumHeight(400)
+        correlation_layout.addWidget(self.correlation_canvas)
+        correlation_group.setLayout(correlation_layout)
+        layout.addWidget(correlation_group)
+        
+        self.analytics_tab = analytics_scroll
         self.tab_widget.addTab(analytics_scroll, "📊 Analytics")
         
     def create_alerts_tab(self):
@@ -577,14 +642,56 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout()
         alerts_widget.setLayout(layout)
         
+        form_group = QGroupBox("New Alert")
+        form_layout = QHBoxLayout()
+        
+        self.alert_symbol_combo = QComboBox()
+        self.alert_type_combo = QComboBox()
+        self.alert_type_combo.addItem("Price above", "above")
+        self.alert_type_combo.addItem("Price below", "below")
+        self.alert_type_combo.addItem("Move of at least (%)", "change_percent")
+        self.alert_threshold_spin = QDoubleSpinBox()
+        self.alert_threshold_spin.setRange(0, 1000000)
+        self.alert_threshold_spin.setDecimals(2)
+        self.alert_message_input = QLineEdit()
+        self.alert_message_input.setPlaceholderText("Message (optional)")
+        add_alert_btn = QPushButton("➕ Add Alert")
+        add_alert_btn.setStyleSheet(self.get_button_style("#27ae60", "#229954"))
+        add_alert_btn.clicked.connect(self.add_alert)
+        
+        form_layout.addWidget(QLabel("Symbol:"))
+        form_layout.addWidget(self.alert_symbol_combo)
+        form_layout.addWidget(self.alert_type_combo)
+        form_layout.addWidget(self.alert_threshold_spin)
+        form_layout.addWidget(self.alert_message_input, 1)
+        form_layout.addWidget(add_alert_btn)
+        form_group.setLayout(form_layout)
+        layout.addWidget(form_group)
+        
         alerts_group = QGroupBox("Price Alerts")
         alerts_layout = QVBoxLayout()
         
-        alerts_label = QLabel("Price alerts and notifications coming soon...")
-        alerts_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        alerts_label.setStyleSheet("font-size: 16px; color: #7f8c8d; padding: 40px;")
-        
-        alerts_layout.addWidget(alerts_label)
+        self.alerts_table = QTableWidget()
+        self.alerts_table.setColumnCount(5)
+        self.alerts_table.setHorizontalHeaderLabels(["Symbol", "Condition", "Threshold", "Message", "Status"])
+        self.alerts_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.alerts_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.alerts_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.alerts_table.setMinimumHeight(300)
+        
+        buttons_layout = QHBoxLayout()
+        remove_alert_btn = QPushButton("🗑️ Remove Selected")
+        remove_alert_btn.setStyleSheet(self.get_button_style("#e74c3c", "#c0392b"))
+        remove_alert_btn.clicked.connect(self.remove_alert)
+        clear_triggered_btn = QPushButton("🧹 Clear Triggered")
+        clear_triggered_btn.setStyleSheet(self.get_button_style("#95a5a6", "#7f8c8d"))
+        clear_triggered_btn.clicked.connect(self.clear_triggered_alerts)
+        buttons_layout.addWidget(remove_alert_btn)
+        buttons_layout.addWidget(clear_triggered_btn)
+        buttons_layout.addStretch()
+        
+        alerts_layout.addWidget(self.alerts_table)
+        alerts_layout.addLayout(buttons_layout)
         alerts_group.setLayout(alerts_layout)
         layout.addWidget(alerts_group)
         
@@ -624,6 +731,33 @@ class MainWindow(QMainWindow):
         autosave_group.setLayout(autosave_layout)
         layout.addWidget(autosave_group)
         
+        network_group = QGroupBox("Network")
+        network_layout = QHBoxLayout()
+        
+        self.max_workers_spin = QSpinBox()
+        self.max_workers_spin.setRange(1, 32)
+        self.max_workers_spin.setValue(self.refresh_engine.max_workers)
+        self.max_workers_spin.valueChanged.connect(self.update_max_workers)
+        
+        network_layout.addWidget(QLabel("Concurrent requests:"))
+        network_layout.addWidget(self.max_workers_spin)
+        network_layout.addStretch()
+        network_group.setLayout(network_layout)
+        layout.addWidget(network_group)
+        
+        stream_group = QGroupBox("Price Stream")
+        stream_layout = QHBoxLayout()
+        
+        self.stream_combo = QComboBox()
+        self.stream_combo.addItems(["Off", "Live (polling)", "Simulated (demo)"])
+        self.stream_combo.currentTextChanged.connect(self.set_stream_mode)
+        
+        stream_layout.addWidget(QLabel("Push price ticks:"))
+        stream_layout.addWidget(self.stream_combo)
+        stream_layout.addStretch()
+        stream_group.setLayout(stream_layout)
+        layout.addWidget(stream_group)
+        
         layout.addStretch()
         self.tab_widget.addTab(settings_scroll, "⚙️ Settings")
         
@@ -688,6 +822,8 @@ class MainWindow(QMainWindow):
         self.refresh_label.setText(f"{value}s")
         if self.refresh_timer.isActive():
             self.refresh_timer.start(value * 1000)
+        if isinstance(self.quote_stream.stream.source, PollingQuoteSource):
+            self.quote_stream.stream.source.interval = value
             
     def toggle_theme(self, checked):
         self.dark_theme = checked
@@ -695,20 +831,48 @@ class MainWindow(QMainWindow):
         
     def toggle_autosave(self, checked):
         self.auto_save_enabled = checked
+        self.journal.enabled = checked
+        if checked:
+            # Changes made while off were not journaled; save them so replay never has to skip over a gap.
+            self.save_portfolio()
+        else:
+            self.auto_saver.cancel()
+
+    def schedule_autosave(self):
+        """Note a portfolio change; the auto-saver writes it out once changes settle."""
+        if self.auto_save_enabled:
+            self.auto_saver.schedule()
+
+    def on_autosave_failed(self, error):
+        print(f"Auto-save failed: {error}")
+        self.statusBar().showMessage(f"Auto-save failed, will retry: {error}", 5000)
         
     def quick_buy(self):
         QMessageBox.information(self, "Quick Buy", "Quick buy feature coming soon!")
         
     def export_portfolio(self):
-        QMessageBox.information(self, "Export", "Export feature coming soon!")
+        default_name = f"portfolio_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Portfolio", default_name, "CSV files (*.csv)")
+        if not filename:
+            return
+        try:
+            self.data_service.save_portfolio_to_csv(self.portfolio, filename)
+            self.statusBar().showMessage(f"Portfolio exported to {filename}", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Export Error", f"Failed to export portfolio: {str(e)}")
         
     def backup_portfolio(self):
-        QMessageBox.information(self, "Backup", "Cloud backup feature coming soon!")
+        try:
+            self.auto_saver.flush()
+            revision = self.data_service.create_snapshot("Manual backup")
+            self.statusBar().showMessage(f"Snapshot saved (revision {revision})", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Backup Error", f"Failed to create snapshot: {str(e)}")
         
 
     
     def add_stock(self):
-        dialog = AddStockDialog(self)
+        dialog = AddStockDialog(self, stock_service=self.stock_service)
         if dialog.exec() == dialog.DialogCode.Accepted:
             symbol, quantity = dialog.get_data()
             if symbol and quantity > 0:
@@ -718,12 +882,12 @@ class MainWindow(QMainWindow):
                     
                     stock_data = self.stock_service.get_stock_data(symbol)
                     if stock_data:
-                        self.portfolio.add_stock(symbol, quantity, stock_data['price'])
+                        self.journal.apply(self.portfolio, 'add_stock', symbol, quantity, stock_data['price'])
                         self.update_display()
+                        self.update_stream_subscription()
                         self.statusBar().showMessage(f"Added {quantity} shares of {symbol}")
                         
-                        if self.auto_save_enabled:
-                            self.save_portfolio()
+                        self.schedule_autosave()
                     else:
                         QMessageBox.warning(self, "Error", f"Could not fetch data for {symbol}")
                 except Exception as e:
@@ -741,12 +905,13 @@ class MainWindow(QMainWindow):
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.Yes:
-                self.portfolio.remove_stock(symbol)
+                self.journal.apply(self.portfolio, 'remove_stock', symbol)
+                self.alert_engine.forget(symbol)
                 self.update_display()
+                self.update_stream_subscription()
                 self.statusBar().showMessage(f"Removed {symbol} from portfolio")
                 
-                if self.auto_save_enabled:
-                    self.save_portfolio()
+                self.schedule_autosave()
         else:
             QMessageBox.information(self, "No Selection", "Please select a stock to remove from the table")
     
@@ -754,49 +919,314 @@ class MainWindow(QMainWindow):
         if not self.portfolio.stocks:
             QMessageBox.information(self, "No Stocks", "Add some stocks to your portfolio first!")
             return
-            
+
+        if self.refresh_engine.is_running():
+            return
+
+        symbols = [stock.symbol for stock in self.portfolio.stocks]
         self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, len(self.portfolio.stocks))
+        self.progress_bar.setRange(0, len(symbols))
         self.progress_bar.setValue(0)
-        
+
         self.statusBar().showMessage("Refreshing portfolio data...")
         self.refresh_btn.setEnabled(False)
         self.connection_label.setText("🟡 Updating...")
         self.connection_label.setStyleSheet("color: #f39c12; font-weight: bold;")
-        
-        try:
-            for i, stock in enumerate(self.portfolio.stocks):
-                self.progress_bar.setValue(i)
-                stock_data = self.stock_service.get_stock_data(stock.symbol)
-                if stock_data:
-                    stock.update_price(stock_data['price'])
-                    stock.change = stock_data.get('change', 0)
-                    stock.change_percent = stock_data.get('change_percent', 0)
-                    
-                   
-                    self.performance_data.append({
-                        'timestamp': datetime.now(),
-                        'symbol': stock.symbol,
-                        'price': stock.current_price,
-                        'change': stock.change
-                    })
-            
-            self.progress_bar.setValue(len(self.portfolio.stocks))
-            self.update_display()
-            self.last_updated_label.setText(f"Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+        self.refresh_engine.start(symbols)
+
+    def on_quote_received(self, symbol, stock_data):
+        stock = self.portfolio.get_stock(symbol)
+        if not stock:
+            return
+
+        row = self.portfolio.index_of(stock.symbol)
+        if stock_data.get('stale'):
+            # An old cached quote: flag the row and wait for the revalidated one to arrive
+            # through quote_revalidated instead of recording it as a new tick.
+            self.stale_symbols.add(stock.symbol)
+            self.set_table_row(row, stock, self.portfolio.get_total_value())
+            return
+
+        self.journal.apply(self.portfolio, 'update_price', stock.symbol, stock_data['price'], stock_data.get('volume'),
+                           stock_data.get('change', 0), stock_data.get('change_percent', 0))
+        self.stale_symbols.discard(stock.symbol)
+
+        fundamentals = stock_data.get('fundamentals')
+        if fundamentals:
+            values = (fundamentals.get('market_cap'), fundamentals.get('pe_ratio'), fundamentals.get('dividend_yield'))
+            current = (stock.market_cap, stock.pe_ratio, stock.dividend_yield)
+            # They change at most daily; unchanged ones would only add journal records and dirty rows.
+            if any(value is not None and value != old for value, old in zip(values, current)):
+                self.journal.apply(self.portfolio, 'update_fundamentals', stock.symbol, *values)
+
+        self.set_table_row(row, stock, self.portfolio.get_total_value())
+        self.evaluate_alerts(stock)
+        self.schedule_autosave()
+
+    def on_quote_failed(self, symbol, error):
+        print(f"Error refreshing {symbol}: {error}")
+        self.update_connection_status()
+
+    def on_refresh_progress(self, completed, total):
+        self.progress_bar.setValue(completed)
+        self.statusBar().showMessage(f"Refreshing portfolio data... ({completed}/{total})")
+
+    def on_refresh_finished(self, succeeded, failed):
+        self.progress_bar.setVisible(False)
+        self.refresh_btn.setEnabled(True)
+        self.update_display()
+        self.update_connection_status()
+
+        if succeeded == 0 and failed > 0:
+            self.statusBar().showMessage("Refresh failed - Check your internet connection")
+            return
+
+        self.last_updated_label.setText(f"Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if failed:
+            self.statusBar().showMessage(f"Portfolio data refreshed ({failed} symbols failed)")
+        else:
             self.statusBar().showMessage("Portfolio data refreshed successfully")
+
+    def update_connection_status(self):
+        state = self.stock_service.connection_state()
+        if state == 'open':
+            self.connection_label.setText("🔴 Provider unavailable")
+            self.connection_label.setStyleSheet("color: #e74c3c; font-weight: bold;")
+        elif state == 'half_open':
+            self.connection_label.setText("🟡 Reconnecting...")
+            self.connection_label.setStyleSheet("color: #f39c12; font-weight: bold;")
+        else:
             self.connection_label.setText("🟢 Connected")
             self.connection_label.setStyleSheet("color: #27ae60; font-weight: bold;")
+
+    def update_max_workers(self, value):
+        self.refresh_engine.set_max_workers(value)
+
+    def set_stream_mode(self, mode):
+        self.stream_mode = mode
+        if mode.startswith("Live"):
+            self.quote_stream.set_source(PollingQuoteSource(self.stock_service, interval=self.refresh_interval))
+        elif mode.startswith("Simulated"):
+            start_prices = {stock.symbol: stock.current_price for stock in self.portfolio.stocks}
+            self.quote_stream.set_source(SimulatedQuoteSource(start_prices, interval=1.0))
+        else:
+            self.quote_stream.set_source(None)
+        self.update_stream_subscription()
+        self.statusBar().showMessage(f"Price stream: {mode}", 3000)
+
+    def update_stream_subscription(self):
+        if self.stream_mode == "Off":
+            self.quote_stream.set_symbols([])
+        else:
+            self.quote_stream.set_symbols(stock.symbol for stock in self.portfolio.stocks)
+
+    def on_tick(self, tick):
+        stock = self.portfolio.get_stock(tick['symbol'])
+        if not stock:
+            return
+
+        self.journal.apply(self.portfolio, 'update_price', stock.symbol, tick['price'], tick.get('volume'),
+                           tick.get('change', 0), tick.get('change_percent', 0))
+        self.stale_symbols.discard(stock.symbol)
+
+        row = self.portfolio.index_of(stock.symbol)
+        self.set_table_row(row, stock, self.portfolio.get_total_value())
+        self.update_metrics()
+        self.evaluate_alerts(stock)
+        self.schedule_autosave()
+
+    def evaluate_alerts(self, stock):
+        fired = self.alert_engine.evaluate_stock(stock)
+        for alert in fired:
+            self.journal.record('trigger_alert', stock.symbol, alert_index(stock, alert),
+                                timestamp=alert['triggered_at'].timestamp())
+        if fired and not self.alert_flush_timer.isActive():
+            self.alert_flush_timer.start()
+
+    def flush_alerts(self):
+        fired = self.alert_engine.drain()
+        if not fired:
+            return
+        self.notify_alerts(fired)
+        self.update_alerts_table()
+
+    def notify_alerts(self, fired):
+        messages = [
+            alert.get('message') or f"{symbol} {alert['type']} {alert['threshold']}"
+            for symbol, alert in fired
+        ]
+        if len(messages) == 1:
+            title, text = "Price Alert", messages[0]
+        else:
+            title = f"{len(messages)} Price Alerts"
+            text = "\n".join(messages[:5]) + (f"\n... and {len(messages) - 5} more" if len(messages) > 5 else "")
+        self.statusBar().showMessage(f"🔔 {title}: {'; '.join(messages[:3])}", 5000)
+        if self.notification_enabled and hasattr(self, 'tray_icon'):
+            self.tray_icon.showMessage(title, text)
+
+    def add_alert(self):
+        symbol = self.alert_symbol_combo.currentText()
+        stock = self.portfolio.get_stock(symbol) if symbol else None
+        if not stock:
+            QMessageBox.information(self, "No Stock", "Add a stock to your portfolio before creating alerts for it")
+            return
+
+        alert = self.journal.apply(
+            self.portfolio, 'add_alert', stock.symbol,
+            self.alert_type_combo.currentData(),
+            float(self.alert_threshold_spin.value()),
+            self.alert_message_input.text().strip()
+        )
+        self.alert_engine.track(stock.symbol, alert)
+        self.alert_message_input.clear()
+        # An alert that is already satisfied fires right away.
+        self.evaluate_alerts(stock)
+        self.update_alerts_table()
+        self.schedule_autosave()
+        self.statusBar().showMessage(f"Alert added for {stock.symbol}", 3000)
+
+    def selected_alert(self):
+        row = self.alerts_table.currentRow()
+        if row < 0 or row >= len(self.alert_rows):
+            return None, None
+        return self.alert_rows[row]
+
+    def remove_alert(self):
+        stock, alert = self.selected_alert()
+        if alert is None:
+            QMessageBox.information(self, "No Selection", "Please select an alert to remove")
+            return
+        self.discard_alert(stock, alert)
+        self.update_alerts_table()
+        self.schedule_autosave()
+
+    def discard_alert(self, stock, alert):
+        index = alert_index(stock, alert)
+        self.alert_engine.remove_alert(stock, alert)
+        self.journal.record('remove_alert', stock.symbol, index)
+
+    def clear_triggered_alerts(self):
+        for stock in self.portfolio.stocks:
+            for alert in [alert for alert in stock.alerts if alert.get('triggered')]:
+                self.discard_alert(stock, alert)
+        self.update_alerts_table()
+        self.schedule_autosave()
+
+    def update_alerts_tab(self):
+        current = self.alert_symbol_combo.currentText()
+        self.alert_symbol_combo.clear()
+        self.alert_symbol_combo.addItems([stock.symbol for stock in self.portfolio.stocks])
+        if current:
+            self.alert_symbol_combo.setCurrentText(current)
+        self.update_alerts_table()
+
+    def update_alerts_table(self):
+        conditions = {'above': "Price above", 'below': "Price below", 'change_percent': "Move of at least (%)"}
+        self.alert_rows = [(stock, alert) for stock in self.portfolio.stocks for alert in stock.alerts]
+        self.alerts_table.setRowCount(len(self.alert_rows))
+        for i, (stock, alert) in enumerate(self.alert_rows):
+            threshold = alert['threshold']
+            threshold_text = f"{threshold:.2f}%" if alert['type'] == 'change_percent' else format_currency(threshold)
+            if alert.get('triggered'):
+                triggered_at = alert.get('triggered_at')
+                status = f"Triggered {triggered_at.strftime('%H:%M:%S')}" if triggered_at else "Triggered"
+            else:
+                status = "Active"
             
-        except Exception as e:
-            QMessageBox.critical(self, "Refresh Error", f"Failed to refresh portfolio data: {str(e)}")
-            self.statusBar().showMessage("Refresh failed - Check your internet connection")
-            self.connection_label.setText("🔴 Error")
-            self.connection_label.setStyleSheet("color: #e74c3c; font-weight: bold;")
-        finally:
-            self.progress_bar.setVisible(False)
-            self.refresh_btn.setEnabled(True)
-    
+            cells = [stock.symbol, conditions.get(alert['type'], alert['type']), threshold_text,
+                     alert.get('message', ''), status]
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if alert.get('triggered'):
+                    item.setForeground(QColor(127, 140, 141))
+                self.alerts_table.setItem(i, column, item)
+
+    def on_tab_changed(self, index):
+        if self.tab_widget.widget(index) is self.analytics_tab:
+            self.update_analytics()
+
+    def on_history_backfilled(self, symbols):
+        for symbol in symbols:
+            self.analytics.invalidate(symbol)
+        self.update_analytics()
+
+    def update_analytics_benchmarks(self):
+        current = self.benchmark_combo.currentData()
+        self.benchmark_combo.blockSignals(True)
+        self.benchmark_combo.clear()
+        self.benchmark_combo.addItem("Portfolio", None)
+        for stock in self.portfolio.stocks:
+            self.benchmark_combo.addItem(stock.symbol, stock.symbol)
+        index = self.benchmark_combo.findData(current)
+        self.benchmark_combo.setCurrentIndex(max(index, 0))
+        self.benchmark_combo.blockSignals(False)
+
+    def update_analytics(self):
+        """Redraw the Analytics tab; the engine returns its cached result while the data is unchanged."""
+        if self.tab_widget.currentWidget() is not self.analytics_tab:
+            return
+        if self.analytics.history_store is not None:
+            # Older daily closes come from the local history store; fill it in the background.
+            self.history_backfill.request(stock.symbol for stock in self.portfolio.stocks)
+        self.update_analytics_benchmarks()
+        result = self.analytics.analyze(self.portfolio.stocks, benchmark=self.benchmark_combo.currentData())
+        
+        if result['start'] is not None:
+            self.analytics_period_label.setText(f"Daily closes {result['start']} to {result['end']}")
+        else:
+            self.analytics_period_label.setText("No price history yet")
+        
+        rows = [(symbol, result['metrics'][symbol]) for symbol in result['symbols']]
+        rows.append(("Portfolio", result['portfolio']))
+        self.analytics_table.setRowCount(len(rows))
+        for i, (symbol, metrics) in enumerate(rows):
+            cells = [
+                symbol,
+                self.format_metric(metrics['total_return'] * 100, "{:+.2f}%"),
+                self.format_metric(metrics['volatility'] * 100, "{:.2f}%"),
+                self.format_metric(metrics['sharpe'], "{:.2f}"),
+                self.format_metric(metrics['sortino'], "{:.2f}"),
+                self.format_metric(metrics['max_drawdown'] * 100, "{:.2f}%"),
+                self.format_metric(metrics['beta'], "{:.2f}")
+            ]
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if symbol == "Portfolio":
+                    item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
+                self.analytics_table.setItem(i, column, item)
+        
+        self.update_correlation_chart(result['symbols'], result['correlation'])
+
+    @staticmethod
+    def format_metric(value, pattern):
+        return "—" if np.isnan(value) else pattern.format(value)
+
+    def update_correlation_chart(self, symbols, correlation):
+        self.correlation_figure.clear()
+        ax = self.correlation_figure.add_subplot(111)
+        
+        if len(symbols) < 2 or np.isnan(correlation).all():
+            ax.text(0.5, 0.5, 'Correlation needs two holdings\nwith overlapping history',
+                   ha='center', va='center', fontsize=12, color='gray')
+            ax.set_xticks([])
+            ax.set_yticks([])
+        else:
+            image = ax.imshow(np.ma.masked_invalid(correlation), cmap='RdYlGn', vmin=-1, vmax=1)
+            ax.set_xticks(range(len(symbols)))
+            ax.set_yticks(range(len(symbols)))
+            ax.set_xticklabels(symbols, rotation=90, fontsize=8)
+            ax.set_yticklabels(symbols, fontsize=8)
+            if len(symbols) <= 12:
+                for i in range(len(symbols)):
+                    for j in range(len(symbols)):
+                        if not np.isnan(correlation[i, j]):
+                            ax.text(j, i, f"{correlation[i, j]:.2f}", ha='center', va='center', fontsize=7)
+            self.correlation_figure.colorbar(image, ax=ax)
+        
+        self.correlation_figure.tight_layout()
+        self.correlation_canvas.draw()
+
     def toggle_auto_refresh(self):
         if self.auto_refresh_btn.isChecked():
             self.refresh_timer.start(self.refresh_interval * 1000)
@@ -815,6 +1245,8 @@ class MainWindow(QMainWindow):
         self.update_table()
         self.update_charts()
         self.update_stock_cards()
+        self.update_alerts_tab()
+        self.update_analytics()
     
     def update_metrics(self):
         if not self.portfolio.stocks:
@@ -826,13 +1258,12 @@ class MainWindow(QMainWindow):
             return
         
        
-        total_value = sum(stock.quantity * stock.current_price for stock in self.portfolio.stocks)
-        total_change = sum(stock.change * stock.quantity for stock in self.portfolio.stocks)
-        total_change_percent = (total_change / (total_value - total_change)) * 100 if (total_value - total_change) > 0 else 0
-        
-        
-        best_performer = max(self.portfolio.stocks, key=lambda s: s.change_percent)
-        worst_performer = min(self.portfolio.stocks, key=lambda s: s.change_percent)
+        summary = self.portfolio.summary()
+        total_value = summary['total_value']
+        total_change = summary['total_change']
+        total_change_percent = summary['total_change_percent']
+        best_performer = summary['best_performer']
+        worst_performer = summary['worst_performer']
         
        
         self.total_value_label.setText(f"Total Value: {format_currency(total_value)}")
@@ -844,75 +1275,84 @@ class MainWindow(QMainWindow):
         else:
             self.daily_change_label.setStyleSheet("color: #e74c3c; padding: 4px; font-weight: bold;")
         
-        self.total_stocks_label.setText(f"Total Stocks: {len(self.portfolio.stocks)}")
+        self.total_stocks_label.setText(f"Total Stocks: {summary['count']}")
         self.best_performer_label.setText(f"Best Performer: {best_performer.symbol} ({best_performer.change_percent:+.2f}%)")
         self.worst_performer_label.setText(f"Worst Performer: {worst_performer.symbol} ({worst_performer.change_percent:+.2f}%)")
     
     def update_table(self):
         self.portfolio_table.setRowCount(len(self.portfolio.stocks))
         
-        total_value = sum(stock.quantity * stock.current_price for stock in self.portfolio.stocks)
+        total_value = self.portfolio.get_total_value()
         
         for i, stock in enumerate(self.portfolio.stocks):
-            value = stock.quantity * stock.current_price
-            weight = (value / total_value) * 100 if total_value > 0 else 0
-            
+            self.set_table_row(i, stock, total_value)
+
+    def set_table_row(self, i, stock, total_value):
+        value = stock.quantity * stock.current_price
+        weight = (value / total_value) * 100 if total_value > 0 else 0
+        
     
-            symbol_item = QTableWidgetItem(stock.symbol)
-            symbol_item.setFont(QFont("Arial", 11, QFont.Weight.Bold))
-            self.portfolio_table.setItem(i, 0, symbol_item)
-            
+        symbol_item = QTableWidgetItem(stock.symbol)
+        symbol_item.setFont(QFont("Arial", 11, QFont.Weight.Bold))
+        self.portfolio_table.setItem(i, 0, symbol_item)
+        
        
-            quantity_item = QTableWidgetItem(str(stock.quantity))
-            quantity_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.portfolio_table.setItem(i, 1, quantity_item)
-            
-            
-            avg_cost_item = QTableWidgetItem(format_currency(stock.purchase_price))
-            avg_cost_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-            self.portfolio_table.setItem(i, 2, avg_cost_item)
-            
+        quantity_item = QTableWidgetItem(str(stock.quantity))
+        quantity_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.portfolio_table.setItem(i, 1, quantity_item)
+        
+        
+        avg_cost_item = QTableWidgetItem(format_currency(stock.purchase_price))
+        avg_cost_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+        self.portfolio_table.setItem(i, 2, avg_cost_item)
+        
          
-            price_item = QTableWidgetItem(format_currency(stock.current_price))
-            price_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-            if stock.current_price > stock.purchase_price:
-                price_item.setBackground(QColor(39, 174, 96, 50)) 
-            else:
-                price_item.setBackground(QColor(231, 76, 60, 50))  
-            self.portfolio_table.setItem(i, 3, price_item)
-            
+        price_item = QTableWidgetItem(format_currency(stock.current_price))
+        price_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+        if stock.current_price > stock.purchase_price:
+            price_item.setBackground(QColor(39, 174, 96, 50)) 
+        else:
+            price_item.setBackground(QColor(231, 76, 60, 50))  
+        if stock.symbol in self.stale_symbols:
+            stale_font = QFont("Arial", 11)
+            stale_font.setItalic(True)
+            price_item.setFont(stale_font)
+            price_item.setForeground(QColor(127, 140, 141))
+            price_item.setToolTip("Cached price, refreshing in the background")
+        self.portfolio_table.setItem(i, 3, price_item)
+        
            
-            value_item = QTableWidgetItem(format_currency(value))
-            value_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-            value_item.setFont(QFont("Arial", 11, QFont.Weight.Bold))
-            self.portfolio_table.setItem(i, 4, value_item)
-            
+        value_item = QTableWidgetItem(format_currency(value))
+        value_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+        value_item.setFont(QFont("Arial", 11, QFont.Weight.Bold))
+        self.portfolio_table.setItem(i, 4, value_item)
+        
            
-            change_item = QTableWidgetItem(format_currency(stock.change))
-            change_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-            if stock.change >= 0:
-                change_item.setBackground(QColor(39, 174, 96, 100)) 
-                change_item.setForeground(QColor(255, 255, 255)) 
-            else:
-                change_item.setBackground(QColor(231, 76, 60, 100))  
-                change_item.setForeground(QColor(255, 255, 255)) 
-            self.portfolio_table.setItem(i, 5, change_item)
-            
-            
-            change_percent_item = QTableWidgetItem(format_percentage(stock.change_percent))
-            change_percent_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-            if stock.change_percent >= 0:
-                change_percent_item.setBackground(QColor(39, 174, 96, 100))  
-                change_percent_item.setForeground(QColor(255, 255, 255))  
-            else:
-                change_percent_item.setBackground(QColor(231, 76, 60, 100))  
-                change_percent_item.setForeground(QColor(255, 255, 255))  
-            self.portfolio_table.setItem(i, 6, change_percent_item)
-            
-            
-            weight_item = QTableWidgetItem(f"{weight:.1f}%")
-            weight_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-            self.portfolio_table.setItem(i, 7, weight_item)
+        change_item = QTableWidgetItem(format_currency(stock.change))
+        change_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+        if stock.change >= 0:
+            change_item.setBackground(QColor(39, 174, 96, 100)) 
+            change_item.setForeground(QColor(255, 255, 255)) 
+        else:
+            change_item.setBackground(QColor(231, 76, 60, 100))  
+            change_item.setForeground(QColor(255, 255, 255)) 
+        self.portfolio_table.setItem(i, 5, change_item)
+        
+        
+        change_percent_item = QTableWidgetItem(format_percentage(stock.change_percent))
+        change_percent_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+        if stock.change_percent >= 0:
+            change_percent_item.setBackground(QColor(39, 174, 96, 100))  
+            change_percent_item.setForeground(QColor(255, 255, 255))  
+        else:
+            change_percent_item.setBackground(QColor(231, 76, 60, 100))  
+            change_percent_item.setForeground(QColor(255, 255, 255))  
+        self.portfolio_table.setItem(i, 6, change_percent_item)
+        
+        
+        weight_item = QTableWidgetItem(f"{weight:.1f}%")
+        weight_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+        self.portfolio_table.setItem(i, 7, weight_item)
     
     def update_charts(self):
         self.update_distribution_chart()
@@ -941,7 +1381,7 @@ class MainWindow(QMainWindow):
         
         ax1 = fig.add_subplot(gs[0, 0])
         symbols = [stock.symbol for stock in self.portfolio.stocks]
-        values = [stock.quantity * stock.current_price for stock in self.portfolio.stocks]
+        values = self.portfolio.get_market_values()
         colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c', '#e67e22', '#34495e']
         
         wedges, texts, autotexts = ax1.pie(values, labels=symbols, autopct='%1.1f%%', 
@@ -969,7 +1409,10 @@ class MainWindow(QMainWindow):
     def update_performance_chart(self):
         self.performance_figure.clear()
         
-        if not self.performance_data:
+        since = datetime.now() - self.performance_window
+        windows = [(stock.symbol, stock.get_price_window(since)) for stock in self.portfolio.stocks]
+        windows = [(symbol, window) for symbol, window in windows if len(window) > 1]
+        if not windows:
             ax = self.performance_figure.add_subplot(111)
             ax.text(0.5, 0.5, 'No performance data yet\nRefresh portfolio to start tracking', 
                    horizontalalignment='center', verticalalignment='center',
@@ -982,11 +1425,8 @@ class MainWindow(QMainWindow):
         ax = self.performance_figure.add_subplot(111)
         
         
-        df = pd.DataFrame(self.performance_data)
-        
-        for symbol in df['symbol'].unique():
-            symbol_data = df[df['symbol'] == symbol]
-            ax.plot(symbol_data['timestamp'], symbol_data['price'], 
+        for symbol, window in windows:
+            ax.plot(window.datetimes(), window.prices, 
                    label=symbol, marker='o', linewidth=2, markersize=4)
         
         ax.set_title('Stock Price Performance', fontsize=14, fontweight='bold')
@@ -1057,18 +1497,10 @@ class MainWindow(QMainWindow):
     
     def save_portfolio(self):
         try:
-            filename = f"portfolio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            self.data_service.save_portfolio_to_csv(self.portfolio, filename)
-            
-            if self.notification_enabled:
-                self.statusBar().showMessage(f"Portfolio saved to {filename}", 3000)
+            written = self.auto_saver.flush()
             
-           
-            portfolio_files = [f for f in os.listdir('.') if f.startswith('portfolio_') and f.endswith('.csv')]
-            if len(portfolio_files) > 10:
-                portfolio_files.sort()
-                for old_file in portfolio_files[:-10]:
-                    os.remove(old_file)
+            if self.notification_enabled and written:
+                self.statusBar().showMessage(f"Portfolio saved ({written} holdings changed)", 3000)
                     
         except Exception as e:
             QMessageBox.critical(self, "Save Error", f"Failed to save portfolio: {str(e)}")
@@ -1076,21 +1508,86 @@ class MainWindow(QMainWindow):
     def load_portfolio(self):
         """Enhanced load with error handling"""
         try:
-            portfolio_files = [f for f in os.listdir('.') if f.startswith('portfolio_') and f.endswith('.csv')]
-            if portfolio_files:
-                latest_file = max(portfolio_files)
-                loaded_portfolio = self.data_service.load_portfolio_from_csv(latest_file)
-                if loaded_portfolio:
-                    self.portfolio = loaded_portfolio
-                    self.update_display()
-                    self.statusBar().showMessage(f"Loaded portfolio from {latest_file}", 3000)
+            loaded_portfolio = self.data_service.load_portfolio()
+            source, report = "portfolio.db", None
+            replayed = self.data_service.last_replayed
+            # Legacy files are imported once, into a fresh database; an emptied portfolio stays empty.
+            importing = loaded_portfolio is None and self.data_service.legacy_import_pending()
+            if importing:
+                loaded_portfolio, source, report = self.load_legacy_portfolio()
+            if loaded_portfolio:
+                self.portfolio = loaded_portfolio
+                if importing or replayed:
+                    # Everything loaded from a legacy file or replayed from the journal is pending;
+                    # fold it into the store now.
+                    self.auto_saver.flush()
+            if importing:
+                self.data_service.mark_legacy_imported()
+            if loaded_portfolio:
+                self.alert_engine.rebuild(self.portfolio.stocks)
+                self.apply_cached_quotes()
+                self.update_display()
+                self.update_stream_subscription()
+                if replayed:
+                    self.statusBar().showMessage(f"Loaded portfolio from {source}, recovered {replayed} unsaved changes",
+                                                 5000)
+                elif report is None or report.ok:
+                    self.statusBar().showMessage(f"Loaded portfolio from {source}", 3000)
+                else:
+                    self.statusBar().showMessage(report.summary(), 10000)
+                    self.show_load_report(report)
         except Exception as e:
             self.statusBar().showMessage("No previous portfolio found or error loading", 3000)
     
+    def show_load_report(self, report):
+        """List the rows a CSV load skipped, one line per problem, under "Show Details..."."""
+        box = QMessageBox(QMessageBox.Icon.Warning, "Portfolio Import", report.summary(), parent=self)
+        box.setInformativeText("Rows with errors were skipped; the rest of the file was loaded.")
+        box.setDetailedText(str(report))
+        box.exec()
+    
+    def load_legacy_portfolio(self):
+        """The newest snapshot or CSV save from before the portfolio database existed."""
+        # CSV exports share the prefix but are not saves.
+        candidates = [f for f in os.listdir('.') if f.startswith('portfolio_') and not f.startswith('portfolio_export_')]
+        snapshots = [f for f in candidates if f.endswith('.npz')]
+        portfolio_files = snapshots or [f for f in candidates if f.endswith('.csv')]
+        if not portfolio_files:
+            return None, None, None
+        latest_file = max(portfolio_files)
+        if snapshots:
+            return self.data_service.load_snapshot(latest_file), latest_file, None
+        portfolio = self.data_service.load_portfolio_from_csv(latest_file)
+        return portfolio, latest_file, self.data_service.last_load_report
+    
+    def apply_cached_quotes(self):
+        """Show the last persisted quotes right away, before any network refresh.
+
+        Only quotes newer than the loaded state are applied, so stream ticks
+        saved or replayed after the last refresh are not rolled back.
+        """
+        for stock in self.portfolio.stocks:
+            stock_data = self.stock_service.get_cached_stock_data(stock.symbol)
+            if not stock_data or stock_data['fetched_at'] <= stock.last_updated.timestamp():
+                continue
+            self.journal.apply(self.portfolio, 'update_price', stock.symbol, stock_data['price'],
+                               stock_data.get('volume'), stock_data.get('change', 0),
+                               stock_data.get('change_percent', 0), timestamp=stock_data['fetched_at'])
+            if stock_data['stale']:
+                self.stale_symbols.add(stock.symbol)
+    
     def closeEvent(self, event):
         """Handle application close with auto-save"""
-        if self.auto_save_enabled and self.portfolio.stocks:
+        self.refresh_engine.shutdown()
+        self.quote_stream.close()
+        self.history_backfill.shutdown()
+        self.stock_service.shutdown()
+        
+        # Pending changes are written synchronously here, after any background save finishes.
+        if self.auto_save_enabled:
             self.save_portfolio()
+        self.auto_saver.close()
+        self.journal.close()
         
         if hasattr(self, 'tray_icon'):
             self.tray_icon.hide()
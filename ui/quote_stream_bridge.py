@@ -0,0 +1,28 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class QuoteStreamBridge(QObject):
+    """Re-emits QuoteStream ticks as a Qt signal so slots run on the GUI thread."""
+    tick_received = pyqtSignal(dict)
+
+    def __init__(self, stream, parent=None):
+        super().__init__(parent)
+        self.stream = stream
+        self.subscription = None
+
+    def set_symbols(self, symbols):
+        if self.subscription is not None:
+            self.subscription.unsubscribe()
+            self.subscription = None
+        symbols = list(symbols)
+        if symbols:
+            self.subscription = self.stream.subscribe(symbols, self.tick_received.emit)
+
+    def set_source(self, source):
+        self.stream.set_source(source)
+
+    def close(self):
+        if self.subscription is not None:
+            self.subscription.unsubscribe()
+            self.subscription = None
+        self.stream.close()
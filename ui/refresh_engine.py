@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class RefreshEngine(QObject):
+    """Refreshes quotes in bulk on a bounded worker pool and reports back through signals.
+
+    Symbols are fetched ``batch_size`` at a time with one
+    get_multiple_stocks call per chunk. Only symbols the batch could not
+    answer, and ones whose fundamentals are not cached yet, get a
+    get_stock_data task of their own.
+
+    At most ``max_workers`` calls run at once. A task that runs longer than
+    ``timeout`` seconds is reported as failed and its late result dropped,
+    but a running call cannot be interrupted: it keeps its worker slot until
+    it returns, so a stuck provider slows the refresh down instead of
+    pushing the engine past ``max_workers``. The same accounting lets
+    set_max_workers take effect without waiting for running calls.
+
+    Signals are emitted from the coordinator thread, so Qt delivers them to
+    slots on the GUI thread as queued calls. Every symbol gets exactly one
+    quote_received or quote_failed, each followed by progress_changed with
+    a growing count, and refresh_finished comes last.
+    """
+    quote_received = pyqtSignal(str, dict)
+    quote_failed = pyqtSignal(str, str)
+    progress_changed = pyqtSignal(int, int)
+    refresh_finished = pyqtSignal(int, int)
+
+    def __init__(self, stock_service, max_workers=8, timeout=15.0, batch_size=50, parent=None):
+        super().__init__(parent)
+        self.stock_service = stock_service
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.batch_size = batch_size
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="quote-refresh")
+        self._executor_workers = max_workers
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._coordinator = None
+
+    def set_max_workers(self, max_workers):
+        """Change the worker limit; a running refresh stays within the new limit as its calls return."""
+        self.max_workers = max_workers
+
+    def busy_workers(self):
+        """Calls still running, including ones a refresh gave up on."""
+        with self._busy_lock:
+            return self._busy
+
+    def is_running(self):
+        return self._coordinator is not None and self._coordinator.is_alive()
+
+    def start(self, symbols):
+        if self.is_running():
+            return False
+
+        if self._executor_workers != self.max_workers:
+            # Calls still running on the old pool keep counting towards the limit.
+            self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="quote-refresh")
+            self._executor_workers = self.max_workers
+
+        self._cancel_event.clear()
+        self._coordinator = threading.Thread(
+            target=self._run, args=(list(symbols), self._executor), daemon=True
+        )
+        self._coordinator.start()
+        return True
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, executor, fn, *args):
+        with self._busy_lock:
+            self._busy += 1
+        future = executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._busy_lock:
+            self._busy -= 1
+
+    def _run(self, symbols, executor):
+        total = len(symbols)
+        completed = 0
+        succeeded = 0
+        queue = deque(('batch', symbols[i:i + self.batch_size]) for i in range(0, total, self.batch_size))
+        running = {}
+        # A limit raised mid-refresh applies from the next one, when the pool grows.
+        pool_size = self._executor_workers
+
+        def received(symbol, stock_data):
+            nonlocal completed, succeeded
+            completed += 1
+            succeeded += 1
+            self.quote_received.emit(symbol, stock_data)
+            self.progress_changed.emit(completed, total)
+
+        def failed(symbol, error):
+            nonlocal completed
+            completed += 1
+            self.quote_failed.emit(symbol, error)
+            self.progress_changed.emit(completed, total)
+
+        while queue or running:
+            if self._cancel_event.is_set():
+                for future in running:
+                    future.cancel()
+                for _, batch in list(queue) + [(kind, batch) for kind, batch, _ in running.values()]:
+                    for symbol in batch:
+                        failed(symbol, "Cancelled")
+                break
+
+            while queue and self.busy_workers() < min(self.max_workers, pool_size):
+                kind, batch = queue.popleft()
+                if kind == 'batch':
+                    future = self._submit(executor, self.stock_service.get_multiple_stocks, batch)
+                else:
+                    future = self._submit(executor, self.stock_service.get_stock_data, batch[0])
+                running[future] = (kind, batch, time.monotonic())
+
+            if running:
+                done, _ = wait(running, timeout=0.1, return_when=FIRST_COMPLETED)
+            else:
+                # Every slot is held by calls an earlier refresh gave up on.
+                done = set()
+                time.sleep(0.05)
+
+            for future in done:
+                kind, batch, _ = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    for symbol in batch:
+                        failed(symbol, str(e))
+                    continue
+
+                if kind == 'symbol':
+                    if result:
+                        received(batch[0], result)
+                    else:
+                        failed(batch[0], "No data returned")
+                    continue
+
+                results, _ = result
+                for symbol in batch:
+                    stock_data = results.get(symbol)
+                    if stock_data and stock_data.get('fundamentals'):
+                        received(symbol, stock_data)
+                    else:
+                        # Missed by the batch, or the fundamentals still need fetching.
+                        queue.append(('symbol', [symbol]))
+
+            now = time.monotonic()
+            for future, (kind, batch, started) in list(running.items()):
+                if now - started > self.timeout:
+                    del running[future]
+                    for symbol in batch:
+                        failed(symbol, f"Timed out after {self.timeout:g}s")
+
+        self.refresh_finished.emit(succeeded, total - succeeded)
@@ -1,3 +1,8 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+
 def format_currency(amount: float) -> str:
     return f"${amount:,.2f}"
 
@@ -10,4 +15,49 @@ def validate_stock_symbol(symbol: str) -> bool:
 def calculate_percentage_change(old_value: float, new_value: float) -> float:
     if old_value == 0:
         return 0
-    return ((new_value - old_value) / old_value) * 100
\ No newline at end of file
+    return ((new_value - old_value) / old_value) * 100
+
+def _current_umask() -> int:
+    # The umask can only be read by setting it; do that once, before any worker threads exist.
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _current_umask()
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'wb', **open_args):
+    """Open a temp file next to ``path``; on success it is fsynced and renamed over ``path``.
+
+    Readers see either the old file or the complete new one, never a
+    partial write. If the block raises, the temp file is removed and
+    ``path`` is untouched. The result keeps the permissions of the file it
+    replaces, or gets the usual ones for a new file (0666 minus the umask)
+    rather than the private 0600 of a temp file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, **open_args) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        try:
+            permissions = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            permissions = 0o666 & ~_UMASK
+        os.chmod(temp_path, permissions)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # Make the rename itself durable.
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)